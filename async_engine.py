@@ -0,0 +1,259 @@
+"""
+Engine asyncio dựa trên AsyncTeleBot.
+
+Các handler đồng bộ của bot vẫn được dùng lại: mỗi update chạy trong thread
+pool (chuyển đổi, ghi bookkeeping vào hàng đợi) với một RecordingSender thay
+cho bot, sau đó các tin nhắn được ghi lại sẽ được gửi bất đồng bộ. Nhờ vậy
+việc gửi tin, bookkeeping và chuyển đổi của các chat khác nhau chồng lên
+nhau, còn các update của cùng một chat vẫn được xử lý tuần tự đúng thứ tự.
+
+Các thread chạy ngoài handler (ví dụ bộ debounce của chế độ inline) gửi qua
+LoopSender: lời gọi được chuyển sang event loop của engine.
+
+Mọi tin nhắn gửi đi qua cùng giới hạn flood như Outbox (token bucket theo chat
+và toàn bot); khi gặp lỗi 429 engine chờ đúng retry_after rồi gửi lại.
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from telebot.async_telebot import AsyncTeleBot
+from telebot.asyncio_helper import ApiTelegramException
+
+from dispatcher import chat_id_of
+from outbox import CHAT_BURST, CHAT_RATE, GLOBAL_BURST, GLOBAL_RATE, TokenBucket, _chat_id_of_call
+
+logger = logging.getLogger(__name__)
+
+Action = Tuple[str, tuple, dict]
+
+# Không phải tin nhắn nên không tính vào giới hạn gửi (như Outbox)
+UNTHROTTLED_METHODS = {'answer_callback_query', 'answer_inline_query'}
+
+
+class RecordingSender:
+    """Ghi lại mọi lời gọi gửi tin (reply_to, send_message, ...) của handler."""
+
+    # Tệp của send_document được AsyncEngine đóng sau khi gửi lại
+    owns_documents = True
+
+    def __init__(self):
+        self.actions: List[Action] = []
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def record(*args, **kwargs):
+            self.actions.append((name, args, kwargs))
+
+        return record
+
+
+class LoopSender:
+    """Sender dùng được từ thread bất kỳ: gửi qua AsyncTeleBot trên event loop của engine."""
+
+    # Tệp của send_document được AsyncEngine đóng sau khi gửi
+    owns_documents = True
+
+    def __init__(self, engine: 'AsyncEngine'):
+        self._engine = engine
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def send(*args, **kwargs):
+            loop = self._engine.loop
+            if loop is None:
+                raise RuntimeError("Engine asyncio chưa chạy")
+            asyncio.run_coroutine_threadsafe(self._engine._send(name, args, kwargs), loop)
+
+        return send
+
+
+class AsyncEngine:
+    def __init__(self, bot, use_sender, token: Optional[str] = None,
+                 api: Any = None, workers: int = 8, idle_timeout: float = 60.0,
+                 chat_rate: float = CHAT_RATE, chat_burst: float = CHAT_BURST,
+                 global_rate: float = GLOBAL_RATE, global_burst: float = GLOBAL_BURST,
+                 max_retries: int = 5, max_chats: int = 10000):
+        """
+        Args:
+            bot: TeleBot đồng bộ đã đăng ký handler (dùng để định tuyến update)
+            use_sender: Context manager đặt sender cho thread chạy handler
+            token: Token bot; bắt buộc nếu không truyền api
+            api: Đối tượng có các coroutine gửi tin (mặc định AsyncTeleBot(token))
+            workers: Số thread chạy handler (chuyển đổi, bookkeeping)
+            idle_timeout: Số giây rảnh trước khi giải phóng hàng đợi của một chat
+            chat_rate, chat_burst: Tốc độ (tin/giây) và số tin gửi dồn tối đa mỗi chat
+            global_rate, global_burst: Tương tự cho toàn bộ bot
+            max_retries: Số lần gửi lại tối đa một tin bị lỗi 429
+            max_chats: Số chat giữ bucket trước khi dọn các chat rảnh
+        """
+        # Handler phải chạy ngay trong thread của executor để dùng sender riêng
+        bot.threaded = False
+        self.bot = bot
+        self.use_sender = use_sender
+        self.api = api if api is not None else AsyncTeleBot(token)
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix='async-handler')
+        self.idle_timeout = idle_timeout
+        self._queues: Dict[Any, asyncio.Queue] = {}
+        self._tasks: Dict[Any, asyncio.Task] = {}
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.max_chats = max_chats
+        # Chỉ dùng trên event loop nên không cần khóa
+        self._global = TokenBucket(global_rate, global_burst)
+        self._buckets: Dict[Any, TokenBucket] = {}
+        self.stats = {'updates': 0, 'sent': 0, 'send_errors': 0, 'handler_errors': 0,
+                      'rate_limited': 0, 'retried': 0}
+        self._pending = 0
+        self._idle: Optional[asyncio.Event] = None
+        # Event loop đang chạy engine (cho LoopSender)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _run_handlers(self, update) -> List[Action]:
+        recorder = RecordingSender()
+        with self.use_sender(recorder):
+            try:
+                self.bot.process_new_updates([update])
+            except Exception:
+                self.stats['handler_errors'] += 1
+                logger.exception("Handler lỗi khi xử lý update %s", update.update_id)
+        return recorder.actions
+
+    async def _process(self, update) -> None:
+        loop = asyncio.get_running_loop()
+        actions = await loop.run_in_executor(self.executor, self._run_handlers, update)
+        # Gửi lần lượt để giữ đúng thứ tự tin nhắn trong chat
+        for name, args, kwargs in actions:
+            await self._send(name, args, kwargs)
+
+    async def _throttle(self, chat_id) -> None:
+        """Chờ đến khi bucket của chat và bucket chung đều có token rồi lấy token."""
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            if len(self._buckets) >= self.max_chats:
+                now = time.monotonic()
+                for key in [key for key, idle in self._buckets.items() if idle.full(now)]:
+                    del self._buckets[key]
+            bucket = self._buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        while True:
+            now = time.monotonic()
+            wait = max(bucket.delay(now), self._global.delay(now))
+            if wait <= 0:
+                bucket.take(now)
+                self._global.take(now)
+                return
+            await asyncio.sleep(wait)
+
+    async def _send(self, name: str, args: tuple, kwargs: dict) -> None:
+        try:
+            attempts = 0
+            while True:
+                if name not in UNTHROTTLED_METHODS:
+                    await self._throttle(_chat_id_of_call(name, args, kwargs))
+                try:
+                    await getattr(self.api, name)(*args, **kwargs)
+                    break
+                except ApiTelegramException as e:
+                    if e.error_code != 429 or attempts >= self.max_retries:
+                        raise
+                    self.stats['rate_limited'] += 1
+                    retry_after = float((e.result_json.get('parameters') or {}).get('retry_after', 1))
+                await asyncio.sleep(retry_after)
+                attempts += 1
+                self.stats['retried'] += 1
+                if name == 'send_document' and hasattr(args[1], 'seek'):
+                    # Tệp có thể đã bị đọc ở lần gửi trước
+                    args[1].seek(0)
+            self.stats['sent'] += 1
+        except Exception:
+            self.stats['send_errors'] += 1
+            logger.exception("Không gửi được tin nhắn (%s)", name)
+        finally:
+            if name == 'send_document' and hasattr(args[1], 'close'):
+                args[1].close()
+
+    async def _drain(self, key, chat_queue: asyncio.Queue) -> None:
+        while True:
+            try:
+                update = await asyncio.wait_for(chat_queue.get(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                if chat_queue.empty():
+                    del self._queues[key]
+                    del self._tasks[key]
+                    return
+                continue
+            try:
+                await self._process(update)
+            finally:
+                self._pending -= 1
+                if self._pending == 0:
+                    self._idle.set()
+
+    async def handle_update(self, update) -> None:
+        """Đưa update vào hàng đợi của chat tương ứng (tuần tự theo chat)."""
+        self.stats['updates'] += 1
+        if self._idle is None:
+            self._idle = asyncio.Event()
+            self.loop = asyncio.get_running_loop()
+        self._pending += 1
+        self._idle.clear()
+        key = chat_id_of(update)
+        if key is None:
+            # Update không gắn với chat nào: không cần giữ thứ tự
+            key = ('update', update.update_id)
+        chat_queue = self._queues.get(key)
+        if chat_queue is None:
+            chat_queue = self._queues[key] = asyncio.Queue()
+            self._tasks[key] = asyncio.create_task(self._drain(key, chat_queue))
+        chat_queue.put_nowait(update)
+
+    async def join(self) -> None:
+        """Chờ đến khi mọi update đã nhận được xử lý và gửi xong."""
+        if self._idle is not None and self._pending:
+            await self._idle.wait()
+
+    async def run_polling(self, timeout: int = 20) -> None:
+        """Long-polling bằng AsyncTeleBot, chuyển update cho handle_update."""
+        offset = None
+        while True:
+            try:
+                updates = await self.api.get_updates(offset=offset, timeout=timeout)
+            except Exception:
+                logger.exception("Lỗi khi lấy update, thử lại sau 3 giây")
+                await asyncio.sleep(3)
+                continue
+            for update in updates:
+                offset = update.update_id + 1
+                await self.handle_update(update)
+
+    def close(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+        self.executor.shutdown(wait=True)
+
+
+def run_async(bot, use_sender, token: str, workers: int = 8,
+              set_default_sender: Optional[Callable[[Any], None]] = None) -> None:
+    """
+    Chạy bot bằng engine asyncio cho đến khi bị dừng (Ctrl+C).
+
+    Args:
+        set_default_sender: Nếu có, được gọi với một LoopSender để các thread
+                            ngoài handler cũng gửi qua engine
+    """
+    engine = AsyncEngine(bot, use_sender, token=token, workers=workers)
+    if set_default_sender is not None:
+        set_default_sender(LoopSender(engine))
+    try:
+        asyncio.run(engine.run_polling())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.close()
@@ -0,0 +1,115 @@
+"""
+So sánh thông lượng nhiều chat đồng thời giữa bot đa luồng của telebot và
+engine asyncio (AsyncEngine), với Bot API giả lập có độ trễ mạng.
+
+Chạy: python benchmarks/bench_async.py [--chats 100] [--rounds 3] [--api-latency 0.05]
+      [--global-rate 100000] [--chat-rate 1000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+os.chdir(tempfile.mkdtemp(prefix='bench_async_'))
+from telebot import types  # noqa: E402
+import main as bot_main  # noqa: E402
+from async_engine import AsyncEngine  # noqa: E402
+from fake_telegram import FakeAsyncBotAPI, FakeBotAPI, make_message_update, percentile  # noqa: E402
+
+FLOW = [('255', 1), ('10', 1), ('Chuyển đổi sang tất cả các hệ', 1)]
+
+
+def run_threaded(chats, rounds, latency):
+    api = FakeBotAPI(latency=latency)
+    api.install()
+    latencies = []
+    lock = threading.Lock()
+
+    def chat(chat_id):
+        expected, local = 0, []
+        for _ in range(rounds):
+            for text, replies in FLOW:
+                expected += replies
+                start = time.perf_counter()
+                bot_main.bot.process_new_updates([types.Update.de_json(make_message_update(chat_id, text))])
+                if not api.wait_for(chat_id, expected, timeout=120):
+                    raise RuntimeError(f"chat {chat_id} không nhận được trả lời")
+                local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=chat, args=(20_000 + i,)) for i in range(chats)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    api.uninstall()
+    return latencies, elapsed
+
+
+async def run_async(chats, rounds, latency, workers, chat_rate, global_rate):
+    api = FakeAsyncBotAPI(latency=latency)
+    engine = AsyncEngine(bot_main.bot, bot_main.use_sender, api=api, workers=workers,
+                         chat_rate=chat_rate, chat_burst=max(2, chat_rate),
+                         global_rate=global_rate, global_burst=max(5, global_rate / 5))
+    latencies = []
+
+    async def chat(chat_id):
+        expected = 0
+        for _ in range(rounds):
+            for text, replies in FLOW:
+                expected += replies
+                start = time.perf_counter()
+                await engine.handle_update(types.Update.de_json(make_message_update(chat_id, text)))
+                if not await api.wait_for(chat_id, expected, timeout=120):
+                    raise RuntimeError(f"chat {chat_id} không nhận được trả lời")
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(chat(30_000 + i) for i in range(chats)))
+    await engine.join()
+    elapsed = time.perf_counter() - start
+
+    # Kiểm tra thứ tự: mỗi vòng phải kết thúc bằng lời nhắc bắt đầu phép chuyển đổi mới
+    for chat_id, texts in api.order.items():
+        assert len(texts) == rounds * sum(r for _, r in FLOW), (chat_id, len(texts))
+    engine.close()
+    return latencies, elapsed
+
+
+def report(label, latencies, elapsed):
+    print(f"{label:<10} {len(latencies) / elapsed:8.0f} update/s  "
+          f"p50={percentile(latencies, 0.5) * 1e3:8.2f}ms  p99={percentile(latencies, 0.99) * 1e3:8.2f}ms  "
+          f"({len(latencies)} update, {elapsed:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--chats', type=int, default=100)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--api-latency', type=float, default=0.05)
+    parser.add_argument('--workers', type=int, default=8)
+    # Bản đa luồng gửi thẳng không qua Outbox: mặc định bỏ giới hạn gửi để so sánh công bằng
+    parser.add_argument('--global-rate', type=float, default=100000.0, help="Giới hạn tin/giây toàn bot")
+    parser.add_argument('--chat-rate', type=float, default=1000.0, help="Giới hạn tin/giây mỗi chat")
+    args = parser.parse_args()
+    # Pool database đủ connection cho số worker đã chọn
+    bot_main.configure_workers(args.workers)
+
+    report('đa luồng', *run_threaded(args.chats, args.rounds, args.api_latency))
+    report('asyncio', *asyncio.run(run_async(args.chats, args.rounds, args.api_latency, args.workers,
+                                             args.chat_rate, args.global_rate)))
+
+
+if __name__ == '__main__':
+    main()
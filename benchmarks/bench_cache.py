@@ -0,0 +1,80 @@
+"""
+So sánh cache cũ (@lru_cache theo chuỗi gốc, giới hạn số mục) với
+ConversionCache (chuẩn hóa khóa, giới hạn theo byte).
+
+Luồng truy vấn mô phỏng: phân phối Zipf trên một tập số hex, mỗi lần người
+dùng gõ một biến thể khác nhau (chữ thường/hoa, thêm số 0 ở đầu).
+
+Chạy: python benchmarks/bench_cache.py [--queries 50000] [--distinct 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from functools import lru_cache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import converters  # noqa: E402
+
+
+def variants(rng, digits):
+    style = rng.random()
+    if style < 0.4:
+        return digits
+    if style < 0.7:
+        return digits.lower()
+    return '0' * rng.randrange(1, 4) + digits
+
+
+def workload(queries, distinct, rng):
+    numbers = [format(rng.getrandbits(rng.choice((8, 16, 32, 256, 4096))), 'X') for _ in range(distinct)]
+    weights = [1 / (i + 1) for i in range(distinct)]
+    picks = rng.choices(numbers, weights=weights, k=queries)
+    return [(variants(rng, n), 16, rng.choice((2, 8, 10))) for n in picks]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--queries', type=int, default=50000)
+    parser.add_argument('--distinct', type=int, default=20000)
+    parser.add_argument('--max-bytes', type=int, default=4 * 1024 * 1024)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    stream = workload(args.queries, args.distinct, rng)
+    raw = converters.convert_base_result.__wrapped__
+
+    legacy = lru_cache(maxsize=5000)(raw)
+    start = time.perf_counter()
+    for query in stream:
+        legacy(*query)
+    legacy_time = time.perf_counter() - start
+    info = legacy.cache_info()
+    # Ước lượng dung lượng lru_cache bằng cùng cách tính với ConversionCache
+    recent = list(dict.fromkeys(reversed(stream)))[:info.currsize]
+    estimate = converters.ConversionCache._estimate_size
+    legacy_bytes = sum(estimate(q) + estimate(raw(*q)) + converters.ConversionCache._ENTRY_OVERHEAD
+                       for q in recent)
+
+    cache = converters.ConversionCache(max_bytes=args.max_bytes)
+    shared = cache.cached('convert_base', converters._canonical_digits)(raw)
+    start = time.perf_counter()
+    for query in stream:
+        shared(*query)
+    shared_time = time.perf_counter() - start
+    stats = cache.stats()
+
+    print(f"lru_cache(5000):     hit rate {info.hits / (info.hits + info.misses):.1%}, "
+          f"{info.currsize} mục, ~{legacy_bytes / 1024:.0f} KiB dữ liệu (không giới hạn theo byte), "
+          f"{legacy_time:.2f}s")
+    print(f"ConversionCache:     hit rate {stats['convert_base']['hit_rate']:.1%}, "
+          f"{stats['_total']['entries']} mục, {stats['_total']['bytes'] / 1024:.0f} KiB "
+          f"(giới hạn {args.max_bytes / 1024:.0f} KiB), evictions {stats['convert_base']['evictions']}, "
+          f"{shared_time:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark convert_base: bản cũ (nối chuỗi, luôn tạo giải thích) so với bản
+mới (chỉ kết quả, hoặc kết quả + giải thích lazy tạo bằng ''.join).
+
+Chạy: python benchmarks/bench_convert_base.py [--sizes 10 100 1000 10000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import converters  # noqa: E402
+from legacy_converters import legacy_convert_base  # noqa: E402
+
+DIGITS = {2: '01', 8: '01234567', 10: '0123456789', 16: '0123456789ABCDEF'}
+PAIRS = [(2, 16), (16, 2), (16, 8), (2, 10), (10, 2)]
+
+
+def random_number(base, size, rng):
+    return rng.choice(DIGITS[base][1:]) + ''.join(rng.choice(DIGITS[base]) for _ in range(size - 1))
+
+
+def measure(func, min_time=0.2):
+    """Thời gian trung bình (giây) của một lần gọi func, None nếu lỗi."""
+    runs = 0
+    start = time.perf_counter()
+    try:
+        while True:
+            func()
+            runs += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                return elapsed / runs
+    except ValueError:
+        return None
+
+
+def fmt(seconds):
+    return '     lỗi' if seconds is None else f"{seconds * 1e3:8.3f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    def new_result(num, fb, tb):
+        converters.convert_base_result.cache_clear()
+        return converters.convert_base(num, fb, tb)[0]
+
+    def new_full(num, fb, tb):
+        converters.convert_base_result.cache_clear()
+        result, explanation = converters.convert_base(num, fb, tb)
+        return result, str(explanation)
+
+    print(f"{'cặp':>8} {'chữ số':>7} {'cũ (ms)':>9} {'kết quả':>9} {'đầy đủ':>9}")
+    for fb, tb in PAIRS:
+        for size in args.sizes:
+            num = random_number(fb, size, rng)
+            legacy = measure(lambda: legacy_convert_base(num, fb, tb))
+            result_only = measure(lambda: new_result(num, fb, tb))
+            full = measure(lambda: new_full(num, fb, tb))
+            print(f"{fb:>3}->{tb:<4} {size:>7} {fmt(legacy)} {fmt(result_only)} {fmt(full)}")
+
+
+if __name__ == '__main__':
+    main()
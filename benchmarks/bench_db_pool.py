@@ -0,0 +1,91 @@
+"""
+Benchmark độ trễ mỗi thao tác của DatabaseManager: connect-per-call (cũ)
+so với connection pool lâu dài (mới).
+
+Chạy: python benchmarks/bench_db_pool.py [--ops 2000] [--threads 4]
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Database của benchmark được tạo ở thư mục tạm
+os.chdir(tempfile.mkdtemp(prefix='bench_db_'))
+from storage import DatabaseManager  # noqa: E402
+
+
+class LegacyDatabaseManager(DatabaseManager):
+    """Hành vi cũ: mở connection và chạy PRAGMA cho mỗi lần gọi."""
+
+    @contextmanager
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_name, timeout=20)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA foreign_keys=ON')
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+
+def run(manager_cls, db_path, ops, threads):
+    db = manager_cls(db_path)
+    latencies = {'update_user_data': [], 'update_convert_all': [], 'add_conversion_history': []}
+    lock = threading.Lock()
+
+    def worker(offset):
+        local = {name: [] for name in latencies}
+        for i in range(ops // threads):
+            user = SimpleNamespace(id=offset * 100000 + i % 50, first_name='Bench',
+                                   last_name=str(offset), username=f'u{offset}')
+            for name, call in (
+                ('update_user_data', lambda: db.update_user_data(user)),
+                ('update_convert_all', lambda: db.update_convert_all(user.id)),
+                ('add_conversion_history', lambda: db.add_conversion_history(user.id, 'FF (base 16) -> 255 (base 10)')),
+            ):
+                start = time.perf_counter()
+                call()
+                local[name].append(time.perf_counter() - start)
+        with lock:
+            for name, values in local.items():
+                latencies[name].extend(values)
+
+    workers = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    db.close()
+    return latencies, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--ops', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    for label, cls in (('connect-per-call', LegacyDatabaseManager), ('pool', DatabaseManager)):
+        db_path = os.path.join(os.getcwd(), f'{label}.db')
+        latencies, elapsed = run(cls, db_path, args.ops, args.threads)
+        print(f"== {label} ({args.threads} threads, {elapsed:.2f}s)")
+        for name, values in latencies.items():
+            values.sort()
+            p50 = statistics.median(values) * 1e6
+            p99 = values[int(len(values) * 0.99) - 1] * 1e6
+            print(f"  {name:<24} p50={p50:8.1f}us  p99={p99:8.1f}us  n={len(values)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+So sánh cách telebot tự phân phối update (thread pool chung) với ChatDispatcher
+(chia theo chat + process pool cho phép chuyển đổi nặng).
+
+Ba loại chat chạy đồng thời:
+- chat thường: đi qua luồng chuyển đổi, chờ trả lời từng bước (đo độ trễ);
+- chat gửi dồn: gửi cả luồng liên tiếp không chờ (kiểm tra thứ tự xử lý);
+- chat nặng: liên tục chuyển đổi số thập phân rất dài sang tất cả các hệ.
+
+Chạy: python benchmarks/bench_dispatcher.py [--chats 30] [--rounds 5] [--heavy-digits 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+os.chdir(tempfile.mkdtemp(prefix='bench_dispatcher_'))
+from telebot import types  # noqa: E402
+import main as bot_main  # noqa: E402
+from dispatcher import ChatDispatcher  # noqa: E402
+from fake_telegram import FakeBotAPI, make_message_update, percentile  # noqa: E402
+
+FLOW = [('255', 1), ('10', 1), ('Chuyển đổi sang tất cả các hệ', 1)]
+ERROR_PREFIXES = ('Lỗi', 'Có lỗi', 'Lựa chọn không hợp lệ', 'Hệ cơ số không hợp lệ')
+
+
+def send(text, chat_id):
+    bot_main.bot.process_new_updates([types.Update.de_json(make_message_update(chat_id, text))])
+
+
+def run(label, api, args, chat_base):
+    latencies, stop = [], threading.Event()
+    lock = threading.Lock()
+    heavy_done = [0]
+
+    def light(chat_id):
+        expected, local = 0, []
+        for _ in range(args.rounds):
+            for text, replies in FLOW:
+                expected += replies
+                start = time.perf_counter()
+                send(text, chat_id)
+                if not api.wait_for(chat_id, expected, timeout=120):
+                    raise RuntimeError(f"chat {chat_id} không nhận được trả lời")
+                local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    def burst(chat_id):
+        for _ in range(args.rounds):
+            for text, _ in FLOW:
+                send(text, chat_id)
+
+    def heavy(chat_id):
+        rng = random.Random(chat_id)
+        expected = 0
+        while not stop.is_set():
+            number = str(rng.randrange(1, 10)) + ''.join(rng.choice('0123456789') for _ in range(args.heavy_digits - 1))
+            for text, replies in [(number, 1)] + FLOW[1:]:
+                expected += replies
+                send(text, chat_id)
+                if not api.wait_for(chat_id, expected, timeout=120):
+                    return
+            heavy_done[0] += 1
+
+    bursts = [chat_base + 1000 + i for i in range(args.chats)]
+    heavy_thread = threading.Thread(target=heavy, args=(chat_base + 2000,), daemon=True)
+    threads = [threading.Thread(target=light, args=(chat_base + i,)) for i in range(args.chats)]
+    threads += [threading.Thread(target=burst, args=(chat_id,)) for chat_id in bursts]
+
+    heavy_thread.start()
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    deadline = time.monotonic() + 10
+    ordered = sum(api.wait_for(chat_id, sum(r for _, r in FLOW) * args.rounds, timeout=max(0.0, deadline - time.monotonic()))
+                  for chat_id in bursts)
+    stop.set()
+    heavy_thread.join()
+
+    errors = sum(1 for chat_id in bursts for text in api.texts[chat_id] if text.startswith(ERROR_PREFIXES))
+    print(f"{label:<12} {len(latencies) / elapsed:7.0f} update/s  "
+          f"p50={percentile(latencies, 0.5) * 1e3:8.2f}ms  p99={percentile(latencies, 0.99) * 1e3:8.2f}ms  "
+          f"chat gửi dồn đúng: {ordered}/{len(bursts)} (tin lỗi: {errors})  "
+          f"phép nặng: {heavy_done[0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--chats', type=int, default=30)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--heavy-digits', type=int, default=100_000)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--api-latency', type=float, default=0.01)
+    args = parser.parse_args()
+    # Pool database đủ connection cho số worker đã chọn
+    bot_main.configure_workers(args.workers)
+
+    api = FakeBotAPI(latency=args.api_latency)
+    api.install()
+    run('telebot', api, args, 40_000)
+    # Chờ thread pool của telebot xử lý hết trước khi chuyển chế độ
+    while bot_main.bot.worker_pool.tasks.qsize():
+        time.sleep(0.05)
+    time.sleep(1)
+
+    dispatcher = ChatDispatcher(bot_main.bot, workers=args.workers).start()
+    run('dispatcher', api, args, 50_000)
+    dispatcher.stop()
+    print(f"dispatcher: {dispatcher.stats()}")
+    api.uninstall()
+
+
+if __name__ == '__main__':
+    main()
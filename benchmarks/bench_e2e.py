@@ -0,0 +1,227 @@
+"""
+Tải đầu-cuối qua toàn bộ bot: polling getUpdates -> ChatDispatcher -> handler
+(máy trạng thái, converter, SQLite) -> Outbox -> sendMessage, với Bot API giả
+chạy qua HTTP cục bộ (FakeBotAPIServer), không cần mạng.
+
+N chat chạy đồng thời, mỗi chat đi qua các luồng hội thoại chọn ngẫu nhiên:
+- co_so_tat_ca: nhập số -> chọn hệ 10 -> chuyển sang tất cả các hệ;
+- co_so_khac:   nhập số hex -> chọn hệ 16 -> chuyển sang hệ khác -> chọn hệ đích;
+- tu_nhan_dien: nhập số nhị phân -> tự động nhận diện -> hệ khác -> hệ 16;
+- so_am:        nhập số âm -> chọn số bit;
+- so_thuc:      nhập số thực -> chọn nhị phân đơn giản/hệ 8/hệ 16/IEEE 754.
+
+Độ trễ mỗi bước tính từ lúc update được đưa vào getUpdates đến khi chat nhận
+đủ câu trả lời. Mức tranh chấp database lấy từ histogram của các thao tác
+SQLite (METRICS=1), độ sâu hàng đợi ghi và thống kê pool connection.
+
+Outbox mặc định giữ giới hạn gửi của Telegram (25 tin/giây toàn bot), nên
+thông lượng bị chặn ở mức đó; --global-rate/--chat-rate lớn để đo riêng sức
+chứa của bot.
+
+Chạy: python benchmarks/bench_e2e.py [--chats 50] [--flows 4] [--workers 8]
+      [--api-latency 0.01] [--think-time 0] [--global-rate 25] [--chat-rate 1]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+os.environ.setdefault('METRICS', '1')
+os.environ.setdefault('no_proxy', '127.0.0.1,localhost')
+os.chdir(tempfile.mkdtemp(prefix='bench_e2e_'))
+import main as bot_main  # noqa: E402
+from converters import FLOAT_BASE_CHOICES, IEEE_CHOICES  # noqa: E402
+from dispatcher import ChatDispatcher  # noqa: E402
+from metrics import metrics  # noqa: E402
+from outbox import Outbox  # noqa: E402
+from fake_telegram import FakeBotAPI, FakeBotAPIServer, make_message_update, percentile  # noqa: E402
+
+ERROR_PREFIXES = ('Lỗi', 'Có lỗi', 'Lựa chọn không hợp lệ', 'Hệ cơ số không hợp lệ')
+FLOAT_CHOICES = list(FLOAT_BASE_CHOICES) + list(IEEE_CHOICES)
+
+
+# Mỗi luồng: danh sách (tên bước, tin nhắn, số câu trả lời mong đợi)
+def flow_base_all(rng):
+    return [('nhập số', str(rng.randrange(1, 10 ** 9)), 1),
+            ('chọn hệ vào', '10', 1),
+            ('tất cả các hệ', 'Chuyển đổi sang tất cả các hệ', 1)]
+
+
+def flow_base_other(rng):
+    return [('nhập số', format(rng.randrange(1, 2 ** 32), 'X'), 1),
+            ('chọn hệ vào', '16', 1),
+            ('hệ khác', 'Chuyển đổi sang hệ khác', 1),
+            ('chọn hệ đích', rng.choice(['2', '8', '10']), 1)]
+
+
+def flow_auto_detect(rng):
+    return [('nhập số', format(rng.randrange(2, 2 ** 24), 'b'), 1),
+            ('tự nhận diện', 'Tự động nhận diện', 2),
+            ('hệ khác', 'Chuyển đổi sang hệ khác', 1),
+            ('chọn hệ đích', '16', 1)]
+
+
+def flow_negative(rng):
+    bits = rng.choice([8, 16, 32, 64])
+    return [('nhập số', f'-{rng.randrange(1, 2 ** (bits - 1))}', 1),
+            ('chọn số bit', f'{bits} bit', 1)]
+
+
+def flow_float(rng):
+    return [('nhập số', f'{rng.randrange(1000)}.{rng.randrange(1, 1000):03d}', 1),
+            ('chọn cách đổi', rng.choice(FLOAT_CHOICES), 1)]
+
+
+FLOWS = {
+    'co_so_tat_ca': (flow_base_all, 3),
+    'co_so_khac': (flow_base_other, 3),
+    'tu_nhan_dien': (flow_auto_detect, 1),
+    'so_am': (flow_negative, 2),
+    'so_thuc': (flow_float, 2),
+}
+
+
+def start_bot(args):
+    """Dựng bot như main.main() ở chế độ polling, với giới hạn gửi chỉnh được."""
+    bot = bot_main.get_bot()
+    dispatcher = ChatDispatcher(bot, workers=args.workers).start()
+    outbox = Outbox(bot, chat_rate=args.chat_rate, chat_burst=max(2, args.chat_rate),
+                    global_rate=args.global_rate, global_burst=max(5, args.global_rate / 5)).start()
+    bot_main.set_default_sender(outbox)
+    metrics.add_collector('dispatcher', dispatcher.stats)
+    metrics.add_collector('outbox', outbox.stats)
+    thread = threading.Thread(target=bot.polling, kwargs={'none_stop': True, 'timeout': 5,
+                                                          'long_polling_timeout': 5},
+                              name='polling', daemon=True)
+    thread.start()
+    return bot, dispatcher, outbox, thread
+
+
+def run_chat(chat_id, server, args, latencies, counters, lock):
+    rng = random.Random(chat_id)
+    names = list(FLOWS)
+    weights = [FLOWS[name][1] for name in names]
+    expected = 0
+    local = defaultdict(list)
+    steps = [('bat_dau', [('lệnh start', '/start', 1)])]
+    steps += [(name, FLOWS[name][0](rng)) for name in rng.choices(names, weights=weights, k=args.flows)]
+    for flow, flow_steps in steps:
+        for step, text, replies in flow_steps:
+            expected += replies
+            start = time.perf_counter()
+            server.push(make_message_update(chat_id, text))
+            if not server.api.wait_for(chat_id, expected, timeout=args.timeout):
+                with lock:
+                    counters['timeouts'] += 1
+                    _merge(latencies, local)
+                return
+            local[(flow, step)].append(time.perf_counter() - start)
+            if args.think_time:
+                time.sleep(rng.uniform(0, 2 * args.think_time))
+        with lock:
+            counters['flows'] += 1
+    with lock:
+        _merge(latencies, local)
+
+
+def _merge(latencies, local):
+    for key, values in local.items():
+        latencies[key].extend(values)
+
+
+def sample_queues(stop, peaks, outbox, dispatcher):
+    """Ghi độ sâu lớn nhất của hàng đợi ghi, dispatcher và outbox."""
+    while not stop.wait(0.05):
+        peaks['writer'] = max(peaks['writer'], bot_main.writer.metrics()['queue_depth'])
+        peaks['dispatcher'] = max(peaks['dispatcher'], sum(dispatcher.stats()['queue_depth']))
+        peaks['outbox'] = max(peaks['outbox'], outbox.stats()['queue_depth'])
+
+
+def report(args, elapsed, latencies, counters, peaks, api, outbox):
+    updates = sum(len(values) for values in latencies.values())
+    print(f"{args.chats} chat, {counters['flows']} luồng xong, {updates} update trong {elapsed:.2f}s: "
+          f"{updates / elapsed:.0f} update/s, {counters['flows'] / elapsed:.1f} luồng/s, "
+          f"bot gửi {sum(api.sent.values())} tin, hết giờ chờ: {counters['timeouts']}")
+    errors = sum(1 for texts in api.texts.values() for text in texts if text.startswith(ERROR_PREFIXES))
+    if errors:
+        print(f"  cảnh báo: {errors} câu trả lời báo lỗi")
+
+    print("\nĐộ trễ đầu-cuối theo bước (update -> đủ câu trả lời):")
+    for (flow, step), values in sorted(latencies.items()):
+        print(f"  {flow + '/' + step:<30} n={len(values):<5} p50={percentile(values, 0.5) * 1e3:8.2f}ms  "
+              f"p99={percentile(values, 0.99) * 1e3:8.2f}ms")
+
+    print("\nTranh chấp database (thời gian mỗi thao tác, gồm cả chờ khóa):")
+    for (group, step), histogram in sorted(metrics.histograms().items()):
+        if group != 'db' or not histogram.count:
+            continue
+        print(f"  {step:<30} n={histogram.count:<5} p50={histogram.quantile(0.5) * 1e3:8.2f}ms  "
+              f"p99={histogram.quantile(0.99) * 1e3:8.2f}ms  lỗi={histogram.errors}")
+    writer = bot_main.writer.metrics()
+    print(f"  hàng đợi ghi: sâu nhất {peaks['writer']}, {writer['batches']} lô, "
+          f"trung bình {writer['avg_batch_size']:.1f} sự kiện/lô, lỗi {writer['failed_events']}")
+    print(f"  pool: {bot_main.db.pool_stats()}")
+
+    stats = outbox.stats()
+    print(f"\nHàng đợi sâu nhất: dispatcher {peaks['dispatcher']}, outbox {peaks['outbox']}; "
+          f"outbox p50={stats['latency_p50'] * 1e3:.1f}ms p99={stats['latency_p99'] * 1e3:.1f}ms, "
+          f"bị giới hạn tốc độ {stats['rate_limited']} lần")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chats', type=int, default=50)
+    parser.add_argument('--flows', type=int, default=4, help="Số luồng hội thoại mỗi chat")
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--api-latency', type=float, default=0.01, help="Độ trễ (giây) mỗi lời gọi Bot API")
+    parser.add_argument('--think-time', type=float, default=0.0,
+                        help="Thời gian suy nghĩ trung bình (giây) của người dùng giữa hai bước")
+    parser.add_argument('--global-rate', type=float, default=25.0, help="Giới hạn tin/giây toàn bot")
+    parser.add_argument('--chat-rate', type=float, default=1.0, help="Giới hạn tin/giây mỗi chat")
+    parser.add_argument('--timeout', type=float, default=60.0, help="Thời gian chờ tối đa một bước")
+    args = parser.parse_args()
+    # Pool database đủ connection cho số worker đã chọn
+    bot_main.configure_workers(args.workers)
+
+    server = FakeBotAPIServer(FakeBotAPI(latency=args.api_latency)).start()
+    server.install()
+    bot, dispatcher, outbox, polling = start_bot(args)
+    while not server.polls:
+        time.sleep(0.01)
+
+    latencies, counters, lock = defaultdict(list), defaultdict(int), threading.Lock()
+    peaks, stop = defaultdict(int), threading.Event()
+    sampler = threading.Thread(target=sample_queues, args=(stop, peaks, outbox, dispatcher), daemon=True)
+    sampler.start()
+    threads = [threading.Thread(target=run_chat, args=(100_000 + i, server, args, latencies, counters, lock))
+               for i in range(args.chats)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    sampler.join()
+
+    bot.stop_polling()
+    server.stop()
+    polling.join(10)
+    dispatcher.stop()
+    bot_main.writer.flush(10)
+    report(args, elapsed, latencies, counters, peaks, server.api, outbox)
+    outbox.close()
+    server.uninstall()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Bộ nhớ và thời gian xuất lịch sử (/export_all) trên database tạm: cách dựng
+danh sách trong bộ nhớ (fetchall + CSV trong StringIO + gzip.compress) so với
+xuất theo luồng (DatabaseManager.iter_history + export.write_export).
+
+Bộ nhớ đỉnh đo bằng tracemalloc (chỉ gồm cấp phát của Python).
+
+Chạy: python benchmarks/bench_export.py [--rows 200000] [--users 100]
+"""
+import argparse
+import csv
+import gzip
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from export import CSV_HEADER, write_export  # noqa: E402
+from storage import DatabaseManager  # noqa: E402
+
+
+def build(db, users, rows):
+    for user_id in range(1, users + 1):
+        db.update_user_data(SimpleNamespace(id=user_id, first_name='Bench', last_name=None,
+                                            username=f'bench{user_id}'))
+    now = int(time.time())
+    events = [('conversion', (1 + i % users, f'{i} (base 10) -> {i:b} (base 2)', now - rows + i))
+              for i in range(rows)]
+    for start in range(0, len(events), 5000):
+        db.write_batch(events[start:start + 5000])
+
+
+def export_in_memory(db):
+    """Cách hiển nhiên: đọc hết vào list rồi nén cả khối."""
+    with db.get_connection() as conn:
+        rows = conn.execute(
+            'SELECT id_tele, id, conversion_text, conversion_time FROM conversion_history ORDER BY id'
+        ).fetchall()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    writer.writerows((user_id, row_id, time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(when)), text)
+                     for user_id, row_id, text, when in rows)
+    return io.BytesIO(gzip.compress(buffer.getvalue().encode('utf-8'), compresslevel=6)), len(rows)
+
+
+def export_streaming(db):
+    return write_export(db.iter_history(), 'csv', include_user=True)
+
+
+def measure(func, db):
+    tracemalloc.start()
+    start = time.perf_counter()
+    document, count = func(db)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    size = document.seek(0, io.SEEK_END)
+    document.close()
+    return elapsed, peak, size, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--users', type=int, default=100)
+    args = parser.parse_args()
+
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(prefix='bench_export_'), 'bench.db'))
+    build(db, args.users, args.rows)
+    for label, func in (('trong bộ nhớ', export_in_memory), ('theo luồng', export_streaming)):
+        elapsed, peak, size, count = measure(func, db)
+        print(f"{label:<13} {count} dòng trong {elapsed:.2f}s, bộ nhớ đỉnh {peak / 1e6:7.1f} MB, "
+              f"tệp nén {size / 1e6:.1f} MB")
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Độ trễ lấy một trang /history theo độ sâu: phân trang OFFSET (cách hiển nhiên,
+chậm dần theo số trang) so với keyset trên index (id_tele, id) của
+DatabaseManager.get_history_page (như nhau ở mọi trang).
+
+Database tạm có --users người dùng, người dùng 1 có --rows dòng lịch sử xen
+kẽ với lịch sử của những người khác.
+
+Chạy: python benchmarks/bench_history_pages.py [--rows 100000] [--users 50] [--repeat 200]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from storage import DatabaseManager  # noqa: E402
+
+PAGE_SIZE = 10
+HEAVY_USER = 1
+
+SQL_OFFSET_PAGE = '''
+    SELECT id, conversion_text, conversion_time FROM conversion_history
+    WHERE id_tele = ? AND id > ?
+    ORDER BY id DESC
+    LIMIT ? OFFSET ?
+    '''
+
+
+def build(db, users, rows):
+    for user_id in range(1, users + 1):
+        db.update_user_data(SimpleNamespace(id=user_id, first_name='Bench', last_name=None,
+                                            username=f'bench{user_id}'))
+    owners = [HEAVY_USER] * rows + [user_id for user_id in range(2, users + 1) for _ in range(rows // users)]
+    random.Random(3).shuffle(owners)
+    now = int(time.time())
+    events = [('conversion', (user_id, f'{i} (base 10) -> {i:b} (base 2)', now)) for i, user_id in enumerate(owners)]
+    for start in range(0, len(events), 5000):
+        db.write_batch(events[start:start + 5000])
+
+
+def median_ms(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000, help="Số dòng lịch sử của người dùng 1")
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(prefix='bench_history_'), 'bench.db'))
+    build(db, args.users, args.rows)
+    with db.get_connection() as conn:
+        ids = [row[0] for row in conn.execute(
+            'SELECT id FROM conversion_history WHERE id_tele = ? ORDER BY id DESC', (HEAVY_USER,))]
+
+        def offset_page(page):
+            return conn.execute(SQL_OFFSET_PAGE, (HEAVY_USER, 0, PAGE_SIZE, page * PAGE_SIZE)).fetchall()
+
+        pages = len(ids) // PAGE_SIZE
+        print(f"Người dùng {HEAVY_USER}: {len(ids)} dòng ({pages} trang), median của {args.repeat} lần:")
+        for page in sorted({0, 10, 100, 1000, pages // 2, pages - 1}):
+            if page >= pages:
+                continue
+            # Con trỏ keyset: id cuối của trang trước
+            before_id = ids[page * PAGE_SIZE - 1] if page else None
+            keyset = db.get_history_page(HEAVY_USER, before_id=before_id, limit=PAGE_SIZE)[1]
+            assert keyset == offset_page(page)
+            offset_ms = median_ms(lambda: offset_page(page), args.repeat)
+            keyset_ms = median_ms(lambda: db.get_history_page(HEAVY_USER, before_id=before_id,
+                                                              limit=PAGE_SIZE), args.repeat)
+            print(f"  trang {page + 1:>6}: OFFSET {offset_ms:8.3f} ms   keyset {keyset_ms:6.3f} ms")
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark IEEE 754: bản cũ (log2 + nhân float từng bit) so với engine số nguyên.
+
+Đo độ chính xác so với struct (bit-exact) trên các số ngẫu nhiên gồm cả số
+không chuẩn, thời gian mỗi lần gọi (không cache) và thông lượng của đường
+NumPy theo mảng so với mã hóa từng số.
+
+Chạy: python benchmarks/bench_ieee.py [--samples 20000]
+"""
+import argparse
+import os
+import random
+import struct
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import converters  # noqa: E402
+from legacy_converters import legacy_decimal_to_ieee754, legacy_ieee754_to_decimal  # noqa: E402
+
+STRUCT_FORMATS = {32: ('<f', '<I'), 64: ('<d', '<Q')}
+
+
+def random_doubles(count, rng):
+    """Số thực ngẫu nhiên trên toàn miền double (một phần tư là số rất nhỏ/không chuẩn)."""
+    values = []
+    while len(values) < count:
+        value = struct.unpack('<d', struct.pack('<Q', rng.getrandbits(64)))[0]
+        if value != value or value in (float('inf'), float('-inf')):
+            continue
+        if len(values) % 4 == 0:
+            value = value % 1e-300 if value > 0 else -(abs(value) % 1e-300)
+        values.append(value)
+    return values
+
+
+def reference(value, bits):
+    float_fmt, int_fmt = STRUCT_FORMATS[bits]
+    try:
+        return format(struct.unpack(int_fmt, struct.pack(float_fmt, value))[0], f'0{bits}b')
+    except OverflowError:
+        return None
+
+
+def timed(func, values):
+    start = time.perf_counter()
+    results = [func(v) for v in values]
+    return results, (time.perf_counter() - start) / len(values)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--samples', type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(2024)
+    values = random_doubles(args.samples, rng)
+    new_encode = converters.decimal_to_ieee754.__wrapped__
+    new_decode = converters.ieee754_to_decimal.__wrapped__
+
+    print(f"{'':<24}{'sai (bản cũ)':>14}{'sai (mới)':>12}{'cũ µs/lần':>12}{'mới µs/lần':>12}")
+    for bits in (32, 64):
+        expected = [reference(v, bits) for v in values]
+        cases = [(v, e) for v, e in zip(values, expected) if e is not None]
+        inputs = [v for v, _ in cases]
+        old, old_time = timed(lambda v: legacy_decimal_to_ieee754(v, bits)[0], inputs)
+        new, new_time = timed(lambda v: new_encode(v, bits)[0], inputs)
+        old_wrong = sum(o != e for o, (_, e) in zip(old, cases))
+        new_wrong = sum(n != e for n, (_, e) in zip(new, cases))
+        print(f"{'số thực -> IEEE ' + str(bits):<24}{old_wrong:>14}{new_wrong:>12}"
+              f"{old_time * 1e6:>12.1f}{new_time * 1e6:>12.1f}")
+
+        patterns = [e for _, e in cases]
+        old, old_time = timed(lambda p: legacy_ieee754_to_decimal(p)[0], patterns)
+        new, new_time = timed(lambda p: new_decode(p)[0], patterns)
+        if bits == 32:
+            truth = [struct.unpack('<f', struct.pack('<I', int(p, 2)))[0] for p in patterns]
+        else:
+            truth = [struct.unpack('<d', struct.pack('<Q', int(p, 2)))[0] for p in patterns]
+        old_wrong = sum(o != t for o, t in zip(old, truth))
+        new_wrong = sum(n != t for n, t in zip(new, truth))
+        print(f"{'IEEE ' + str(bits) + ' -> số thực':<24}{old_wrong:>14}{new_wrong:>12}"
+              f"{old_time * 1e6:>12.1f}{new_time * 1e6:>12.1f}")
+
+    if converters._numpy() is None:
+        print("Không có NumPy, bỏ qua đường mã hóa theo mảng")
+        return
+    array = converters._numpy().asarray(values)
+    for bits in (16, 32, 64):
+        start = time.perf_counter()
+        encoded = converters.encode_ieee754_array(array, bits)
+        batch_time = time.perf_counter() - start
+        start = time.perf_counter()
+        scalar = [converters.encode_ieee754(v, bits) for v in values]
+        scalar_time = time.perf_counter() - start
+        mismatches = sum(int(a) != b for a, b in zip(encoded, scalar))
+        print(f"mảng {len(values)} số, {bits}-bit: NumPy {batch_time * 1e3:.2f}ms, "
+              f"từng số {scalar_time * 1e3:.1f}ms, khác nhau: {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
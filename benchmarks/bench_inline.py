@@ -0,0 +1,135 @@
+"""
+Chế độ inline: chi phí dựng bộ thẻ cho một query và số lần chuyển đổi/gọi
+answer_inline_query khi người dùng gõ từng ký tự.
+
+- Độ trễ một query: các converter đầy đủ (convert_base, convert_to_signed_binary,
+  decimal_to_ieee754, kể cả giải thích) so với đường chỉ tính kết quả
+  (inline.build_inline_results) và bộ thẻ đã có trong cache.
+- Gõ phím: N người dùng cùng gõ các số ví dụ, mỗi phím cách nhau --key-interval
+  giây; so sánh trả lời mọi phím với InlineDebouncer.
+
+Chạy: python benchmarks/bench_inline.py [--users 50] [--key-interval 0.08]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from converters import (conversion_cache, convert_base, convert_to_signed_binary,  # noqa: E402
+                        decimal_to_ieee754)
+from inline import (INLINE_BASES, INLINE_INT_IEEE_BITS, INLINE_SIGNED_BITS, InlineDebouncer,  # noqa: E402
+                    build_inline_results, cached_inline_results, inline_results)
+
+QUERIES = ('0xFF', '0b10110011', '255', '-128', '3.14', '0x7FFFFFFF', '123456789', '777 8')
+
+
+def full_conversions(text):
+    """Cùng các thẻ nhưng qua converter đầy đủ như khi chat riêng."""
+    if text.startswith('0x'):
+        num_str, from_base = text[2:], 16
+    elif text.startswith('0b'):
+        num_str, from_base = text[2:], 2
+    elif text.endswith(' 8'):
+        num_str, from_base = text[:-2], 8
+    elif '.' in text:
+        for bits in (16, 32, 64):
+            decimal_to_ieee754(text, bits)
+        return
+    else:
+        num_str, from_base = text, 10
+    if from_base == 10:
+        decimal = num_str
+    else:
+        decimal = convert_base(num_str, from_base, 10)[0]
+    for to_base in INLINE_BASES:
+        # Số âm chỉ có thẻ nhị phân có dấu và IEEE 754
+        if to_base != from_base and not decimal.startswith('-'):
+            str(convert_base(num_str, from_base, to_base)[1])
+    value = int(decimal)
+    for bits in INLINE_SIGNED_BITS:
+        if -(1 << (bits - 1)) <= value < (1 << (bits - 1)):
+            convert_to_signed_binary(decimal, bits)
+    for bits in INLINE_INT_IEEE_BITS:
+        decimal_to_ieee754(decimal, bits)
+
+
+def per_query(func, rounds, clear=True):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        if clear:
+            conversion_cache.clear()
+        for text in QUERIES:
+            func(text)
+    return (time.perf_counter() - start) / (rounds * len(QUERIES)) * 1e6
+
+
+def typing(users, key_interval, debounce):
+    """Mô phỏng `users` người dùng cùng gõ; trả về (số query, số lần trả lời, thời gian)."""
+    answered = []
+    lock = threading.Lock()
+
+    def answer(query):
+        results = inline_results(query.query)
+        with lock:
+            answered.append((query.query, len(results)))
+
+    debouncer = InlineDebouncer(answer, delay=debounce) if debounce else None
+
+    def user(user_id):
+        text = QUERIES[user_id % len(QUERIES)]
+        for i in range(1, len(text) + 1):
+            query = SimpleNamespace(id=f'{user_id}:{i}', query=text[:i],
+                                    from_user=SimpleNamespace(id=user_id))
+            if debouncer is None:
+                answer(query)
+            elif cached_inline_results(query.query) is not None:
+                with lock:
+                    answered.append((query.query, -1))
+            else:
+                debouncer.submit(user_id, query)
+            time.sleep(key_interval)
+
+    conversion_cache.clear()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=user, args=(user_id,)) for user_id in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if debouncer is not None:
+        time.sleep(debounce * 2)
+        debouncer.close()
+    elapsed = time.perf_counter() - start
+    submitted = sum(len(QUERIES[user_id % len(QUERIES)]) for user_id in range(users))
+    return submitted, len(answered), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rounds', type=int, default=500)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--key-interval', type=float, default=0.08)
+    parser.add_argument('--debounce', type=float, default=0.3)
+    args = parser.parse_args()
+
+    print("Độ trễ dựng bộ thẻ (µs/query):")
+    print(f"  converter đầy đủ   {per_query(full_conversions, args.rounds):8.1f}")
+    print(f"  chỉ tính kết quả   {per_query(build_inline_results, args.rounds):8.1f}")
+    for text in QUERIES:
+        inline_results(text)
+    print(f"  đã có trong cache  {per_query(cached_inline_results, args.rounds, clear=False):8.1f}")
+
+    print(f"\nGõ phím: {args.users} người dùng, mỗi phím cách {args.key_interval * 1000:.0f} ms")
+    for label, debounce in (('trả lời mọi phím', 0), (f'debounce {args.debounce:.2f}s', args.debounce)):
+        submitted, answered, elapsed = typing(args.users, args.key_interval, debounce)
+        print(f"  {label:<18} {submitted} query -> {answered} lần trả lời "
+              f"({answered / submitted:.0%}) trong {elapsed:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
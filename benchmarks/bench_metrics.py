@@ -0,0 +1,72 @@
+"""
+Đo chi phí của metrics.timed() khi tắt và khi bật, so với gọi hàm trực tiếp.
+
+Dùng convert_base_result (không qua cache) với đầu vào nhỏ - trường hợp
+phần đo chiếm tỉ lệ lớn nhất - và một luồng hội thoại đầy đủ qua handler.
+
+Chạy: python benchmarks/bench_metrics.py [--calls 200000] [--flows 2000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+os.chdir(tempfile.mkdtemp(prefix='bench_metrics_'))
+import main as bot_main  # noqa: E402
+from fake_telegram import FakeBotAPI, make_message_update  # noqa: E402
+from telebot import types  # noqa: E402
+
+FLOW = ('FF', '16', 'Chuyển đổi sang hệ khác', '2')
+
+
+def time_calls(func, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        func(str(i & 1023), 10, 2)
+    return (time.perf_counter() - start) / calls
+
+
+def time_flows(flows):
+    updates = [types.Update.de_json(make_message_update(1 + i % 50, text))
+               for i in range(flows) for text in FLOW]
+    start = time.perf_counter()
+    for update in updates:
+        bot_main.bot.process_new_updates([update])
+    return (time.perf_counter() - start) / flows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=200000)
+    parser.add_argument('--flows', type=int, default=2000)
+    args = parser.parse_args()
+
+    timed = bot_main.convert_base_result.__wrapped__
+    raw = timed.__wrapped__
+    api = FakeBotAPI()
+    api.install()
+    bot_main.bot.threaded = False
+
+    results = {}
+    for enabled in (False, True):
+        bot_main.metrics.enabled = enabled
+        results[enabled] = (time_calls(timed, args.calls), time_flows(args.flows))
+        bot_main.writer.flush()
+    baseline = time_calls(raw, args.calls)
+    api.uninstall()
+
+    print(f"Gọi trực tiếp:        {baseline * 1e6:.2f} µs/lần")
+    for enabled, label in ((False, 'tắt'), (True, 'bật')):
+        per_call, per_flow = results[enabled]
+        print(f"metrics {label}: converter {per_call * 1e6:.2f} µs/lần "
+              f"(+{(per_call - baseline) * 1e6:.2f} µs), luồng hội thoại {per_flow * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+So sánh gửi thẳng qua bot với Outbox khi Bot API giả lập áp dụng giới hạn flood
+(mặc định 3 tin/giây mỗi chat, 30 tin/giây toàn bot, vượt quá trả lỗi 429).
+
+Mỗi chat nhận một câu trả lời dài (nhiều phần 4096 ký tự) kèm lời nhắc cuối,
+gửi qua main.deliver như trong handler.
+
+Chạy: python benchmarks/bench_outbox.py [--chats 40] [--chunks 4]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+# Đo gửi nhiều tin nhắn nên không để câu trả lời dài chuyển thành tệp
+os.environ.setdefault('DOCUMENT_THRESHOLD', str(10 ** 9))
+os.chdir(tempfile.mkdtemp(prefix='bench_outbox_'))
+from telebot import types  # noqa: E402
+import main as bot_main  # noqa: E402
+from outbox import Outbox  # noqa: E402
+from fake_telegram import FakeBotAPI, make_message_update  # noqa: E402
+
+
+def run(label, api, args, chat_base):
+    text = ('0123456789ABCDEF' * 256) * args.chunks
+    text = text[:-200]
+    errors = [0]
+    lock = threading.Lock()
+
+    def chat(chat_id):
+        message = types.Update.de_json(make_message_update(chat_id, '255')).message
+        try:
+            bot_main.deliver(message, text, prompt=bot_main.NEW_CONVERSION_PROMPT)
+        except Exception:
+            with lock:
+                errors[0] += 1
+
+    rejected_before = api.rejected
+    threads = [threading.Thread(target=chat, args=(chat_base + i,)) for i in range(args.chats)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if isinstance(bot_main._default_sender, Outbox):
+        bot_main._default_sender.flush(120)
+    elapsed = time.perf_counter() - start
+
+    # Lời nhắc đã được ghép vào phần cuối nên mỗi chat cần đúng args.chunks tin
+    complete = sum(1 for i in range(args.chats)
+                   if api.sent[chat_base + i] == args.chunks
+                   and api.last_text[chat_base + i].endswith(bot_main.NEW_CONVERSION_PROMPT))
+    print(f"{label:<8} chat nhận đủ: {complete}/{args.chats}  tin gửi được: "
+          f"{sum(api.sent[chat_base + i] for i in range(args.chats))}  "
+          f"lỗi 429: {api.rejected - rejected_before}  ngoại lệ trong handler: {errors[0]}  "
+          f"thời gian: {elapsed:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--chats', type=int, default=40)
+    parser.add_argument('--chunks', type=int, default=4)
+    parser.add_argument('--api-latency', type=float, default=0.01)
+    args = parser.parse_args()
+
+    api = FakeBotAPI(latency=args.api_latency, chat_limit=3, global_limit=30)
+    api.install()
+    run('gửi thẳng', api, args, 60_000)
+    time.sleep(1.1)
+
+    outbox = Outbox(bot_main.bot).start()
+    bot_main.set_default_sender(outbox)
+    run('outbox', api, args, 70_000)
+    stats = outbox.stats()
+    print("outbox: " + ", ".join(f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+                                 for key, value in stats.items()))
+    outbox.close()
+    bot_main.set_default_sender(None)
+    api.uninstall()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Đo hệ thống giữ lịch sử (HistoryRetention) trên database tạm:
+
+- migration: dựng database theo schema cũ (conversion_time dạng chuỗi) rồi đo
+  thời gian nâng cấp lên schema hiện tại và VACUUM bật auto_vacuum;
+- /clear_history: DELETE từng dòng của người dùng (cách cũ) so với đặt mốc
+  history_floor (cách mới) cho một người dùng có nhiều lịch sử;
+- dọn lịch sử: số dòng và kích thước file trước/sau, độ trễ write_batch của
+  writer khi không dọn và khi thread dọn đang chạy song song.
+
+Chạy: python benchmarks/bench_retention.py [--users 200] [--rows 500] [--heavy-rows 50000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from storage import DatabaseManager, HistoryRetention  # noqa: E402
+from fake_telegram import percentile  # noqa: E402
+
+LEGACY_SCHEMA = '''
+CREATE TABLE users (
+    id_tele INTEGER PRIMARY KEY, hoten TEXT NOT NULL, username TEXT,
+    last_time_using TEXT NOT NULL, convert_all INTEGER DEFAULT 0
+);
+CREATE TABLE conversion_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, id_tele INTEGER NOT NULL,
+    conversion_text TEXT NOT NULL, conversion_time TEXT NOT NULL,
+    FOREIGN KEY (id_tele) REFERENCES users (id_tele) ON DELETE CASCADE
+);
+CREATE INDEX idx_conversion_history ON conversion_history(id_tele, conversion_time DESC);
+'''
+HEAVY_USER = 1
+
+
+def build_legacy(path, users, rows, heavy_rows):
+    """
+    Database schema cũ trải đều trong 3 năm (2/3 lịch sử đã quá một năm),
+    người dùng 1 có heavy_rows dòng; các dòng được ghi theo thứ tự thời gian.
+    """
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    counts = {user: rows for user in range(2, users + 2)}
+    counts[HEAVY_USER] = heavy_rows
+    conn.executemany("INSERT INTO users VALUES (?, 'bench', NULL, '', ?)", counts.items())
+    owners = [user for user, count in counts.items() for _ in range(count)]
+    random.Random(5).shuffle(owners)
+    start, step = time.time() - 3 * 365 * 86400, 3 * 365 * 86400 / len(owners)
+    conn.executemany(
+        "INSERT INTO conversion_history (id_tele, conversion_text, conversion_time) VALUES (?, ?, ?)",
+        [(user, f'{i} (base 10) -> {i:b} (base 2)',
+          time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start + i * step)))
+         for i, user in enumerate(owners)])
+    conn.commit()
+    conn.close()
+
+
+def history_rows(db):
+    with db.get_connection() as conn:
+        return conn.execute('SELECT COUNT(*) FROM conversion_history').fetchone()[0]
+
+
+def file_size(path):
+    return sum(os.path.getsize(path + suffix) for suffix in ('', '-wal') if os.path.exists(path + suffix))
+
+
+def writer_latencies(db, stop, samples):
+    """Mô phỏng writer: mỗi 5ms ghi một lô 20 lần chuyển đổi."""
+    latencies = []
+    for i in range(samples):
+        if stop is not None and stop.is_set():
+            break
+        events = [('conversion', (2 + (i + j) % 50, f'{j} (base 10) -> {j:b} (base 2)', int(time.time())))
+                  for j in range(20)]
+        start = time.perf_counter()
+        db.write_batch(events)
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.005)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--rows', type=int, default=500, help="Số dòng lịch sử mỗi người dùng")
+    parser.add_argument('--heavy-rows', type=int, default=50000, help="Số dòng của người dùng nhiều lịch sử nhất")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix='bench_retention_'), 'bench.db')
+    build_legacy(path, args.users, args.rows, args.heavy_rows)
+    start = time.perf_counter()
+    db = DatabaseManager(path)
+    migrated = history_rows(db)
+    print(f"Migration: {migrated} dòng trong {(time.perf_counter() - start) * 1000:.0f} ms")
+    # Database cũ bật auto_vacuum bằng bước riêng (python main.py --vacuum)
+    start = time.perf_counter()
+    db.vacuum()
+    print(f"VACUUM (--vacuum): {(time.perf_counter() - start) * 1000:.0f} ms, "
+          f"auto_vacuum = {db.page_stats()['auto_vacuum']}")
+
+    # Cách cũ: DELETE toàn bộ lịch sử của người dùng trong handler
+    with db.get_connection() as conn:
+        conn.execute('SAVEPOINT old_clear')
+        start = time.perf_counter()
+        conn.execute('DELETE FROM conversion_history WHERE id_tele = ?', (HEAVY_USER,))
+        conn.execute('UPDATE users SET convert_all = 0 WHERE id_tele = ?', (HEAVY_USER,))
+        old_clear = time.perf_counter() - start
+        conn.execute('ROLLBACK TO old_clear')
+        conn.execute('RELEASE old_clear')
+    start = time.perf_counter()
+    db.clear_user_history(HEAVY_USER)
+    new_clear = time.perf_counter() - start
+    print(f"/clear_history với {args.heavy_rows} dòng: DELETE {old_clear * 1000:.1f} ms, "
+          f"history_floor {new_clear * 1000:.2f} ms")
+
+    idle = writer_latencies(db, None, 200)
+    size_before = file_size(path)
+    retention = HistoryRetention(db, max_rows_per_user=args.rows // 2, max_age_days=365)
+    stop, result = threading.Event(), {}
+
+    def prune():
+        start = time.perf_counter()
+        result['deleted'] = retention.run_once()
+        result['seconds'] = time.perf_counter() - start
+        stop.set()
+
+    thread = threading.Thread(target=prune)
+    thread.start()
+    busy = writer_latencies(db, stop, 10 ** 6)
+    thread.join()
+
+    deleted = result['deleted']
+    print(f"Dọn lịch sử: {migrated} -> {history_rows(db)} dòng trong {result['seconds']:.2f}s "
+          f"(theo tuổi {deleted['age']}, vượt giới hạn {deleted['cap']}, đã xóa {deleted['cleared']}), "
+          f"file {size_before / 1e6:.1f} MB -> {file_size(path) / 1e6:.1f} MB")
+    print(f"write_batch khi rảnh:    p50={percentile(idle, 0.5) * 1000:6.2f} ms  p99={percentile(idle, 0.99) * 1000:6.2f} ms")
+    print(f"write_batch khi đang dọn: p50={percentile(busy, 0.5) * 1000:6.2f} ms  "
+          f"p99={percentile(busy, 0.99) * 1000:6.2f} ms  max={max(busy) * 1000:6.2f} ms  (n={len(busy)})")
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Đường cong thời gian chạy của convert_base theo số chữ số cho các đường hệ 10
+(chia để trị) so với thuật toán cũ theo từng chữ số.
+
+Chạy: python benchmarks/bench_scaling.py [--max-digits 64000] [--legacy-max 4000]
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import converters  # noqa: E402
+from legacy_converters import legacy_convert_base  # noqa: E402
+
+DIGITS = {2: '01', 10: '0123456789', 16: '0123456789ABCDEF'}
+PAIRS = [(10, 2), (10, 16), (2, 10), (16, 10)]
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--min-digits', type=int, default=1000)
+    parser.add_argument('--max-digits', type=int, default=64000)
+    parser.add_argument('--legacy-max', type=int, default=4000,
+                        help='Số chữ số tối đa chạy bản cũ (chậm, và int() giới hạn 4300 chữ số)')
+    args = parser.parse_args()
+    rng = random.Random(7)
+
+    sizes = []
+    size = args.min_digits
+    while size <= args.max_digits:
+        sizes.append(size)
+        size *= 2
+
+    for fb, tb in PAIRS:
+        print(f"== {fb} -> {tb}")
+        print(f"{'chữ số':>8} {'cũ (ms)':>10} {'kết quả':>10} {'+giải thích':>12} {'độ dốc':>7}")
+        previous = None
+        for size in sizes:
+            num = rng.choice(DIGITS[fb][1:]) + ''.join(rng.choice(DIGITS[fb]) for _ in range(size - 1))
+            legacy = '-'
+            if size <= args.legacy_max:
+                try:
+                    legacy = f"{timed(lambda: legacy_convert_base(num, fb, tb)) * 1e3:10.2f}"
+                except ValueError:
+                    legacy = 'lỗi'
+            converters.convert_base_result.cache_clear()
+            result_only = timed(lambda: converters.convert_base_result(num, fb, tb))
+            converters.convert_base_result.cache_clear()
+            full = timed(lambda: str(converters.convert_base(num, fb, tb)[1]))
+            # Độ dốc log-log: ~1 là tuyến tính, ~2 là bình phương
+            slope = '' if previous is None else f"{math.log(result_only / previous, 2):7.2f}"
+            previous = result_only
+            print(f"{size:>8} {legacy:>10} {result_only * 1e3:10.2f} {full * 1e3:12.2f} {slope:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Đo thời gian khởi động lạnh: mỗi phép đo chạy trong một tiến trình Python
+mới, tính từ lúc bắt đầu import đến khi xong.
+
+- converters / storage: những gì worker, benchmark hay test cần;
+- main: module bot, chưa tạo TeleBot và chưa mở database;
+- khởi động đầy đủ: tạo TeleBot, database, phiên hội thoại và kho kết quả
+  nóng - tương đương việc import main.py trước khi tách module.
+
+Chạy: python benchmarks/bench_startup.py [--runs 7]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = [
+    ('import converters', "import converters"),
+    ('import storage', "import storage"),
+    ('import main', "import main"),
+    ('khởi động đầy đủ', "import main; main.get_bot(); main.db.pool_stats(); main.writer.metrics(); "
+                         "main.sessions.stats(); main.warm_store.stats()"),
+]
+
+SCRIPT = """
+import os, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+{code}
+elapsed = time.perf_counter() - start
+print(elapsed, os.path.exists('bot_database.db'), 'numpy' in sys.modules, 'telebot' in sys.modules)
+"""
+
+
+def run_case(code):
+    workdir = tempfile.mkdtemp(prefix='bench_startup_')
+    env = dict(os.environ, BOT_TOKEN='123456:benchmark')
+    output = subprocess.run([sys.executable, '-c', SCRIPT.format(root=ROOT, code=code)],
+                            cwd=workdir, env=env, capture_output=True, text=True, check=True).stdout.split()
+    return float(output[0]), output[1] == 'True', output[2] == 'True', output[3] == 'True'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=7)
+    args = parser.parse_args()
+
+    for label, code in CASES:
+        samples = [run_case(code) for _ in range(args.runs)]
+        _, created_db, loaded_numpy, loaded_telebot = samples[-1]
+        print(f"{label:<18} {statistics.median(s[0] for s in samples) * 1000:7.1f} ms   "
+              f"database: {'có' if created_db else 'không'}, numpy: {'có' if loaded_numpy else 'không'}, "
+              f"telebot: {'có' if loaded_telebot else 'không'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Đo hiệu quả của kho kết quả nóng (WarmStartStore) ngay sau khi khởi động lại.
+
+Lịch sử giả lập: phân phối Zipf trên các đầu vào kinh điển (số âm 8 bit,
+byte hex, 0.1/0.5/3.14) trộn với các số ngẫu nhiên. Sau khi dựng kho, cache
+bị xóa để mô phỏng khởi động lại; so sánh N truy vấn đầu tiên khi cache lạnh
+và khi cache được nạp từ kho.
+
+Chạy: python benchmarks/bench_warm_start.py [--history 20000] [--queries 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+os.chdir(tempfile.mkdtemp(prefix='bench_warm_'))
+import main as bot_main  # noqa: E402
+
+IEEE32 = 'Chuyển sang IEEE 754 (32-bit)'
+
+
+def make_population(rng, size):
+    """Danh sách (conversion_text, hàm gọi lại) theo thứ tự phổ biến giảm dần."""
+    hot = []
+    for value in range(1, 129):
+        hot.append((f"-{value} (base 10) -> x (8-bit signed binary)",
+                    lambda v=value: bot_main.convert_to_signed_binary(f'-{v}', 8)))
+    for byte in range(256):
+        digits = format(byte, '02X')
+        hot.append((f"{digits} (base 16) -> x (base 2)",
+                    lambda d=digits: bot_main.convert_base_result(d, 16, 2)))
+    for num in ('0.1', '0.5', '3.14'):
+        hot.append((f"{num} -> x ({IEEE32})", lambda n=num: bot_main.decimal_to_ieee754(n, 32)))
+    rng.shuffle(hot)
+    cold = []
+    for _ in range(size):
+        num = str(rng.randrange(10 ** 6))
+        cold.append((f"{num} (base 10) -> x (base 16)",
+                     lambda n=num: bot_main.convert_base_result(n, 10, 16)))
+        real = f"{rng.randrange(1000)}.{rng.randrange(1000):03d}"
+        cold.append((f"{real} -> x ({IEEE32})", lambda r=real: bot_main.decimal_to_ieee754(r, 32)))
+    return hot + cold
+
+
+def seed_history(population, weights, rng, rows):
+    picks = rng.choices(population, weights=weights, k=rows)
+    with bot_main.db.get_connection() as conn:
+        conn.execute("INSERT OR IGNORE INTO users (id_tele, hoten, last_time_using) VALUES (1, 'bench', '')")
+        conn.executemany(
+            "INSERT INTO conversion_history (id_tele, conversion_text, conversion_time) VALUES (1, ?, 0)",
+            [(text,) for text, _ in picks]
+        )
+        conn.commit()
+
+
+def run_stream(stream, warm):
+    """Mô phỏng khởi động lại (xóa cache, nạp kho nếu warm) rồi chạy luồng truy vấn."""
+    bot_main.conversion_cache.clear()
+    if warm:
+        bot_main.warm_store.load()
+    before = {name: dict(c) for name, c in bot_main.conversion_cache.stats().items() if name != '_total'}
+    start = time.perf_counter()
+    for _, call in stream:
+        call()
+    elapsed = time.perf_counter() - start
+    hits = misses = 0
+    for name, counters in bot_main.conversion_cache.stats().items():
+        if name == '_total':
+            continue
+        hits += counters['hits'] - before.get(name, {}).get('hits', 0)
+        misses += counters['misses'] - before.get(name, {}).get('misses', 0)
+    return elapsed, hits / (hits + misses)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--history', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    population = make_population(rng, 5000)
+    weights = [1 / (i + 1) for i in range(len(population))]
+    seed_history(population, weights, rng, args.history)
+    stream = rng.choices(population, weights=weights, k=args.queries)
+
+    start = time.perf_counter()
+    stored = bot_main.warm_store.refresh()
+    refresh_time = time.perf_counter() - start
+
+    bot_main.conversion_cache.clear()
+    start = time.perf_counter()
+    loaded = bot_main.warm_store.load()
+    load_time = time.perf_counter() - start
+
+    cold_time, cold_rate = run_stream(stream, warm=False)
+    warm_time, warm_rate = run_stream(stream, warm=True)
+
+    print(f"Dựng kho: {stored} mục từ {args.history} dòng lịch sử trong {refresh_time * 1000:.0f} ms")
+    print(f"Nạp kho khi khởi động: {loaded} mục trong {load_time * 1000:.0f} ms")
+    print(f"{args.queries} truy vấn đầu tiên, cache lạnh: hit rate {cold_rate:.1%}, {cold_time * 1000:.0f} ms")
+    print(f"{args.queries} truy vấn đầu tiên, cache ấm:  hit rate {warm_rate:.1%}, {warm_time * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Đo thông lượng và độ trễ của chế độ webhook với Telegram giả lập cục bộ.
+
+Mỗi chat mô phỏng đi qua luồng: nhập số -> chọn hệ -> chuyển sang tất cả các hệ,
+chờ bot trả lời trước khi gửi bước tiếp theo.
+
+Chạy: python benchmarks/bench_webhook.py [--chats 50] [--rounds 5] [--api-latency 0.02]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+os.chdir(tempfile.mkdtemp(prefix='bench_webhook_'))
+import main as bot_main  # noqa: E402
+from dispatcher import ChatDispatcher  # noqa: E402
+from webhook import WebhookServer  # noqa: E402
+from fake_telegram import FakeBotAPI, FakeTelegramClient, make_message_update, percentile  # noqa: E402
+
+# (tin nhắn, số tin nhắn bot gửi lại)
+FLOW = [('255', 1), ('10', 1), ('Chuyển đổi sang tất cả các hệ', 1)]
+SECRET = 'bench-secret'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--chats', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--api-latency', type=float, default=0.0,
+                        help='Độ trễ giả lập (giây) của mỗi lời gọi Bot API')
+    args = parser.parse_args()
+
+    api = FakeBotAPI(latency=args.api_latency)
+    api.install()
+    # Như main(): webhook chỉ parse theo thứ tự nhận, ChatDispatcher chia theo chat
+    dispatcher = ChatDispatcher(bot_main.bot).start()
+    server = WebhookServer(bot_main.bot, '127.0.0.1', 0, secret=SECRET)
+    server.start()
+    url = f'http://127.0.0.1:{server.port}/webhook'
+
+    # Secret sai phải bị từ chối
+    assert FakeTelegramClient(url, 'sai').post(make_message_update(1, '1')) == 403
+
+    client = FakeTelegramClient(url, SECRET)
+    ack_latencies, e2e_latencies, failures = [], [], []
+    lock = threading.Lock()
+
+    def chat(chat_id):
+        expected = 0
+        local_ack, local_e2e = [], []
+        for _ in range(args.rounds):
+            for text, replies in FLOW:
+                expected += replies
+                start = time.perf_counter()
+                status = client.post(make_message_update(chat_id, text))
+                local_ack.append(time.perf_counter() - start)
+                if status != 200 or not api.wait_for(chat_id, expected):
+                    with lock:
+                        failures.append((chat_id, text, status))
+                    return
+                local_e2e.append(time.perf_counter() - start)
+        with lock:
+            ack_latencies.extend(local_ack)
+            e2e_latencies.extend(local_e2e)
+
+    threads = [threading.Thread(target=chat, args=(10_000 + i,)) for i in range(args.chats)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    server.stop()
+    dispatcher.stop()
+    api.uninstall()
+
+    updates = len(e2e_latencies)
+    print(f"{args.chats} chat x {args.rounds} vòng: {updates} update trong {elapsed:.2f}s "
+          f"({updates / elapsed:.0f} update/s), lỗi: {len(failures)}")
+    print(f"  ack HTTP  p50={percentile(ack_latencies, 0.5) * 1e3:7.2f}ms "
+          f"p99={percentile(ack_latencies, 0.99) * 1e3:7.2f}ms")
+    print(f"  end-to-end p50={percentile(e2e_latencies, 0.5) * 1e3:7.2f}ms "
+          f"p99={percentile(e2e_latencies, 0.99) * 1e3:7.2f}ms")
+    print(f"  server: {server.stats()}")
+    print(f"  Bot API: {dict(api.calls)}")
+
+
+if __name__ == '__main__':
+    main()
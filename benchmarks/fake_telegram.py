@@ -0,0 +1,329 @@
+"""
+Giả lập Telegram cục bộ cho benchmark, không cần mạng:
+
+- FakeBotAPI: thay cho HTTP request của telebot (apihelper.CUSTOM_REQUEST_SENDER),
+  ghi lại các lời gọi sendMessage/sendDocument theo chat.
+- FakeBotAPIServer: máy chủ HTTP cục bộ nói giao thức Bot API (getUpdates
+  long polling, sendMessage...) để chạy bot thật bằng polling, không cần mạng.
+- FakeAsyncBotAPI: tương tự cho engine asyncio.
+- FakeTelegramClient: gửi update tới webhook như máy chủ Telegram.
+"""
+import asyncio
+import http.client
+import itertools
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlparse
+
+from telebot import apihelper
+
+BOT_USER = {'id': 1, 'is_bot': True, 'first_name': 'Bot', 'username': 'bench_bot'}
+
+
+class FakeResponse:
+    def __init__(self, payload: dict, status_code: int = 200):
+        self.status_code = status_code
+        self._payload = payload
+        self.text = json.dumps(payload)
+        self.reason = 'OK' if status_code == 200 else 'Error'
+
+    def json(self):
+        return self._payload
+
+
+class FakeBotAPI:
+    """
+    Bot API giả: trả lời ngay (hoặc sau `latency` giây) và đếm tin nhắn theo chat.
+    
+    Nếu đặt chat_limit/global_limit, tin nhắn vượt quá số tin trong một giây
+    (theo chat / toàn bot) bị trả lỗi 429 kèm retry_after như Telegram thật.
+    """
+
+    def __init__(self, latency: float = 0.0, chat_limit: Optional[int] = None,
+                 global_limit: Optional[int] = None):
+        self.latency = latency
+        self.chat_limit = chat_limit
+        self.global_limit = global_limit
+        self._recent: Dict[int, deque] = defaultdict(deque)
+        self._recent_all: deque = deque()
+        self.rejected = 0
+        self._message_ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self.sent: Dict[int, int] = defaultdict(int)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.last_text: Dict[int, str] = {}
+        self.texts: Dict[int, List[str]] = defaultdict(list)
+
+    def __call__(self, method, url, params=None, files=None, timeout=None, proxies=None):
+        name = url.rsplit('/', 1)[-1]
+        params = params or {}
+        if self.latency:
+            time.sleep(self.latency)
+        if name == 'getMe':
+            return FakeResponse({'ok': True, 'result': BOT_USER})
+        if name == 'getUpdates':
+            return FakeResponse({'ok': True, 'result': []})
+
+        chat_id = int(params.get('chat_id', 0))
+        if self._flooded(chat_id):
+            return FakeResponse({'ok': False, 'error_code': 429,
+                                 'description': 'Too Many Requests: retry after 1',
+                                 'parameters': {'retry_after': 1}}, 429)
+        result = {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': BOT_USER,
+            'text': params.get('text', ''),
+        }
+        with self._cond:
+            self.calls[name] += 1
+            self.sent[chat_id] += 1
+            self.last_text[chat_id] = params.get('text', '')
+            self.texts[chat_id].append(params.get('text', name))
+            self._cond.notify_all()
+        return FakeResponse({'ok': True, 'result': result})
+
+    def _flooded(self, chat_id: int) -> bool:
+        if self.chat_limit is None and self.global_limit is None:
+            return False
+        now = time.monotonic()
+        with self._cond:
+            recent = self._recent[chat_id]
+            for window in (recent, self._recent_all):
+                while window and now - window[0] >= 1.0:
+                    window.popleft()
+            if ((self.chat_limit is not None and len(recent) >= self.chat_limit) or
+                    (self.global_limit is not None and len(self._recent_all) >= self.global_limit)):
+                self.rejected += 1
+                return True
+            recent.append(now)
+            self._recent_all.append(now)
+        return False
+
+    def wait_for(self, chat_id: int, count: int, timeout: float = 30.0) -> bool:
+        """Chờ đến khi chat đã nhận tổng cộng `count` tin nhắn từ bot."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self.sent[chat_id] < count:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def install(self) -> None:
+        apihelper.CUSTOM_REQUEST_SENDER = self
+
+    def uninstall(self) -> None:
+        apihelper.CUSTOM_REQUEST_SENDER = None
+
+
+class FakeBotAPIServer:
+    """
+    Bot API giả qua HTTP: telebot gọi tới như api.telegram.org (apihelper.API_URL).
+
+    getUpdates trả các update đã push() theo offset, chờ tối đa `timeout` giây
+    như long polling thật; mọi phương thức khác được chuyển cho FakeBotAPI để
+    ghi nhận tin nhắn theo chat.
+    """
+
+    def __init__(self, api: Optional[FakeBotAPI] = None, host: str = '127.0.0.1', port: int = 0):
+        self.api = api or FakeBotAPI()
+        self._cond = threading.Condition()
+        self._updates: deque = deque()
+        self._closed = False
+        self._previous_url = None
+        self.polls = 0
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/bot{{0}}/{{1}}'
+
+    def push(self, update: dict) -> None:
+        """Đưa một update vào hàng đợi cho lần getUpdates kế tiếp."""
+        with self._cond:
+            self._updates.append(update)
+            self._cond.notify_all()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._updates)
+
+    def _get_updates(self, params: dict) -> List[dict]:
+        offset = int(params.get('offset', 0))
+        limit = int(params.get('limit', 100))
+        deadline = time.monotonic() + float(params.get('timeout', 0))
+        with self._cond:
+            self.polls += 1
+            # offset xác nhận các update trước đó đã được nhận
+            while self._updates and self._updates[0]['update_id'] < offset:
+                self._updates.popleft()
+            while not self._updates and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return list(itertools.islice(self._updates, limit))
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Header và body được ghi riêng: tắt Nagle để không chờ delayed ACK (~40ms)
+            disable_nagle_algorithm = True
+
+            def _handle(self):
+                parsed = urlparse(self.path)
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                params = dict(parse_qsl(parsed.query))
+                if self.headers.get('Content-Type', '').startswith('application/x-www-form-urlencoded'):
+                    params.update(parse_qsl(body.decode()))
+                name = parsed.path.rsplit('/', 1)[-1]
+                if name == 'getUpdates':
+                    status, text = 200, json.dumps({'ok': True, 'result': server._get_updates(params)})
+                else:
+                    response = server.api('post', parsed.path, params=params)
+                    status, text = response.status_code, response.text
+                payload = text.encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = _handle
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> 'FakeBotAPIServer':
+        threading.Thread(target=self._server.serve_forever, name='fake-bot-api', daemon=True).start()
+        return self
+
+    def install(self) -> None:
+        """Trỏ telebot tới máy chủ này thay cho api.telegram.org."""
+        self._previous_url = apihelper.API_URL
+        apihelper.API_URL = self.url
+
+    def uninstall(self) -> None:
+        apihelper.API_URL = self._previous_url
+
+    def stop(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class FakeAsyncBotAPI:
+    """Bản bất đồng bộ của FakeBotAPI cho AsyncEngine (độ trễ bằng asyncio.sleep)."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.sent: Dict[int, int] = defaultdict(int)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.order: Dict[int, List[str]] = defaultdict(list)
+        self._waiters: Dict[int, List] = defaultdict(list)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        async def call(target, text=None, *args, **kwargs):
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            chat_id = target.chat.id if hasattr(target, 'chat') else int(target)
+            self.calls[name] += 1
+            self.sent[chat_id] += 1
+            self.order[chat_id].append(text if isinstance(text, str) else name)
+            for count, future in list(self._waiters[chat_id]):
+                if self.sent[chat_id] >= count and not future.done():
+                    future.set_result(True)
+
+        return call
+
+    async def wait_for(self, chat_id: int, count: int, timeout: float = 30.0) -> bool:
+        if self.sent[chat_id] >= count:
+            return True
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[chat_id].append((count, future))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._waiters[chat_id].remove((count, future))
+
+
+_update_ids = itertools.count(1)
+_message_ids = itertools.count(1)
+
+
+def make_message_update(chat_id: int, text: str) -> dict:
+    """Tạo update dạng JSON giống Telegram cho một tin nhắn văn bản riêng tư."""
+    user = {'id': chat_id, 'is_bot': False, 'first_name': 'User', 'last_name': str(chat_id),
+            'username': f'user{chat_id}'}
+    return {
+        'update_id': next(_update_ids),
+        'message': {
+            'message_id': next(_message_ids),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': user,
+            'text': text,
+        },
+    }
+
+
+class FakeTelegramClient:
+    """Gửi update tới webhook qua HTTP keep-alive (mỗi thread một connection)."""
+
+    def __init__(self, url: str, secret: Optional[str] = None):
+        parsed = urlparse(url)
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.path = parsed.path
+        self.secret = secret
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        return conn
+
+    def post(self, update: dict) -> int:
+        """Gửi một update, trả về HTTP status."""
+        body = json.dumps(update).encode()
+        headers = {'Content-Type': 'application/json'}
+        if self.secret is not None:
+            headers['X-Telegram-Bot-Api-Secret-Token'] = self.secret
+        conn = self._connection()
+        try:
+            conn.request('POST', self.path, body, headers)
+            response = conn.getresponse()
+            response.read()
+        except (http.client.HTTPException, OSError):
+            self._local.conn = None
+            conn.close()
+            raise
+        return response.status
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
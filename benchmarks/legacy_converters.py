@@ -0,0 +1,419 @@
+"""
+Bản sao nguyên văn các hàm chuyển đổi trước khi tối ưu, dùng làm mốc so sánh
+trong benchmark. Đã bỏ lru_cache để đo đúng chi phí tính toán.
+"""
+from typing import Dict, List, Tuple
+from math import log2, floor, isnan, isinf
+
+
+# Tạo lookup table để tối ưu việc chuyển đổi
+BINARY_LOOKUP: Dict[int, str] = {i: format(i, 'b') for i in range(256)}
+COMPLEMENT_TABLE = str.maketrans('01', '10')
+
+def _get_binary_str(num: int, bits: int) -> str:
+    """Helper function để cache các kết quả chuyển đổi phổ biến."""
+    if 0 <= num < 256:
+        return BINARY_LOOKUP[num].zfill(bits)
+    return format(num, f'0{bits}b')
+
+def legacy_convert_to_signed_binary(num_str: str, bits: int = 8) -> Tuple[str, str]:
+    """
+    Chuyển đổi số thập phân sang số nhị phân có dấu (phiên bản tối ưu).
+    """
+    try:
+        num = int(num_str)
+    except ValueError:
+        raise ValueError(f"'{num_str}' không phải là số nguyên hợp lệ")
+
+    is_negative = num < 0
+    abs_num = abs(num)
+    
+    # Kiểm tra giới hạn của số
+    max_value = (1 << (bits - 1)) - 1
+    min_value = -(1 << (bits - 1))
+    if not min_value <= num <= max_value:
+        raise ValueError(f"Số nằm ngoài phạm vi [{min_value}, {max_value}]")
+
+    explanation: List[str] = [f"Chuyển đổi {num_str} sang nhị phân có dấu:"]
+    
+    if is_negative:
+        explanation.append(f"1. Bỏ dấu trừ: {abs_num}")
+        
+        # Sử dụng helper function đã được cache
+        binary = _get_binary_str(abs_num, bits)
+        explanation.append(f"2. Chuyển sang nhị phân {bits}-bit: {binary}")
+        
+        # Tối ưu việc lấy bù 1 với translation table
+        complement_one = binary.translate(COMPLEMENT_TABLE)
+        explanation.append(f"3. Lấy bù 1 (đảo bit): {complement_one}")
+        
+        # Tối ưu việc lấy bù 2 với bitwise operations
+        complement_two = _get_binary_str((int(complement_one, 2) + 1) & ((1 << bits) - 1), bits)
+        explanation.append(f"4. Cộng thêm 1 để có bù 2: {complement_two}")
+        
+        return complement_two, '\n'.join(explanation)
+    
+    binary = _get_binary_str(abs_num, bits)
+    explanation.extend([
+        f"1. Chuyển sang nhị phân {bits}-bit: {binary}",
+        "Số dương nên không cần chuyển đổi thêm."
+    ])
+    
+    return binary, '\n'.join(explanation)
+
+def legacy_convert_float_to_binary(num_str: str, precision: int = 10) -> Tuple[str, str]:
+    """
+    Chuyển đổi số thực sang dạng nhị phân (phiên bản tối ưu).
+    """
+    # Validation
+    try:
+        num = float(num_str)
+    except ValueError:
+        raise ValueError(f"'{num_str}' không phải là số hợp lệ")
+    
+    if precision < 0:
+        raise ValueError("Độ chính xác không được là số âm")
+    
+    # Fast path cho các trường hợp đặc biệt
+    if num == 0:
+        return "0", "Số 0 trong hệ nhị phân là 0"
+    elif isnan(num):
+        return "NaN", "Không phải là số (NaN)"
+    elif isinf(num):
+        result = "-inf" if num < 0 else "inf"
+        return result, f"Số vô cùng ({result})"
+    
+    # Xử lý dấu
+    sign = "-" if num < 0 else "+"
+    num = abs(num)
+    
+    # Tối ưu việc tách phần nguyên và thập phân
+    int_part = int(num)
+    decimal_part = num - int_part
+    
+    # Chuyển đổi phần nguyên sử dụng helper function
+    int_binary = _get_binary_str(int_part, max(1, int_part.bit_length()))
+    
+    # Tối ưu việc chuyển đổi phần thập phân
+    binary_decimal = []
+    decimal_steps = []
+    current = decimal_part
+    
+    # Sử dụng loop được tối ưu
+    for _ in range(precision):
+        current *= 2
+        bit = int(current)
+        binary_decimal.append(str(bit))
+        
+        decimal_steps.append(
+            f"   * {decimal_part:.6f} × 2 = {current:.6f} → {bit}"
+        )
+        
+        if bit == 1:
+            current -= 1
+        
+        decimal_part = current
+        if decimal_part == 0:
+            break
+    
+    # Tạo kết quả
+    result = [sign, int_binary]
+    if binary_decimal:
+        result.extend([".", "".join(binary_decimal)])
+    
+    # Tạo giải thích
+    explanation = [
+        f"Chuyển đổi số thực {num_str} sang nhị phân:",
+        f"1. Xác định dấu: {sign}",
+        f"2. Chuyển đổi phần nguyên {int_part}:",
+        f"   {int_part} (10) = {int_binary} (2)"
+    ]
+    
+    if binary_decimal:
+        explanation.extend([
+            f"3. Chuyển đổi phần thập phân {num - int(num):.6f}:",
+            *decimal_steps
+        ])
+    else:
+        explanation.append("3. Không có phần thập phân")
+    
+    final_result = "".join(result)
+    explanation.append(f"Kết quả cuối cùng: {final_result}")
+    
+    return final_result, "\n".join(explanation)
+        
+# Constants
+HEX_DIGITS = "0123456789ABCDEF"
+HEX_TO_DEC: Dict[str, int] = {c: i for i, c in enumerate(HEX_DIGITS)}
+BINARY_TO_OCT = {format(i, '03b'): str(i) for i in range(8)}
+BINARY_TO_HEX = {format(i, '04b'): HEX_DIGITS[i] for i in range(16)}
+OCT_TO_BINARY = {str(i): format(i, '03b') for i in range(8)}
+HEX_TO_BINARY = {HEX_DIGITS[i]: format(i, '04b') for i in range(16)}
+
+def legacy_convert_base(num_str: str, from_base: int, to_base: int) -> Tuple[str, str]:
+    """
+    Chuyển đổi số từ hệ cơ số này sang hệ cơ số khác với giải thích chi tiết.
+    
+    Args:
+        num_str: Số cần chuyển đổi dưới dạng chuỗi
+        from_base: Hệ cơ số gốc (2, 8, 10, 16)
+        to_base: Hệ cơ số đích (2, 8, 10, 16)
+    
+    Returns:
+        Tuple gồm kết quả chuyển đổi và giải thích
+    """
+    if from_base == to_base:
+        return num_str, "Không cần chuyển đổi vì cùng hệ cơ số."
+        
+    num_str = num_str.upper()
+    explanation = f"Chuyển đổi {num_str} từ cơ số {from_base} sang cơ số {to_base}:\n\n"
+
+    # Chuyển đổi sang hệ 10
+    if to_base == 10:
+        result = 0
+        power = 1
+        base_name = "8" if from_base == 8 else "16" if from_base == 16 else "2"
+        explanation += f"Sử dụng phương pháp nhân với lũy thừa của {base_name}:\n"
+        
+        for i, digit in enumerate(reversed(num_str)):
+            if from_base == 16:
+                digit_value = HEX_TO_DEC[digit]
+            else:
+                digit_value = int(digit)
+            
+            contribution = digit_value * power
+            result += contribution
+            explanation += f"  {digit} * {base_name}^{i} = {digit_value} * {power} = {contribution}\n"
+            power *= from_base
+        
+        explanation += f"Tổng: {result}\n"
+        return str(result), explanation
+
+    # Chuyển từ hệ 10
+    if from_base == 10:
+        decimal = int(num_str)
+        if decimal == 0:
+            return "0", explanation + "Số 0 giống nhau ở mọi hệ cơ số."
+            
+        # Tìm lũy thừa lớn nhất
+        max_power = 0
+        temp = decimal
+        while temp >= to_base:
+            temp //= to_base
+            max_power += 1
+
+        explanation += f"1. Tìm lũy thừa lớn nhất của {to_base} không vượt quá {decimal}: {to_base}^{max_power} = {to_base**max_power}\n\n"
+        explanation += f"2. Xây dựng số từ trái sang phải:\n"
+
+        result = []
+        remaining = decimal
+
+        for power in range(max_power, -1, -1):
+            value = to_base ** power
+            quotient = remaining // value
+            digit = HEX_DIGITS[quotient] if to_base == 16 else str(quotient)
+            result.append(digit)
+            remaining -= quotient * value
+            explanation += f"  - {remaining + quotient * value} ÷ {to_base}^{power} = {quotient}"
+            if to_base == 16:
+                explanation += f" ({digit})"
+            explanation += f" (dư {remaining})\n"
+
+        return ''.join(result), explanation
+
+    # Chuyển đổi trực tiếp giữa hệ 2, 8, 16
+    if from_base == 2:
+        if to_base == 8:
+            padding = '0' * ((3 - len(num_str) % 3) % 3)
+            padded = padding + num_str
+            groups = [padded[i:i+3] for i in range(0, len(padded), 3)]
+            
+            explanation += "Nhóm các bit thành nhóm 3 bit:\n"
+            result = []
+            
+            for group in groups:
+                oct_digit = BINARY_TO_OCT[group]
+                result.append(oct_digit)
+                explanation += f"  {group} (2) = {oct_digit} (8)\n"
+            
+            final_result = ''.join(result).lstrip('0') or '0'
+            explanation += f"Kết quả cuối cùng: {final_result}\n"
+            return final_result, explanation
+            
+        if to_base == 16:
+            padding = '0' * ((4 - len(num_str) % 4) % 4)
+            padded = padding + num_str
+            groups = [padded[i:i+4] for i in range(0, len(padded), 4)]
+            
+            explanation += "Nhóm các bit thành nhóm 4 bit:\n"
+            result = []
+            
+            for group in groups:
+                hex_digit = BINARY_TO_HEX[group]
+                result.append(hex_digit)
+                explanation += f"  {group} (2) = {hex_digit} (16)\n"
+            
+            final_result = ''.join(result).lstrip('0') or '0'
+            explanation += f"Kết quả cuối cùng: {final_result}\n"
+            return final_result, explanation
+
+    if from_base in [8, 16] and to_base == 2:
+        explanation += f"Chuyển đổi từng chữ số sang nhị phân:\n"
+        result = []
+        
+        for digit in num_str:
+            if from_base == 8:
+                binary = OCT_TO_BINARY[digit]
+            else:
+                binary = HEX_TO_BINARY[digit]
+            result.append(binary)
+            explanation += f"  {digit} ({from_base}) = {binary} (2)\n"
+        
+        final_result = ''.join(result).lstrip('0') or '0'
+        explanation += f"Ghép các nhóm bit lại: {final_result}\n"
+        return final_result, explanation
+
+    # Chuyển đổi gián tiếp qua hệ nhị phân
+    binary, first_exp = legacy_convert_base(num_str, from_base, 2)
+    result, second_exp = legacy_convert_base(binary, 2, to_base)
+    explanation = first_exp + "\nSau đó:\n" + second_exp
+    return result, explanation
+
+def _get_ieee_params(bits: int) -> Tuple[int, int, int]:
+    """Cache các thông số IEEE 754 để tránh tính toán lặp lại."""
+    if bits == 32:
+        return 8, 23, 127
+    elif bits == 64:
+        return 11, 52, 1023
+    raise ValueError("Số bit phải là 32 hoặc 64")
+
+def _fast_binary_conversion(fraction: float, max_bits: int) -> str:
+    """Chuyển đổi phần thập phân sang nhị phân nhanh hơn sử dụng phép nhân 2."""
+    result = []
+    while fraction > 0 and len(result) < max_bits:
+        fraction *= 2
+        if fraction >= 1:
+            result.append('1')
+            fraction -= 1
+        else:
+            result.append('0')
+    return ''.join(result)
+
+def legacy_decimal_to_ieee754(num: float, bits: int = 32) -> Tuple[str, str]:
+    """
+    Chuyển đổi số thực sang dạng IEEE 754 (phiên bản tối ưu).
+    """
+    exp_bits, mantissa_bits, bias = _get_ieee_params(bits)
+    explanation = [f"Chuyển đổi {num} sang IEEE 754 {bits}-bit:"]
+    
+    # Xử lý các trường hợp đặc biệt với lookup dictionary
+    special_cases = {
+        0: ('0' * bits, "Số 0 được biểu diễn bằng tất cả các bit 0"),
+        float('inf'): ('0' + '1' * exp_bits + '0' * mantissa_bits, "Số dương vô cùng"),
+        float('-inf'): ('1' + '1' * exp_bits + '0' * mantissa_bits, "Số âm vô cùng")
+    }
+    
+    if num != num:  # NaN
+        return ('0' + '1' * exp_bits + '1' + '0' * (mantissa_bits - 1),
+                '\n'.join(explanation + ["Không phải là số (NaN)"]))
+                
+    if num in special_cases:
+        return special_cases[num]
+
+    # Xác định bit dấu và chuyển về số dương
+    sign = '1' if num < 0 else '0'
+    num = abs(num)
+    explanation.append(f"1. Bit dấu: {sign} ({'âm' if num < 0 else 'dương'})")
+
+    # Tối ưu việc tìm số mũ cho số >= 1
+    if num >= 1:
+        exp = floor(log2(num))
+        mantissa_val = num / (2 ** exp) - 1
+    else:
+        exp = floor(log2(num))
+        mantissa_val = (num / (2 ** exp)) - 1
+
+    # Kiểm tra giới hạn số mũ
+    biased_exp = exp + bias
+    if biased_exp <= 0:
+        return '0' * bits, '\n'.join(explanation + ["Số quá nhỏ, được biểu diễn là 0"])
+    if biased_exp >= (1 << exp_bits) - 1:
+        return (sign + '1' * exp_bits + '0' * mantissa_bits,
+                '\n'.join(explanation + ["Số quá lớn, được biểu diễn là vô cùng"]))
+
+    # Tính mantissa
+    mantissa = _fast_binary_conversion(mantissa_val, mantissa_bits)
+    mantissa = (mantissa + '0' * mantissa_bits)[:mantissa_bits]
+    
+    # Tạo kết quả
+    biased_exp_binary = format(biased_exp, f'0{exp_bits}b')
+    result = sign + biased_exp_binary + mantissa
+    
+    # Tạo giải thích
+    explanation.extend([
+        f"2. Số mũ thực: {exp}",
+        f"3. Số mũ bias (E = e + {bias}): {biased_exp}",
+        f"4. Số mũ nhị phân: {biased_exp_binary}",
+        f"5. Mantissa: {mantissa}",
+        f"\nKết quả: {result}",
+        f"- Bit dấu (1 bit): {sign}",
+        f"- Số mũ ({exp_bits} bits): {biased_exp_binary}",
+        f"- Mantissa ({mantissa_bits} bits): {mantissa}"
+    ])
+    
+    return result, '\n'.join(explanation)
+
+def legacy_ieee754_to_decimal(binary: str) -> Tuple[float, str]:
+    """
+    Chuyển đổi số IEEE 754 sang số thực (phiên bản tối ưu).
+    """
+    bits = len(binary.strip())
+    exp_bits, mantissa_bits, bias = _get_ieee_params(bits)
+    
+    # Validation nhanh với set
+    if not set(binary).issubset({'0', '1'}):
+        raise ValueError("Chuỗi nhị phân chỉ được chứa ký tự 0 và 1")
+
+    explanation = [f"Chuyển đổi IEEE 754 {bits}-bit sang số thực:"]
+    
+    # Tách các phần
+    sign_bit = binary[0]
+    exp_bits_str = binary[1:exp_bits + 1]
+    mantissa_bits_str = binary[exp_bits + 1:]
+    
+    explanation.extend([
+        "1. Tách các thành phần:",
+        f"   - Bit dấu: {sign_bit} ({'âm' if sign_bit == '1' else 'dương'})",
+        f"   - Số mũ (biased): {exp_bits_str}",
+        f"   - Mantissa: {mantissa_bits_str}"
+    ])
+
+    # Chuyển đổi số mũ nhanh hơn với int
+    exp_val = int(exp_bits_str, 2)
+    
+    # Xử lý các trường hợp đặc biệt
+    if exp_val == 0:
+        if int(mantissa_bits_str, 2) == 0:
+            return 0.0 if sign_bit == '0' else -0.0, '\n'.join(explanation + ["Số zero (±0)"])
+    elif exp_val == (1 << exp_bits) - 1:
+        if int(mantissa_bits_str, 2) == 0:
+            return float('inf') if sign_bit == '0' else float('-inf'), '\n'.join(explanation + ["Số vô cùng (±∞)"])
+        return float('nan'), '\n'.join(explanation + ["Không phải là số (NaN)"])
+
+    # Tính toán mantissa hiệu quả hơn
+    mantissa = 1.0 if exp_val != 0 else 0.0
+    for i, bit in enumerate(mantissa_bits_str, 1):
+        if bit == '1':
+            mantissa += 2.0 ** -i
+
+    # Tính kết quả cuối cùng
+    exp = exp_val - bias if exp_val != 0 else 1 - bias
+    result = (-1.0 if sign_bit == '1' else 1.0) * mantissa * (2.0 ** exp)
+    
+    explanation.extend([
+        f"2. Số mũ thực = {exp_val} - {bias} = {exp}",
+        f"3. Giá trị mantissa = {mantissa:.10f}",
+        f"\nKết quả = {'-1' if sign_bit == '1' else '1'} × {mantissa:.10f} × 2^{exp} = {result}"
+    ])
+    
+    return result, '\n'.join(explanation)
@@ -0,0 +1,232 @@
+"""
+Bộ benchmark tái lập được cho các converter và DatabaseManager.
+
+Mỗi trường hợp được đo bằng timeit: tự chọn số lần gọi sao cho một lượt dài
+ít nhất --min-time giây, chạy --rounds lượt, ghi trung vị và lượt nhanh nhất
+của thời gian mỗi lần gọi (--compare so sánh theo lượt nhanh nhất). Converter
+được gọi không qua cache (__wrapped__) để đo đúng chi phí tính toán;
+DatabaseManager chạy trên database tạm.
+
+Chạy:
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --filter convert_base --rounds 3
+    python benchmarks/run.py --compare baseline.json --threshold 0.25
+        (thoát với mã 1 nếu có trường hợp chậm hơn baseline quá 25%)
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import converters  # noqa: E402
+from storage import DatabaseManager  # noqa: E402
+
+BASES = (2, 8, 10, 16)
+SIZES = (8, 64, 512, 4096)
+DIGITS = {2: '01', 8: '01234567', 10: '0123456789', 16: '0123456789ABCDEF'}
+
+
+def _raw(func):
+    """Hàm chuyển đổi gốc, bỏ qua cache và metrics."""
+    while hasattr(func, '__wrapped__'):
+        func = func.__wrapped__
+    return func
+
+
+def _number(base, size, seed):
+    # Số giả ngẫu nhiên cố định để mọi lần chạy đo cùng một đầu vào
+    digits = DIGITS[base]
+    value = [digits[1 + seed % (base - 1)]]
+    state = seed
+    for _ in range(size - 1):
+        state = (state * 1103515245 + 12345) & 0x7FFFFFFF
+        value.append(digits[state % base])
+    return ''.join(value)
+
+
+def converter_cases():
+    cases = {}
+    convert_base_result = _raw(converters.convert_base_result)
+    for from_base in BASES:
+        for to_base in BASES:
+            if from_base == to_base:
+                continue
+            for size in SIZES:
+                num = _number(from_base, size, size + from_base)
+                cases[f'convert_base/{from_base}->{to_base}/{size}'] = (
+                    lambda n=num, f=from_base, t=to_base: convert_base_result(n, f, t))
+    for size in SIZES[:3]:
+        num = _number(16, size, size)
+        cases[f'convert_base_explained/16->2/{size}'] = (
+            lambda n=num: str(converters.convert_base(n, 16, 2)[1]))
+
+    signed = _raw(converters.convert_to_signed_binary)
+    for num, bits in (('-1', 8), ('-128', 8), ('-32768', 16), ('-2147483648', 32),
+                      ('-9223372036854775808', 64)):
+        cases[f'convert_to_signed_binary/{bits}/{num}'] = lambda n=num, b=bits: signed(n, b)
+    signed_result = _raw(converters.signed_binary_result)
+    for num, bits in (('-128', 8), ('-9223372036854775808', 64)):
+        cases[f'signed_binary_result/{bits}/{num}'] = lambda n=num, b=bits: signed_result(n, b)
+
+    float_binary = _raw(converters.convert_float_to_binary)
+    for num in ('0.1', '3.14159', '123.456'):
+        for base in (2, 8, 16):
+            cases[f'convert_float_to_binary/{base}/{num}'] = (
+                lambda n=num, b=base: float_binary(n, converters.FLOAT_PRECISION, b))
+
+    to_ieee = _raw(converters.decimal_to_ieee754)
+    for num in ('0.1', '3.14', '1e-40'):
+        for bits in (16, 32, 64, 128):
+            cases[f'decimal_to_ieee754/{bits}/{num}'] = lambda n=num, b=bits: to_ieee(n, b)
+    ieee_result = _raw(converters.ieee754_result)
+    for bits in (16, 32, 64):
+        cases[f'ieee754_result/{bits}/3.14'] = lambda b=bits: ieee_result('3.14', b)
+
+    from_ieee = _raw(converters.ieee754_to_decimal)
+    for bits in (32, 64, 128):
+        pattern = format(converters.encode_ieee754('3.14', bits), f'0{bits}b')
+        cases[f'ieee754_to_decimal/{bits}'] = lambda p=pattern: from_ieee(p)
+
+    for label, num in (('binary', '1011' * 8), ('octal', '7654' * 8),
+                       ('decimal', '9876' * 8), ('hex', 'FACE' * 8)):
+        cases[f'detect_base/{label}'] = lambda n=num: converters.detect_base(n)
+    return cases
+
+
+def db_cases():
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(prefix='bench_run_'), 'bench_run.db'))
+    user = SimpleNamespace(id=1, first_name='Bench', last_name='User', username='bench')
+    db.update_user_data(user)
+    now = int(time.time())
+    history = [('conversion', (1, f'{i} (base 10) -> {i:b} (base 2)', now)) for i in range(50)]
+    db.write_batch(history * 20)
+    sessions = [(i, '{"step": "input_to_base", "number": "FF"}', time.time()) for i in range(100)]
+    warm = [('convert_base', json.dumps([f'{i:X}', 16, 2]), json.dumps(f'{i:b}'), i) for i in range(500)]
+    counter = iter(range(10 ** 9))
+
+    def changed_profile():
+        user.first_name = f'Bench{next(counter)}'
+        db.update_user_data(user)
+
+    def touches():
+        db.update_user_data(user)
+        db.flush_user_touches()
+
+    def clear_and_refill():
+        db.clear_user_history(1)
+        db.write_batch(history[:10])
+
+    cases = {
+        'db/update_user_data/cached': lambda: db.update_user_data(user),
+        'db/update_user_data/changed': changed_profile,
+        'db/flush_user_touches': touches,
+        'db/update_convert_all': lambda: db.update_convert_all(1),
+        'db/add_conversion_history': lambda: db.add_conversion_history(1, '1 (base 10) -> 1 (base 2)'),
+        'db/write_batch/50': lambda: db.write_batch(history),
+        'db/get_user_history': lambda: db.get_user_history(1),
+        'db/get_history_page/first': lambda: db.get_history_page(1),
+        # id 1..1000 là lịch sử ban đầu: trang gần cuối, trước khi clear đặt mốc
+        'db/get_history_page/deep': lambda: db.get_history_page(1, before_id=20),
+        'db/clear_user_history': clear_and_refill,
+        'db/save_sessions/100': lambda: db.save_sessions(sessions),
+        'db/load_sessions/100': db.load_sessions,
+        'db/save_warm_conversions/500': lambda: db.save_warm_conversions(warm),
+        'db/load_warm_conversions/500': lambda: db.load_warm_conversions(500),
+        'db/conversion_frequencies': lambda: db.conversion_frequencies(5000),
+        'db/usage_summary': db.usage_summary,
+    }
+    return cases, db
+
+
+def measure(func, rounds, min_time):
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time or number >= 10 ** 6:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    samples = sorted(t / number for t in timer.repeat(rounds, number))
+    return {'median_s': samples[len(samples) // 2], 'min_s': samples[0], 'calls': number, 'rounds': rounds}
+
+
+def metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ''
+    return {'python': platform.python_version(), 'platform': platform.platform(),
+            'machine': platform.machine(), 'commit': commit,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def compare(results, baseline, threshold):
+    """In bảng so sánh, trả về danh sách trường hợp chậm đi quá ngưỡng."""
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None:
+            print(f"  {name:<45} {result['median_s'] * 1e6:>12.2f} µs   (mới)")
+            continue
+        # So sánh lượt nhanh nhất: ít bị nhiễu bởi các tiến trình khác hơn trung vị
+        ratio = result['min_s'] / old['min_s'] if old['min_s'] else 1.0
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  CHẬM HƠN'
+            regressions.append(name)
+        print(f"  {name:<45} {result['median_s'] * 1e6:>12.2f} µs   x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filter', action='append', default=[],
+                        help="Chỉ chạy trường hợp có tên chứa chuỗi này (có thể lặp lại)")
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.05,
+                        help="Thời gian tối thiểu (giây) của một lượt đo")
+    parser.add_argument('--output', help="Ghi kết quả dạng JSON vào tệp này")
+    parser.add_argument('--compare', help="Tệp JSON kết quả cũ để so sánh")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Tỉ lệ chậm đi tối đa cho phép khi --compare (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    cases = converter_cases()
+    database_cases, db = db_cases()
+    cases.update(database_cases)
+    if args.filter:
+        cases = {name: func for name, func in cases.items() if any(f in name for f in args.filter)}
+
+    results = {}
+    for name, func in cases.items():
+        results[name] = measure(func, args.rounds, args.min_time)
+        if not args.compare:
+            print(f"  {name:<45} {results[name]['median_s'] * 1e6:>12.2f} µs")
+    db.close()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'meta': metadata(), 'results': results}, f, indent=2, ensure_ascii=False)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} trường hợp chậm hơn baseline quá {args.threshold:.0%}")
+            sys.exit(1)
+        print("Không có trường hợp nào chậm hơn ngưỡng")
+
+
+if __name__ == '__main__':
+    main()
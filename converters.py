@@ -0,0 +1,1273 @@
+"""
+Các hàm chuyển đổi hệ số của bot: hệ 2/8/10/16, số âm (bù 2), số thực sang
+nhị phân/bát phân/thập lục phân, IEEE 754 và chế độ hàng loạt.
+
+Module không phụ thuộc telebot hay database nên có thể import riêng (worker
+của process pool, benchmark) mà không phải khởi tạo bot. NumPy là tùy chọn và
+chỉ được import khi cần lần đầu.
+"""
+import atexit
+import decimal
+import logging
+import os
+import re
+import struct
+import sys
+import threading
+from collections import OrderedDict
+from fractions import Fraction
+from functools import lru_cache, wraps
+from math import copysign, gcd, isinf, isnan
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from metrics import metrics
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_numpy_module = None
+_numpy_checked = False
+
+
+def _numpy():
+    """NumPy nếu đã cài (import ở lần gọi đầu tiên), ngược lại None."""
+    global _numpy_module, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy
+            _numpy_module = numpy
+        except ImportError:  # NumPy là tùy chọn, chỉ dùng cho chế độ hàng loạt
+            _numpy_module = None
+        _numpy_checked = True
+    return _numpy_module
+
+
+class ConversionCache:
+    """
+    Cache dùng chung cho các hàm chuyển đổi (thay cho @lru_cache riêng lẻ).
+    
+    - Tham số được chuẩn hóa trước khi tra cache: "ff", "FF" và "00FF" là
+      cùng một mục.
+    - Giới hạn theo tổng số byte ước lượng của các mục (LRU), không theo số
+      mục; kết quả quá lớn không được lưu.
+    - Thống kê hit, miss, eviction và dung lượng theo từng converter.
+    """
+
+    _ENTRY_OVERHEAD = 200
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, max_entry_bytes: int = 1024 * 1024):
+        """
+        Args:
+            max_bytes: Tổng dung lượng tối đa của cache
+            max_entry_bytes: Kích thước tối đa của một mục; lớn hơn thì không lưu
+        """
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries: OrderedDict = OrderedDict()  # (tên, khóa) -> (giá trị, kích thước)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def _estimate_size(value) -> int:
+        if isinstance(value, (tuple, list)):
+            return sys.getsizeof(value) + sum(ConversionCache._estimate_size(v) for v in value)
+        return sys.getsizeof(value)
+
+    def _counters(self, name: str) -> Dict[str, int]:
+        counters = self._stats.get(name)
+        if counters is None:
+            counters = self._stats[name] = {'hits': 0, 'misses': 0, 'evictions': 0,
+                                            'skipped': 0, 'entries': 0, 'bytes': 0}
+        return counters
+
+    def get(self, name: str, key) -> Tuple[bool, object]:
+        with self._lock:
+            counters = self._counters(name)
+            entry = self._entries.get((name, key))
+            if entry is None:
+                counters['misses'] += 1
+                return False, None
+            self._entries.move_to_end((name, key))
+            counters['hits'] += 1
+            return True, entry[0]
+
+    def put(self, name: str, key, value) -> None:
+        size = self._estimate_size(key) + self._estimate_size(value) + self._ENTRY_OVERHEAD
+        with self._lock:
+            counters = self._counters(name)
+            if size > self.max_entry_bytes or size > self.max_bytes:
+                counters['skipped'] += 1
+                return
+            old = self._entries.pop((name, key), None)
+            if old is not None:
+                self._forget(name, old[1])
+            self._entries[(name, key)] = (value, size)
+            self._bytes += size
+            counters['entries'] += 1
+            counters['bytes'] += size
+            self._evict()
+
+    def _forget(self, name: str, size: int) -> None:
+        self._bytes -= size
+        counters = self._counters(name)
+        counters['entries'] -= 1
+        counters['bytes'] -= size
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._entries:
+            (name, _), (_, size) = self._entries.popitem(last=False)
+            self._forget(name, size)
+            self._counters(name)['evictions'] += 1
+
+    def resize(self, max_bytes: Optional[int] = None, max_entry_bytes: Optional[int] = None) -> None:
+        """Đổi giới hạn khi đang chạy; nếu giảm thì loại bỏ ngay các mục cũ nhất."""
+        with self._lock:
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            if max_entry_bytes is not None:
+                self.max_entry_bytes = max_entry_bytes
+            self._evict()
+
+    def clear(self, name: Optional[str] = None) -> None:
+        """Xóa toàn bộ cache hoặc chỉ các mục của một converter."""
+        with self._lock:
+            for cache_key in [k for k in self._entries if name is None or k[0] == name]:
+                self._forget(cache_key[0], self._entries.pop(cache_key)[1])
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Thống kê theo converter, kèm mục '_total' cho toàn bộ cache."""
+        with self._lock:
+            result = {name: dict(counters) for name, counters in self._stats.items()}
+            total = {'entries': len(self._entries), 'bytes': self._bytes, 'max_bytes': self.max_bytes}
+        for counters in result.values():
+            lookups = counters['hits'] + counters['misses']
+            counters['hit_rate'] = counters['hits'] / lookups if lookups else 0.0
+        result['_total'] = total
+        return result
+
+    def cached(self, name: str, canonical: Optional[Callable[..., tuple]] = None):
+        """
+        Decorator lưu kết quả của một hàm chuyển đổi vào cache.
+        
+        Args:
+            name: Tên converter trong thống kê
+            canonical: Hàm nhận tham số gốc, trả về tuple tham số đã chuẩn hóa;
+                       hàm được gọi với chính các tham số chuẩn hóa này
+        """
+        def decorator(func):
+            def normalise(args, kwargs):
+                if canonical is not None:
+                    args, kwargs = canonical(*args, **kwargs), {}
+                # float: dùng repr để 0.0 và -0.0 là hai mục khác nhau
+                key = tuple((float, repr(a)) if isinstance(a, float) else a for a in args)
+                if kwargs:
+                    key += tuple(sorted(kwargs.items()))
+                return args, kwargs, key
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                args, kwargs, key = normalise(args, kwargs)
+                found, value = self.get(name, key)
+                if found:
+                    return value
+                value = func(*args, **kwargs)
+                self.put(name, key, value)
+                return value
+
+            # Cho phép tính ở nơi khác (process pool) mà vẫn dùng cache của process này
+            wrapper.cache_lookup = lambda *args, **kwargs: self.get(name, normalise(args, kwargs)[2])
+            wrapper.cache_store = lambda value, *args, **kwargs: self.put(name, normalise(args, kwargs)[2], value)
+            wrapper.cache_clear = lambda: self.clear(name)
+            wrapper.cache_canonical = lambda *args, **kwargs: normalise(args, kwargs)[0]
+            return wrapper
+        return decorator
+
+
+_DECIMAL_RE = re.compile(r'([+-]?)(\d*)(?:\.(\d*))?')
+
+
+def _canonical_digits(num_str: str, from_base: int, to_base: int) -> tuple:
+    """Chuẩn hóa số không dấu trong hệ 2/8/10/16: bỏ khoảng trắng, chữ hoa, bỏ số 0 đầu."""
+    return (num_str.strip().upper().lstrip('0') or '0'), from_base, to_base
+
+
+def _canonical_decimal(num_str: str) -> str:
+    """Chuẩn hóa chuỗi thập phân: bỏ dấu +, số 0 thừa ở đầu phần nguyên và cuối phần thập phân."""
+    text = num_str.strip()
+    match = _DECIMAL_RE.fullmatch(text)
+    if match is None or not (match.group(2) or match.group(3)):
+        return text.lower()
+    sign, whole, frac = match.group(1), match.group(2).lstrip('0') or '0', (match.group(3) or '').rstrip('0')
+    return f"{'-' if sign == '-' else ''}{whole}{'.' + frac if frac else ''}"
+
+
+def _canonical_signed(num_str: str, bits: int = 8) -> tuple:
+    text = num_str.strip()
+    if '.' in text:
+        return text, bits
+    return _canonical_decimal(text), bits
+
+
+def _canonical_float_args(num_str: str, precision: Optional[int] = None, base: int = 2) -> tuple:
+    return _canonical_decimal(num_str), FLOAT_PRECISION if precision is None else precision, base
+
+
+def _canonical_ieee_args(num, bits: int = 32) -> tuple:
+    return (_canonical_decimal(num) if isinstance(num, str) else num), bits
+
+
+def _canonical_ieee_binary(binary: str) -> tuple:
+    return (binary.strip(),)
+
+
+
+# Cache kết quả chuyển đổi dùng chung, giới hạn theo byte (CONVERSION_CACHE_BYTES)
+conversion_cache = ConversionCache(int(os.environ.get('CONVERSION_CACHE_BYTES', 32 * 1024 * 1024)))
+
+def detect_base(num_str):
+# Kiểm tra hệ nhị phân (hệ 2)
+    if re.match(r'^[01]+$', num_str):
+        return 2
+# Kiểm tra hệ bát phân (hệ 8)
+    elif re.match(r'^[0-7]+$', num_str):
+        return 8
+# Kiểm tra hệ thập phân (hệ 10)
+    elif re.match(r'^[0-9]+$', num_str):
+        return 10
+# Kiểm tra hệ thập lục phân (hệ 16)
+    elif re.match(r'^[0-9A-Fa-f]+$', num_str):
+        return 16
+    else:
+        raise ValueError("Không thể xác định hệ cơ số. Vui lòng nhập một số hợp lệ.")
+# Tạo lookup table để tối ưu việc chuyển đổi
+BINARY_LOOKUP: Dict[int, str] = {i: format(i, 'b') for i in range(256)}
+COMPLEMENT_TABLE = str.maketrans('01', '10')
+
+@lru_cache(maxsize=1024)
+def _get_binary_str(num: int, bits: int) -> str:
+    """Helper function để cache các kết quả chuyển đổi phổ biến."""
+    if 0 <= num < 256:
+        return BINARY_LOOKUP[num].zfill(bits)
+    return format(num, f'0{bits}b')
+
+@conversion_cache.cached('convert_to_signed_binary', _canonical_signed)
+@metrics.timed('converter')
+def convert_to_signed_binary(num_str: str, bits: int = 8) -> Tuple[str, str]:
+    """
+    Chuyển đổi số thập phân sang số nhị phân có dấu (phiên bản tối ưu).
+    """
+    try:
+        num = int(num_str)
+    except ValueError:
+        raise ValueError(f"'{num_str}' không phải là số nguyên hợp lệ")
+
+    is_negative = num < 0
+    abs_num = abs(num)
+    
+    # Kiểm tra giới hạn của số
+    max_value = (1 << (bits - 1)) - 1
+    min_value = -(1 << (bits - 1))
+    if not min_value <= num <= max_value:
+        raise ValueError(f"Số nằm ngoài phạm vi [{min_value}, {max_value}]")
+
+    explanation: List[str] = [f"Chuyển đổi {num_str} sang nhị phân có dấu:"]
+    
+    if is_negative:
+        explanation.append(f"1. Bỏ dấu trừ: {abs_num}")
+        
+        # Sử dụng helper function đã được cache
+        binary = _get_binary_str(abs_num, bits)
+        explanation.append(f"2. Chuyển sang nhị phân {bits}-bit: {binary}")
+        
+        # Tối ưu việc lấy bù 1 với translation table
+        complement_one = binary.translate(COMPLEMENT_TABLE)
+        explanation.append(f"3. Lấy bù 1 (đảo bit): {complement_one}")
+        
+        # Tối ưu việc lấy bù 2 với bitwise operations
+        complement_two = _get_binary_str((int(complement_one, 2) + 1) & ((1 << bits) - 1), bits)
+        explanation.append(f"4. Cộng thêm 1 để có bù 2: {complement_two}")
+        
+        return complement_two, '\n'.join(explanation)
+    
+    binary = _get_binary_str(abs_num, bits)
+    explanation.extend([
+        f"1. Chuyển sang nhị phân {bits}-bit: {binary}",
+        "Số dương nên không cần chuyển đổi thêm."
+    ])
+    
+    return binary, '\n'.join(explanation)
+
+
+@metrics.timed('converter')
+def signed_binary_result(num_str: str, bits: int = 8) -> str:
+    """
+    Chỉ tính kết quả của convert_to_signed_binary (bù 2), không tạo giải thích.
+    """
+    try:
+        num = int(num_str)
+    except ValueError:
+        raise ValueError(f"'{num_str}' không phải là số nguyên hợp lệ")
+    max_value = (1 << (bits - 1)) - 1
+    min_value = -(1 << (bits - 1))
+    if not min_value <= num <= max_value:
+        raise ValueError(f"Số nằm ngoài phạm vi [{min_value}, {max_value}]")
+    return _get_binary_str(num & ((1 << bits) - 1), bits)
+
+FLOAT_PRECISION = 64
+FLOAT_BASE_CHOICES = {
+    'Chuyển sang nhị phân đơn giản': 2,
+    'Chuyển sang bát phân (hệ 8)': 8,
+    'Chuyển sang thập lục phân (hệ 16)': 16,
+}
+
+
+def _decimal_places(denominator: int) -> int:
+    """Số chữ số thập phân cần để viết chính xác phân số có mẫu `denominator` (mẫu chỉ có ước 2, 5)."""
+    twos = (denominator & -denominator).bit_length() - 1
+    fives, rest = 0, denominator >> twos
+    while rest % 5 == 0:
+        rest //= 5
+        fives += 1
+    return max(twos, fives)
+
+
+def _format_decimal_fraction(numerator: int, denominator: int, places: int) -> str:
+    """Viết numerator/denominator (< 1 hoặc ≥ 1) dưới dạng thập phân chính xác với tối đa `places` chữ số."""
+    if places == 0:
+        return str(numerator // denominator)
+    scaled = numerator * (10 ** places // denominator)
+    whole, frac = divmod(scaled, 10 ** places)
+    frac_str = str(frac).rjust(places, '0').rstrip('0')
+    return f"{whole}.{frac_str}" if frac_str else str(whole)
+
+
+def _preperiod_length(denominator: int, base: int, limit: int) -> int:
+    """
+    Số chữ số trước chu kỳ của phân số có mẫu `denominator` trong hệ `base`.
+    
+    Là k nhỏ nhất sao cho phần mẫu chỉ gồm ước nguyên tố của base chia hết
+    base^k; dừng ở limit + 1 nếu lớn hơn limit.
+    """
+    coprime = denominator
+    while True:
+        g = gcd(coprime, base)
+        if g == 1:
+            break
+        while coprime % g == 0:
+            coprime //= g
+    factor = denominator // coprime
+    k, power = 0, 1
+    while power % factor and k <= limit:
+        power *= base
+        k += 1
+    return k
+
+
+@conversion_cache.cached('convert_float_to_binary', _canonical_float_args)
+@metrics.timed('converter')
+def convert_float_to_binary(num_str: str, precision: int = FLOAT_PRECISION,
+                            base: int = 2) -> Tuple[str, str]:
+    """
+    Chuyển đổi số thực (chuỗi thập phân) sang hệ 2, 8 hoặc 16 một cách chính xác.
+    
+    Số được đọc thành phân số nên không có sai số của float. Phần thập phân
+    được nhân với cơ số liên tiếp bằng số nguyên; nếu khai triển tuần hoàn,
+    chu kỳ được phát hiện trong O(độ dài chu kỳ) và viết trong ngoặc, ví dụ
+    0.1 = 0.0(0011) trong hệ 2.
+    
+    Args:
+        num_str: Số thực dạng chuỗi (ví dụ "0.1", "-3.75", "1e-5")
+        precision: Số chữ số tối đa sau dấu chấm; khai triển dài hơn bị cắt
+        base: Hệ đích (2, 8, 16)
+    """
+    if precision < 0:
+        raise ValueError("Độ chính xác không được là số âm")
+    if base not in (2, 8, 16):
+        raise ValueError("Hệ đích phải là 2, 8 hoặc 16")
+    try:
+        negative, value = _parse_real(num_str)
+    except ValueError:
+        raise ValueError(f"'{num_str}' không phải là số hợp lệ")
+    
+    # Các trường hợp đặc biệt
+    if value == 'nan':
+        return "NaN", "Không phải là số (NaN)"
+    if value == 'inf':
+        result = "-inf" if negative else "inf"
+        return result, f"Số vô cùng ({result})"
+    if value == 0:
+        return "0", f"Số 0 trong hệ {base} là 0"
+    
+    sign = "-" if negative else "+"
+    int_part, remainder = divmod(value.numerator, value.denominator)
+    denominator = value.denominator
+    places = _decimal_places(denominator)
+    int_digits = _format_in_base(int_part, base)
+    
+    # Khai triển phần thập phân: phần trước chu kỳ rồi đến đúng một chu kỳ
+    preperiod = _preperiod_length(denominator, base, precision)
+    digits: List[int] = []
+    remainders: List[int] = []
+    current = remainder
+    cycle_remainder = None
+    while current and len(digits) < precision:
+        if len(digits) == preperiod:
+            # Sau phần trước chu kỳ, phần dư sẽ quay lại đúng giá trị này
+            cycle_remainder = current
+        elif current == cycle_remainder:
+            break
+        remainders.append(current)
+        digit, current = divmod(current * base, denominator)
+        digits.append(digit)
+    
+    repeating = current != 0 and current == cycle_remainder
+    truncated = current != 0 and not repeating
+    cycle_start = preperiod
+    frac_digits = ''.join(HEX_DIGITS[d] for d in digits)
+    
+    result = sign + int_digits
+    if repeating:
+        result += f".{frac_digits[:cycle_start]}({frac_digits[cycle_start:]})"
+    elif frac_digits:
+        result += "." + frac_digits + ("…" if truncated else "")
+    
+    explanation = [
+        f"Chuyển đổi số thực {num_str} sang hệ {base}:\n",
+        f"1. Xác định dấu: {sign}\n",
+        f"2. Chuyển đổi phần nguyên {int_part}:\n",
+        f"   {int_part} (10) = {int_digits} ({base})\n",
+    ]
+    if digits:
+        def step(i: int) -> str:
+            before = _format_decimal_fraction(remainders[i], denominator, places)
+            product = _format_decimal_fraction(remainders[i] * base, denominator, places)
+            return f"   * {before} × {base} = {product} → {HEX_DIGITS[digits[i]]}\n"
+        
+        explanation.append(f"3. Chuyển đổi phần thập phân "
+                           f"{_format_decimal_fraction(remainder, denominator, places)}:\n")
+        explanation.extend(_explain_steps(len(digits), step))
+        if repeating:
+            explanation.append(
+                f"   Phần dư {_format_decimal_fraction(current, denominator, places)} lặp lại sau "
+                f"{len(digits) - cycle_start} bước → chu kỳ ({frac_digits[cycle_start:]})\n")
+        elif truncated:
+            explanation.append(f"   Dừng ở {precision} chữ số (khai triển còn tiếp tục)\n")
+    else:
+        explanation.append("3. Không có phần thập phân\n")
+    explanation.append(f"Kết quả cuối cùng: {result}")
+    
+    return result, ''.join(explanation)
+        
+# Constants
+HEX_DIGITS = "0123456789ABCDEF"
+HEX_TO_DEC: Dict[str, int] = {c: i for i, c in enumerate(HEX_DIGITS)}
+BINARY_TO_OCT = {format(i, '03b'): str(i) for i in range(8)}
+BINARY_TO_HEX = {format(i, '04b'): HEX_DIGITS[i] for i in range(16)}
+OCT_TO_BINARY = {str(i): format(i, '03b') for i in range(8)}
+HEX_TO_BINARY = {HEX_DIGITS[i]: format(i, '04b') for i in range(16)}
+
+class LazyExplanation:
+    """
+    Giải thích từng bước được tạo khi cần.
+    
+    Chỉ khi gọi str() (hoặc dùng trong f-string) thì các đoạn văn bản mới
+    được sinh ra và nối một lần bằng ''.join (tuyến tính theo độ dài);
+    có thể duyệt từng đoạn bằng for mà không tạo toàn bộ chuỗi.
+    """
+    __slots__ = ('_factory', '_text')
+
+    def __init__(self, factory: Callable[[], Iterable[str]]):
+        self._factory = factory
+        self._text: Optional[str] = None
+
+    def __iter__(self) -> Iterator[str]:
+        if self._text is not None:
+            yield self._text
+        else:
+            yield from self._factory()
+
+    def __str__(self) -> str:
+        if self._text is None:
+            self._text = ''.join(self._factory())
+        return self._text
+
+    def __format__(self, format_spec: str) -> str:
+        return format(str(self), format_spec)
+
+    def __len__(self) -> int:
+        return len(str(self))
+
+    def __eq__(self, other) -> bool:
+        return str(self) == str(other)
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+    def __repr__(self) -> str:
+        return f"LazyExplanation({'đã tạo' if self._text is not None else 'chưa tạo'})"
+
+
+# Ngưỡng chuyển sang thuật toán chia để trị (dưới giới hạn 4300 chữ số của int/str)
+_DC_DECIMAL_DIGITS = 2048
+_DC_BITS = 8192
+# Số bước tối đa được giải thích đầy đủ; vượt quá thì chỉ hiện đầu và cuối
+EXPLANATION_MAX_STEPS = 200
+EXPLANATION_EDGE_STEPS = 20
+_ABBREVIATE_DIGITS = 20
+
+
+@lru_cache(maxsize=64)
+def _pow5(exponent: int) -> int:
+    return 5 ** exponent
+
+
+def _decimal_str_to_int(digits: str) -> int:
+    """
+    Chuyển chuỗi thập phân sang int bằng chia để trị.
+    
+    n = cao * 10^k + thấp với 10^k = 5^k << k; phép nhân của int dùng
+    Karatsuba nên tổng chi phí dưới bình phương và không bị giới hạn
+    số chữ số của int().
+    """
+    if not (digits.isascii() and digits.isdigit()):
+        raise ValueError(f"'{digits[:_ABBREVIATE_DIGITS]}' không phải là số thập phân hợp lệ")
+
+    def inner(start: int, end: int) -> int:
+        length = end - start
+        if length <= _DC_DECIMAL_DIGITS:
+            return int(digits[start:end])
+        # Tách theo lũy thừa của 2 để tái sử dụng 5^k trong cache
+        k = _DC_DECIMAL_DIGITS
+        while k * 2 < length:
+            k *= 2
+        high = inner(start, end - k)
+        low = inner(end - k, end)
+        return ((high * _pow5(k)) << k) + low
+
+    return inner(0, len(digits))
+
+
+def _int_to_decimal_str(value: int) -> str:
+    """
+    Chuyển int không âm sang chuỗi thập phân bằng chia để trị qua module decimal.
+    
+    n = cao * 2^w + thấp được tính trong Decimal (libmpdec nhân nhanh),
+    sau đó str(Decimal) tuyến tính.
+    """
+    if value.bit_length() <= _DC_BITS:
+        return str(value)
+
+    with decimal.localcontext() as ctx:
+        ctx.prec = decimal.MAX_PREC
+        ctx.Emax = decimal.MAX_EMAX
+        ctx.Emin = decimal.MIN_EMIN
+        ctx.traps[decimal.Inexact] = True
+        pow2_cache: Dict[int, decimal.Decimal] = {}
+
+        def pow2(w: int) -> decimal.Decimal:
+            result = pow2_cache.get(w)
+            if result is None:
+                result = pow2_cache[w] = decimal.Decimal(2) ** w
+            return result
+
+        def inner(n: int, w: int) -> decimal.Decimal:
+            if w <= _DC_BITS:
+                return decimal.Decimal(n)
+            half = w >> 1
+            high = n >> half
+            low = n - (high << half)
+            return inner(low, half) + inner(high, w - half) * pow2(half)
+
+        return str(inner(value, value.bit_length()))
+
+
+def _format_in_base(value: int, base: int) -> str:
+    """Biểu diễn số nguyên không âm trong hệ 2, 8, 10 hoặc 16."""
+    if base == 2:
+        return format(value, 'b')
+    if base == 8:
+        return format(value, 'o')
+    if base == 16:
+        return format(value, 'X')
+    return _int_to_decimal_str(value)
+
+
+def _parse_in_base(num_str: str, base: int) -> int:
+    """Đọc số nguyên không âm trong hệ 2, 8, 10 hoặc 16."""
+    if base == 10:
+        return _decimal_str_to_int(num_str)
+    return int(num_str, base)
+
+
+@conversion_cache.cached('convert_base', _canonical_digits)
+@metrics.timed('converter')
+def convert_base_result(num_str: str, from_base: int, to_base: int) -> str:
+    """
+    Chỉ tính kết quả chuyển đổi, không tạo giải thích.
+    
+    Args:
+        num_str: Số cần chuyển đổi dưới dạng chuỗi
+        from_base: Hệ cơ số gốc (2, 8, 10, 16)
+        to_base: Hệ cơ số đích (2, 8, 10, 16)
+    
+    Returns:
+        Kết quả chuyển đổi
+    """
+    if from_base == to_base:
+        return num_str
+    return _format_in_base(_parse_in_base(num_str, from_base), to_base)
+
+
+def _abbreviate_digits(digits: str) -> str:
+    """Rút gọn chuỗi chữ số dài: giữ phần đầu, phần cuối và số chữ số."""
+    if len(digits) <= 2 * _ABBREVIATE_DIGITS + 10:
+        return digits
+    return f"{digits[:_ABBREVIATE_DIGITS]}…{digits[-_ABBREVIATE_DIGITS:]} ({len(digits)} chữ số)"
+
+
+def _describe_int(value: int) -> str:
+    """Mô tả số nguyên trong giải thích rút gọn mà không cần đổi số lớn sang thập phân."""
+    if value.bit_length() <= 128:
+        return str(value)
+    return f"<≈{int((value.bit_length() - 1) * 0.30102999566398) + 1} chữ số>"
+
+
+def _explain_steps(count: int, line: Callable[[int], str]) -> Iterator[str]:
+    """Sinh các dòng giải thích theo bước, chỉ giữ phần đầu và cuối nếu quá nhiều bước."""
+    if count <= EXPLANATION_MAX_STEPS:
+        for i in range(count):
+            yield line(i)
+        return
+    for i in range(EXPLANATION_EDGE_STEPS):
+        yield line(i)
+    yield f"  ... (bỏ qua {count - 2 * EXPLANATION_EDGE_STEPS} bước) ...\n"
+    for i in range(count - EXPLANATION_EDGE_STEPS, count):
+        yield line(i)
+
+
+def explain_base_conversion(num_str: str, from_base: int, to_base: int) -> Iterator[str]:
+    """
+    Sinh lần lượt các đoạn giải thích chuyển đổi hệ cơ số.
+    
+    Với số có nhiều hơn EXPLANATION_MAX_STEPS bước, giải thích được rút gọn:
+    chỉ hiện các bước đầu/cuối và viết tắt các số quá dài.
+    
+    Args:
+        num_str: Số cần chuyển đổi dưới dạng chuỗi
+        from_base: Hệ cơ số gốc (2, 8, 10, 16)
+        to_base: Hệ cơ số đích (2, 8, 10, 16)
+    """
+    if from_base == to_base:
+        yield "Không cần chuyển đổi vì cùng hệ cơ số."
+        return
+        
+    num_str = num_str.upper()
+    
+    # Chuyển đổi gián tiếp qua hệ nhị phân (8 <-> 16)
+    if from_base in (8, 16) and to_base in (8, 16):
+        binary = convert_base_result(num_str, from_base, 2)
+        yield from explain_base_conversion(num_str, from_base, 2)
+        yield "\nSau đó:\n"
+        yield from explain_base_conversion(binary, 2, to_base)
+        return
+    
+    result = convert_base_result(num_str, from_base, to_base)
+    # Số bước giải thích của từng phương pháp
+    if to_base == 10 or from_base in (8, 16) and to_base == 2:
+        steps = len(num_str)
+    elif from_base == 10:
+        steps = len(result)
+    else:
+        steps = -(-len(num_str) // (3 if to_base == 8 else 4))
+    summarise = steps > EXPLANATION_MAX_STEPS
+    show = _abbreviate_digits if summarise else str
+    show_int = _describe_int if summarise else str
+    
+    yield f"Chuyển đổi {show(num_str)} từ cơ số {from_base} sang cơ số {to_base}:\n\n"
+
+    # Chuyển đổi sang hệ 10
+    if to_base == 10:
+        base_name = "8" if from_base == 8 else "16" if from_base == 16 else "2"
+        yield f"Sử dụng phương pháp nhân với lũy thừa của {base_name}:\n"
+        
+        def line(i: int) -> str:
+            digit = num_str[-1 - i]
+            digit_value = HEX_TO_DEC[digit]
+            power = from_base ** i
+            return (f"  {digit} * {base_name}^{i} = {digit_value} * {show_int(power)}"
+                    f" = {show_int(digit_value * power)}\n")
+        
+        yield from _explain_steps(steps, line)
+        yield f"Tổng: {show(result)}\n"
+        return
+
+    # Chuyển từ hệ 10
+    if from_base == 10:
+        if result == "0":
+            yield "Số 0 giống nhau ở mọi hệ cơ số."
+            return
+            
+        # Lũy thừa lớn nhất chính là số chữ số của kết quả trừ 1
+        max_power = len(result) - 1
+        decimal_text = show(num_str.lstrip('0'))
+        yield (f"1. Tìm lũy thừa lớn nhất của {to_base} không vượt quá {decimal_text}: "
+               f"{to_base}^{max_power} = {show_int(to_base ** max_power)}\n\n")
+        yield "2. Xây dựng số từ trái sang phải:\n"
+
+        def line(j: int) -> str:
+            # Số còn lại trước và sau bước j đọc thẳng từ các chữ số của kết quả
+            remaining = int(result[j:], to_base)
+            rest = int(result[j + 1:] or '0', to_base)
+            digit = result[j]
+            text = f"  - {show_int(remaining)} ÷ {to_base}^{max_power - j} = {HEX_TO_DEC[digit]}"
+            if to_base == 16:
+                text += f" ({digit})"
+            return text + f" (dư {show_int(rest)})\n"
+
+        yield from _explain_steps(steps, line)
+        return
+
+    # Chuyển đổi trực tiếp giữa hệ 2, 8, 16
+    if from_base == 2 and to_base in (8, 16):
+        width = 3 if to_base == 8 else 4
+        table = BINARY_TO_OCT if to_base == 8 else BINARY_TO_HEX
+        padded = '0' * ((width - len(num_str) % width) % width) + num_str
+        
+        def line(g: int) -> str:
+            group = padded[g * width:(g + 1) * width]
+            return f"  {group} (2) = {table[group]} ({to_base})\n"
+        
+        yield f"Nhóm các bit thành nhóm {width} bit:\n"
+        yield from _explain_steps(steps, line)
+        yield f"Kết quả cuối cùng: {show(result)}\n"
+        return
+
+    if from_base in (8, 16) and to_base == 2:
+        table = OCT_TO_BINARY if from_base == 8 else HEX_TO_BINARY
+        
+        def line(i: int) -> str:
+            digit = num_str[i]
+            return f"  {digit} ({from_base}) = {table[digit]} (2)\n"
+        
+        yield "Chuyển đổi từng chữ số sang nhị phân:\n"
+        yield from _explain_steps(steps, line)
+        yield f"Ghép các nhóm bit lại: {show(result)}\n"
+
+
+def convert_base(num_str: str, from_base: int, to_base: int) -> Tuple[str, LazyExplanation]:
+    """
+    Chuyển đổi số từ hệ cơ số này sang hệ cơ số khác với giải thích chi tiết.
+    
+    Kết quả được tính ngay (có cache); giải thích chỉ được tạo khi dùng đến.
+    
+    Args:
+        num_str: Số cần chuyển đổi dưới dạng chuỗi
+        from_base: Hệ cơ số gốc (2, 8, 10, 16)
+        to_base: Hệ cơ số đích (2, 8, 10, 16)
+    
+    Returns:
+        Tuple gồm kết quả chuyển đổi và giải thích
+    """
+    result = convert_base_result(num_str, from_base, to_base)
+    return result, LazyExplanation(lambda: explain_base_conversion(num_str, from_base, to_base))
+
+
+# Phép chuyển đổi có đầu vào dài hơn ngưỡng này được chạy ở process pool để
+# không chiếm worker đang phục vụ các chat khác.
+HEAVY_CONVERSION_DIGITS = int(os.environ.get('HEAVY_CONVERSION_DIGITS', 2048))
+HEAVY_CONVERSION_TIMEOUT = 60.0
+_heavy_pool: Optional['ProcessPoolExecutor'] = None
+_heavy_pool_lock = threading.Lock()
+
+
+def _get_heavy_pool() -> 'ProcessPoolExecutor':
+    global _heavy_pool
+    with _heavy_pool_lock:
+        if _heavy_pool is None:
+            # multiprocessing chỉ được import khi có phép chuyển đổi nặng đầu tiên
+            from concurrent.futures import ProcessPoolExecutor
+            _heavy_pool = ProcessPoolExecutor(max_workers=max(1, min(4, (os.cpu_count() or 2) - 1)))
+            atexit.register(_heavy_pool.shutdown, wait=False, cancel_futures=True)
+        return _heavy_pool
+
+
+def _materialise(func: Callable, args: tuple):
+    """Chạy trong process con: trả kết quả với giải thích đã ghép thành chuỗi."""
+    value = func(*args)
+    if isinstance(value, tuple):
+        return tuple(str(item) if isinstance(item, LazyExplanation) else item for item in value)
+    return value
+
+
+def run_conversion(func: Callable, num_str: str, *args):
+    """
+    Gọi một hàm chuyển đổi, đẩy sang process pool nếu đầu vào nặng.
+    
+    Args:
+        func: Hàm chuyển đổi cấp module (convert_base, convert_float_to_binary, ...)
+        num_str: Số cần chuyển đổi, độ dài dùng để ước lượng chi phí
+        *args: Các tham số còn lại của func
+    """
+    global _heavy_pool
+    if len(num_str) < HEAVY_CONVERSION_DIGITS:
+        return func(num_str, *args)
+    lookup = getattr(func, 'cache_lookup', None)
+    if lookup is not None:
+        found, value = lookup(num_str, *args)
+        if found:
+            return value
+    from concurrent.futures.process import BrokenProcessPool
+    try:
+        future = _get_heavy_pool().submit(_materialise, func, (num_str,) + args)
+        value = future.result(timeout=HEAVY_CONVERSION_TIMEOUT)
+        if lookup is not None:
+            func.cache_store(value, num_str, *args)
+        return value
+    except BrokenProcessPool:
+        logger.warning("Process pool bị hỏng, chuyển đổi ngay trong thread hiện tại")
+        with _heavy_pool_lock:
+            _heavy_pool = None
+        return func(num_str, *args)
+
+# Chế độ chuyển đổi hàng loạt
+MAX_BATCH_LINES = 1000
+BATCH_PREFIXES = {'0B': 2, '0O': 8, '0X': 16}
+_NUMPY_WIDTHS = {2: 64, 8: 22, 10: 20, 16: 16}
+_NUMPY_BITS = {2: 1, 8: 3, 16: 4}
+
+
+def parse_batch_line(line: str) -> Tuple[str, int]:
+    """
+    Đọc một dòng của chế độ hàng loạt: "<số> [hệ]" hoặc số có tiền tố 0b/0o/0x.
+    Không ghi hệ thì số chỉ gồm chữ số được hiểu là hệ 10, có A-F là hệ 16.
+    
+    Returns:
+        Tuple gồm số (chữ hoa, không tiền tố) và hệ cơ số
+    """
+    parts = line.split()
+    if not parts or len(parts) > 2:
+        raise ValueError("Mỗi dòng gồm một số và (tùy chọn) hệ cơ số")
+    num_str = parts[0].upper()
+    
+    if len(parts) == 2:
+        try:
+            from_base = int(parts[1])
+        except ValueError:
+            raise ValueError(f"Hệ cơ số '{parts[1]}' không hợp lệ (chọn 2, 8, 10 hoặc 16)") from None
+        if from_base not in [2, 8, 10, 16]:
+            raise ValueError("Hệ cơ số không hợp lệ")
+    elif num_str[:2] in BATCH_PREFIXES:
+        from_base = BATCH_PREFIXES[num_str[:2]]
+        num_str = num_str[2:]
+    else:
+        from_base = 10 if num_str.isdigit() else 16
+    
+    if not num_str or any(c not in HEX_DIGITS[:from_base] for c in num_str):
+        raise ValueError(f"Số không hợp lệ trong hệ cơ số {from_base}")
+    return num_str, from_base
+
+
+def _format_uint64_column(values: "np.ndarray", base: int) -> List[str]:
+    """Đổi cả mảng uint64 sang chuỗi trong hệ 2, 8, 10 hoặc 16 bằng NumPy."""
+    np = _numpy()
+    width = _NUMPY_WIDTHS[base]
+    if base == 10:
+        powers = np.array([10 ** i for i in range(width - 1, -1, -1)], dtype=np.uint64)
+        digits = (values[:, None] // powers) % np.uint64(10)
+    else:
+        shifts = np.arange(width - 1, -1, -1, dtype=np.uint64) * np.uint64(_NUMPY_BITS[base])
+        digits = (values[:, None] >> shifts) & np.uint64(base - 1)
+    chars = np.frombuffer(HEX_DIGITS.encode(), dtype='S1')[digits]
+    rows = np.ascontiguousarray(chars).view(f'S{width}').ravel()
+    return [row.decode().lstrip('0') or '0' for row in rows]
+
+
+@metrics.timed('converter')
+def convert_batch(values: List[int]) -> Dict[int, List[str]]:
+    """
+    Đổi danh sách số nguyên không âm sang các hệ 2, 8, 10, 16.
+    
+    Các số vừa 64 bit được xử lý vector hóa bằng NumPy (nếu có),
+    số lớn hơn dùng đường chuyển đổi thông thường.
+    
+    Returns:
+        Dict hệ cơ số -> danh sách kết quả theo đúng thứ tự đầu vào
+    """
+    np = _numpy()
+    columns: Dict[int, List[str]] = {base: [''] * len(values) for base in (2, 8, 10, 16)}
+    small = [i for i, value in enumerate(values) if value < (1 << 64)] if np is not None else []
+    
+    if small:
+        array = np.array([values[i] for i in small], dtype=np.uint64)
+        for base in columns:
+            for i, text in zip(small, _format_uint64_column(array, base)):
+                columns[base][i] = text
+    
+    small_set = set(small)
+    for i, value in enumerate(values):
+        if i not in small_set:
+            for base in columns:
+                columns[base][i] = _format_in_base(value, base)
+    return columns
+
+
+def convert_to_all_bases(num_str, from_base):
+    # Hàm mới: chuyển đổi số đã nhập sang tất cả các hệ 2, 8, 10, 16
+    conversions = {}
+    for to_base in [2, 8, 10, 16]:
+        if to_base != from_base:  # Bỏ qua chuyển đổi cùng hệ
+            result, _ = (num_str, from_base, to_base)
+            conversions[to_base] = result
+    return conversions
+
+
+# Định dạng IEEE 754: số bit -> (số bit mũ, số bit mantissa, bias)
+IEEE_FORMATS = {
+    16: (5, 10, 15),
+    32: (8, 23, 127),
+    64: (11, 52, 1023),
+    128: (15, 112, 16383),
+}
+_NUMPY_FLOAT_TYPES = {16: ('float16', 'uint16'), 32: ('float32', 'uint32'), 64: ('float64', 'uint64')}
+IEEE_CHOICES = {f'Chuyển sang IEEE 754 ({bits}-bit)': bits for bits in IEEE_FORMATS}
+_STRUCT_FORMATS = {16: '>e', 32: '>f', 64: '>d'}
+
+
+# Độ dài chuỗi nhị phân được tự nhận là IEEE 754. Chuỗi 16 bit hay được nhập
+# để đổi hệ cơ số nên chỉ được giải mã khi người dùng chọn IEEE_DECODE_16_CHOICE.
+IEEE_AUTODETECT_BITS = (32, 64, 128)
+IEEE_DECODE_16_CHOICE = 'Giải mã IEEE 754 (16-bit)'
+
+
+def is_ieee754_binary(binary_str: str) -> tuple[bool, int]:
+    """
+    Kiểm tra xem một chuỗi nhị phân có phải là số IEEE 754 hay không.
+    Trả về (True, bits) nếu là IEEE 754, với bits là 32, 64 hoặc 128.
+    """
+    if not all(bit in '01' for bit in binary_str):
+        return False, 0
+        
+    if len(binary_str) in IEEE_AUTODETECT_BITS:
+        return True, len(binary_str)
+    return False, 0
+    
+def _get_ieee_params(bits: int) -> Tuple[int, int, int]:
+    """Trả về (số bit mũ, số bit mantissa, bias) của định dạng IEEE 754."""
+    try:
+        return IEEE_FORMATS[bits]
+    except KeyError:
+        raise ValueError("Số bit phải là 16, 32, 64 hoặc 128") from None
+
+
+def _parse_real(num: Union[float, str]) -> Tuple[int, Union[Fraction, str]]:
+    """
+    Đọc số thực thành (bit dấu, giá trị tuyệt đối).
+    
+    Chuỗi thập phân được đọc chính xác thành phân số (không qua float) nên
+    "0.1" được làm tròn một lần duy nhất về định dạng đích. Giá trị đặc biệt
+    trả về dạng chuỗi 'inf' hoặc 'nan'.
+    """
+    if isinstance(num, str):
+        text = num.strip()
+        sign = 1 if text.startswith('-') else 0
+        body = text.lstrip('+-').lower()
+        if body in ('inf', 'infinity'):
+            return sign, 'inf'
+        if body == 'nan':
+            return sign, 'nan'
+        try:
+            return sign, Fraction(body)
+        except ValueError:
+            raise ValueError(f"'{num}' không phải là số thực hợp lệ") from None
+    if isnan(num):
+        return 0, 'nan'
+    sign = 1 if copysign(1.0, num) < 0 else 0
+    if isinf(num):
+        return sign, 'inf'
+    return sign, Fraction(abs(num))
+
+
+def _encode_fraction(value: Fraction, bits: int) -> Tuple[int, int]:
+    """
+    Làm tròn giá trị dương về định dạng IEEE (round-half-to-even).
+    
+    Returns:
+        (số mũ đã cộng bias, phần mantissa lưu trữ); số mũ bằng 0 là số không
+        chuẩn (subnormal), bằng giá trị lớn nhất là vô cùng.
+    """
+    exp_bits, mantissa_bits, bias = IEEE_FORMATS[bits]
+    max_biased = (1 << exp_bits) - 1
+    if value == 0:
+        return 0, 0
+    p, q = value.numerator, value.denominator
+    # Số mũ e sao cho 2^e <= value < 2^(e+1), chỉ dùng phép toán số nguyên
+    exp = p.bit_length() - q.bit_length()
+    if (p << max(0, -exp)) < (q << max(0, exp)):
+        exp -= 1
+    exp = max(exp, 1 - bias)  # dưới số mũ nhỏ nhất: dạng không chuẩn
+
+    shift = mantissa_bits - exp
+    num, den = (p << shift, q) if shift >= 0 else (p, q << -shift)
+    significand, remainder = divmod(num, den)
+    if 2 * remainder > den or (2 * remainder == den and significand & 1):
+        significand += 1
+
+    if significand >> (mantissa_bits + 1):
+        # Làm tròn lên tràn sang số mũ kế tiếp
+        significand >>= 1
+        exp += 1
+    if significand >> mantissa_bits == 0:
+        return 0, significand
+    biased = exp + bias
+    if biased >= max_biased:
+        return max_biased, 0
+    return biased, significand - (1 << mantissa_bits)
+
+
+def encode_ieee754(num: Union[float, str], bits: int = 32) -> int:
+    """Mã hóa số thực thành mẫu bit IEEE 754 (dạng số nguyên) của định dạng `bits`."""
+    exp_bits, mantissa_bits, _ = _get_ieee_params(bits)
+    if bits in _STRUCT_FORMATS and (isinstance(num, float) or bits == 64):
+        # Đường nhanh: float đã là giá trị chính xác (chuỗi thì float() làm
+        # tròn đúng về double), struct ép kiểu theo round-half-to-even.
+        try:
+            return int.from_bytes(struct.pack(_STRUCT_FORMATS[bits], float(num)), 'big')
+        except (OverflowError, ValueError):
+            pass
+    sign, value = _parse_real(num)
+    max_biased = (1 << exp_bits) - 1
+    if value == 'nan':
+        biased, fraction = max_biased, 1 << (mantissa_bits - 1)
+    elif value == 'inf':
+        biased, fraction = max_biased, 0
+    else:
+        biased, fraction = _encode_fraction(value, bits)
+    return (sign << (bits - 1)) | (biased << mantissa_bits) | fraction
+
+
+@metrics.timed('converter')
+def ieee754_result(num: Union[float, str], bits: int = 32) -> str:
+    """Chỉ tính kết quả của decimal_to_ieee754 (chuỗi bit), không tạo giải thích."""
+    return format(encode_ieee754(num, bits), f'0{bits}b')
+
+
+def decode_ieee754(pattern: int, bits: int = 32) -> Union[Fraction, float]:
+    """
+    Giải mã mẫu bit IEEE 754 thành giá trị chính xác.
+    
+    Trả về Fraction cho số hữu hạn (dấu của -0 bị mất), float cho ±inf và NaN.
+    """
+    exp_bits, mantissa_bits, bias = _get_ieee_params(bits)
+    sign = pattern >> (bits - 1) & 1
+    biased = pattern >> mantissa_bits & ((1 << exp_bits) - 1)
+    fraction = pattern & ((1 << mantissa_bits) - 1)
+    if biased == (1 << exp_bits) - 1:
+        return float('nan') if fraction else (float('-inf') if sign else float('inf'))
+    if biased == 0:
+        value = Fraction(fraction, 1 << (mantissa_bits + bias - 1))
+    else:
+        value = Fraction((1 << mantissa_bits) | fraction) * Fraction(2) ** (biased - bias - mantissa_bits)
+    return -value if sign else value
+
+
+def _fraction_to_float(value: Fraction) -> float:
+    try:
+        return float(value)
+    except OverflowError:
+        return float('-inf') if value < 0 else float('inf')
+
+
+def _format_exact(value: Fraction, bits: int) -> str:
+    """Hiển thị giá trị đã lưu: repr float cho ≤ 64 bit, 36 chữ số có nghĩa cho 128 bit."""
+    if bits <= 64:
+        return repr(float(value))
+    with decimal.localcontext() as ctx:
+        ctx.prec = 36
+        return str(decimal.Decimal(value.numerator) / decimal.Decimal(value.denominator))
+
+
+def encode_ieee754_array(values, bits: int = 32) -> "np.ndarray":
+    """
+    Mã hóa cả mảng giá trị thành mẫu bit IEEE 754 (mảng số nguyên không dấu).
+    
+    Với 16/32/64 bit dùng phép ép kiểu của NumPy (làm tròn đúng, hỗ trợ số
+    không chuẩn); 128 bit không có kiểu NumPy tương ứng nên mã hóa từng số
+    và trả về mảng object gồm các số nguyên Python.
+    """
+    np = _numpy()
+    if np is None:
+        raise RuntimeError("Cần cài đặt NumPy để mã hóa theo mảng")
+    _get_ieee_params(bits)
+    if bits in _NUMPY_FLOAT_TYPES:
+        float_type, uint_type = _NUMPY_FLOAT_TYPES[bits]
+        with np.errstate(over='ignore'):
+            return np.asarray(values, dtype=np.float64).astype(float_type).view(uint_type)
+    return np.array([encode_ieee754(float(v), bits) for v in values], dtype=object)
+
+
+def decode_ieee754_array(patterns, bits: int = 32) -> "np.ndarray":
+    """Giải mã mảng mẫu bit IEEE 754 thành mảng float64."""
+    np = _numpy()
+    if np is None:
+        raise RuntimeError("Cần cài đặt NumPy để giải mã theo mảng")
+    _get_ieee_params(bits)
+    if bits in _NUMPY_FLOAT_TYPES:
+        float_type, uint_type = _NUMPY_FLOAT_TYPES[bits]
+        return np.asarray(patterns, dtype=uint_type).view(float_type).astype(np.float64)
+    return np.array([_fraction_to_float(v) if isinstance(v, Fraction) else v
+                     for v in (decode_ieee754(int(p), bits) for p in patterns)], dtype=np.float64)
+
+
+@conversion_cache.cached('decimal_to_ieee754', _canonical_ieee_args)
+@metrics.timed('converter')
+def decimal_to_ieee754(num: Union[float, str], bits: int = 32) -> Tuple[str, str]:
+    """
+    Chuyển đổi số thực sang dạng IEEE 754 16/32/64/128-bit.
+    
+    Làm tròn đúng (round-half-to-even), kể cả số không chuẩn: float được mã
+    hóa bằng struct, chuỗi thập phân và 128 bit được tính bằng số nguyên. Nên
+    truyền chuỗi người dùng nhập để tránh làm tròn hai lần qua float.
+    """
+    exp_bits, mantissa_bits, bias = _get_ieee_params(bits)
+    explanation = [f"Chuyển đổi {num} sang IEEE 754 {bits}-bit:"]
+    sign, value = _parse_real(num)
+    
+    if value == 'nan':
+        return (format(encode_ieee754(num, bits), f'0{bits}b'),
+                '\n'.join(explanation + ["Không phải là số (NaN)"]))
+    if value == 'inf':
+        return (format(encode_ieee754(num, bits), f'0{bits}b'),
+                '\n'.join(explanation + ["Số âm vô cùng" if sign else "Số dương vô cùng"]))
+    if value == 0:
+        return (str(sign) + '0' * (bits - 1),
+                '\n'.join(explanation + ["Số 0 được biểu diễn bằng tất cả các bit 0"
+                                         + (" (trừ bit dấu)" if sign else "")]))
+
+    explanation.append(f"1. Bit dấu: {sign} ({'âm' if sign else 'dương'})")
+    pattern = encode_ieee754(num, bits)
+    biased = pattern >> mantissa_bits & ((1 << exp_bits) - 1)
+    fraction = pattern & ((1 << mantissa_bits) - 1)
+    
+    if biased == (1 << exp_bits) - 1:
+        return (str(sign) + '1' * exp_bits + '0' * mantissa_bits,
+                '\n'.join(explanation + ["Số quá lớn, được biểu diễn là vô cùng"]))
+    if biased == 0 and fraction == 0:
+        return (str(sign) + '0' * (bits - 1),
+                '\n'.join(explanation + ["Số quá nhỏ, được làm tròn về 0"]))
+
+    biased_exp_binary = format(biased, f'0{exp_bits}b')
+    mantissa = format(fraction, f'0{mantissa_bits}b')
+    result = format(pattern, f'0{bits}b')
+    
+    if biased == 0:
+        explanation.extend([
+            f"2. Số quá nhỏ để chuẩn hóa: dùng dạng không chuẩn (subnormal), số mũ thực: {1 - bias}",
+            "3. Số mũ bias: 0 (dấu hiệu của số không chuẩn)",
+        ])
+    else:
+        explanation.extend([
+            f"2. Số mũ thực: {biased - bias}",
+            f"3. Số mũ bias (E = e + {bias}): {biased}",
+        ])
+    explanation.extend([
+        f"4. Số mũ nhị phân: {biased_exp_binary}",
+        f"5. Mantissa: {mantissa}",
+    ])
+    if bits in _STRUCT_FORMATS:
+        stored = abs(struct.unpack(_STRUCT_FORMATS[bits], pattern.to_bytes(bits // 8, 'big'))[0])
+        exact = stored == abs(num) if isinstance(num, float) else Fraction(stored) == value
+        shown = repr(stored)
+    else:
+        stored = abs(decode_ieee754(pattern, bits))
+        exact = stored == value
+        shown = _format_exact(stored, bits)
+    if not exact:
+        explanation.append(f"6. Giá trị thực sự được lưu (sau khi làm tròn): {shown}")
+    explanation.extend([
+        f"\nKết quả: {result}",
+        f"- Bit dấu (1 bit): {sign}",
+        f"- Số mũ ({exp_bits} bits): {biased_exp_binary}",
+        f"- Mantissa ({mantissa_bits} bits): {mantissa}"
+    ])
+    
+    return result, '\n'.join(explanation)
+
+@conversion_cache.cached('ieee754_to_decimal', _canonical_ieee_binary)
+@metrics.timed('converter')
+def ieee754_to_decimal(binary: str) -> Tuple[float, str]:
+    """
+    Chuyển đổi số IEEE 754 (16/32/64/128 bit) sang số thực.
+    
+    Giá trị được tính chính xác bằng phân số; kết quả trả về là float gần
+    nhất (với 128 bit, giải thích hiển thị 36 chữ số có nghĩa).
+    """
+    binary = binary.strip()
+    bits = len(binary)
+    exp_bits, mantissa_bits, bias = _get_ieee_params(bits)
+    
+    if not set(binary).issubset({'0', '1'}):
+        raise ValueError("Chuỗi nhị phân chỉ được chứa ký tự 0 và 1")
+
+    explanation = [f"Chuyển đổi IEEE 754 {bits}-bit sang số thực:"]
+    
+    # Tách các phần
+    sign_bit = binary[0]
+    exp_bits_str = binary[1:exp_bits + 1]
+    mantissa_bits_str = binary[exp_bits + 1:]
+    
+    explanation.extend([
+        "1. Tách các thành phần:",
+        f"   - Bit dấu: {sign_bit} ({'âm' if sign_bit == '1' else 'dương'})",
+        f"   - Số mũ (biased): {exp_bits_str}",
+        f"   - Mantissa: {mantissa_bits_str}"
+    ])
+
+    exp_val = int(exp_bits_str, 2)
+    fraction = int(mantissa_bits_str, 2)
+    
+    # Xử lý các trường hợp đặc biệt
+    if exp_val == 0 and fraction == 0:
+        return 0.0 if sign_bit == '0' else -0.0, '\n'.join(explanation + ["Số zero (±0)"])
+    if exp_val == (1 << exp_bits) - 1:
+        if fraction == 0:
+            return float('inf') if sign_bit == '0' else float('-inf'), '\n'.join(explanation + ["Số vô cùng (±∞)"])
+        return float('nan'), '\n'.join(explanation + ["Không phải là số (NaN)"])
+
+    pattern = int(binary, 2)
+    if bits in _STRUCT_FORMATS:
+        # Giá trị 16/32/64 bit biểu diễn chính xác được bằng float
+        result = struct.unpack(_STRUCT_FORMATS[bits], pattern.to_bytes(bits // 8, 'big'))[0]
+        shown = result
+    else:
+        value = decode_ieee754(pattern, bits)
+        result = _fraction_to_float(value)
+        shown = _format_exact(value, bits)
+    mantissa = (0 if exp_val == 0 else 1) + fraction / (1 << mantissa_bits)
+    if exp_val == 0:
+        exp = 1 - bias
+        explanation.append(f"2. Số mũ bằng 0: số không chuẩn (subnormal), số mũ thực = 1 - {bias} = {exp}")
+    else:
+        exp = exp_val - bias
+        explanation.append(f"2. Số mũ thực = {exp_val} - {bias} = {exp}")
+    
+    explanation.extend([
+        f"3. Giá trị mantissa = {mantissa:.10f}",
+        f"\nKết quả = {'-1' if sign_bit == '1' else '1'} × {mantissa:.10f} × 2^{exp} = {shown}"
+    ])
+    
+    return result, '\n'.join(explanation)
+
+
+# Các converter dùng cache chung, theo tên trong thống kê của cache
+CACHED_CONVERTERS: Dict[str, Callable] = {
+    'convert_base': convert_base_result,
+    'convert_to_signed_binary': convert_to_signed_binary,
+    'convert_float_to_binary': convert_float_to_binary,
+    'decimal_to_ieee754': decimal_to_ieee754,
+    'ieee754_to_decimal': ieee754_to_decimal,
+}
@@ -0,0 +1,124 @@
+"""
+Bộ phân phối update theo chat cho TeleBot đồng bộ.
+
+Mặc định telebot đẩy mỗi update vào thread pool chung nên các update của
+cùng một chat có thể chạy song song và sai thứ tự. ChatDispatcher chia
+update theo chat_id vào một số worker cố định: mỗi chat luôn rơi vào cùng
+một worker (tuần tự, đúng thứ tự), các chat khác nhau chạy song song.
+
+Các phép chuyển đổi nặng được handler đẩy sang process pool (xem
+run_conversion trong converters.py) để không chiếm worker của các chat khác.
+"""
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def chat_id_of(update) -> Optional[int]:
+    """Trả về chat_id của update (None nếu update không gắn với chat nào)."""
+    for field in ('message', 'edited_message', 'callback_query'):
+        item = getattr(update, field, None)
+        if item is None:
+            continue
+        if field == 'callback_query':
+            item = item.message
+        if item is not None and getattr(item, 'chat', None) is not None:
+            return item.chat.id
+    # Inline query không gắn với chat: chia theo người dùng (trùng id chat riêng)
+    # để các query khi gõ của một người tới bộ debounce đúng thứ tự
+    inline_query = getattr(update, 'inline_query', None)
+    if inline_query is not None:
+        return inline_query.from_user.id
+    return None
+
+
+class ChatDispatcher:
+    def __init__(self, bot, workers: int = 8, max_queue: int = 1000):
+        """
+        Args:
+            bot: TeleBot đã đăng ký handler
+            workers: Số worker thread (mỗi worker phụ trách một nhóm chat)
+            max_queue: Số update tối đa chờ trong hàng đợi của mỗi worker;
+                       đầy thì dispatch() chờ (giảm tốc độ nhận update)
+        """
+        self.bot = bot
+        self.workers = workers
+        self._process = bot.process_new_updates
+        self._queues: List[queue.Queue] = [queue.Queue(maxsize=max_queue) for _ in range(workers)]
+        self._threads: List[threading.Thread] = []
+        self._stats_lock = threading.Lock()
+        self._stats = {'dispatched': 0, 'processed': 0, 'failed': 0,
+                       'queue_wait_total': 0.0, 'queue_wait_max': 0.0}
+
+    def _shard(self, update) -> int:
+        key = chat_id_of(update)
+        if key is None:
+            key = update.update_id
+        return hash(key) % self.workers
+
+    def dispatch(self, updates) -> None:
+        """Đưa các update vào hàng đợi của worker phụ trách chat tương ứng."""
+        now = time.monotonic()
+        for update in updates:
+            # process_new_updates gốc tự tăng offset của polling; khi thay nó
+            # phải làm thay, nếu không getUpdates trả lại các update cũ
+            if update.update_id > self.bot.last_update_id:
+                self.bot.last_update_id = update.update_id
+            self._queues[self._shard(update)].put((update, now))
+        with self._stats_lock:
+            self._stats['dispatched'] += len(updates)
+
+    def _work(self, shard_queue: queue.Queue) -> None:
+        while True:
+            item = shard_queue.get()
+            if item is None:
+                return
+            update, received = item
+            wait = time.monotonic() - received
+            try:
+                self._process([update])
+                key = 'processed'
+            except Exception:
+                key = 'failed'
+                logger.exception("Không xử lý được update %s", update.update_id)
+            with self._stats_lock:
+                self._stats[key] += 1
+                self._stats['queue_wait_total'] += wait
+                self._stats['queue_wait_max'] = max(self._stats['queue_wait_max'], wait)
+
+    def start(self) -> 'ChatDispatcher':
+        """
+        Chạy các worker và thay bot.process_new_updates bằng dispatch().
+
+        Handler được chạy trực tiếp trong worker (bot.threaded = False), nên
+        polling và webhook đều đi qua bộ phân phối này.
+        """
+        self.bot.threaded = False
+        for i, shard_queue in enumerate(self._queues):
+            thread = threading.Thread(target=self._work, args=(shard_queue,),
+                                      name=f'chat-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self.bot.process_new_updates = self.dispatch
+        return self
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Xử lý nốt các update đã nhận rồi dừng worker."""
+        self.bot.process_new_updates = self._process
+        for shard_queue in self._queues:
+            shard_queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = [q.qsize() for q in self._queues]
+        done = stats['processed'] + stats['failed']
+        stats['avg_queue_wait'] = stats.pop('queue_wait_total') / done if done else 0.0
+        return stats
@@ -0,0 +1,92 @@
+"""
+Xuất lịch sử chuyển đổi thành tệp CSV hoặc JSON nén gzip, theo luồng.
+
+Các dòng được đọc từ DatabaseManager.iter_history theo từng cửa sổ id và ghi
+thẳng qua gzip vào một SpooledTemporaryFile: bộ nhớ dùng chỉ gồm một cửa sổ
+dòng và tối đa spool_size byte dữ liệu nén, phần vượt quá được ghi ra tệp tạm
+trên đĩa.
+"""
+import csv
+import gzip
+import io
+import json
+import tempfile
+import time
+from typing import IO, Iterable, Tuple
+
+EXPORT_FORMATS = ('csv', 'json')
+# Giới hạn kích thước tệp bot được gửi lên Telegram
+MAX_DOCUMENT_BYTES = 50 * 1024 * 1024
+SPOOL_SIZE = 1024 * 1024
+# Số ký tự gom trong bộ nhớ trước mỗi lần ghi qua gzip
+CHUNK_CHARS = 64 * 1024
+
+CSV_HEADER = ("Người dùng", "ID", "Thời gian", "Chuyển đổi")
+
+
+def _format_time(epoch: int) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(epoch))
+
+
+def write_export(rows: Iterable[Tuple[int, int, str, int]], fmt: str = 'csv',
+                 include_user: bool = False, spool_size: int = SPOOL_SIZE) -> Tuple[IO[bytes], int]:
+    """
+    Ghi các dòng lịch sử thành tệp nén gzip.
+
+    Args:
+        rows: Các dòng (id_tele, id, conversion_text, conversion_time)
+        fmt: 'csv' hoặc 'json' (một mảng JSON, mỗi phần tử một dòng)
+        include_user: Có ghi cột id người dùng hay không (bản xuất của admin)
+        spool_size: Số byte dữ liệu nén giữ trong bộ nhớ trước khi ghi ra đĩa
+
+    Returns:
+        (tệp đã được đưa về đầu, số dòng đã ghi)
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Định dạng không hỗ trợ: {fmt}")
+    spool = tempfile.SpooledTemporaryFile(max_size=spool_size)
+    # mtime=0 để cùng dữ liệu luôn cho cùng một tệp nén
+    text = io.TextIOWrapper(gzip.GzipFile(fileobj=spool, mode='wb', compresslevel=6, mtime=0),
+                            encoding='utf-8', newline='')
+    # Gom thành khối CHUNK_CHARS ký tự: ghi từng dòng qua TextIOWrapper chậm hơn
+    chunk = io.StringIO()
+    count = 0
+    # Các dòng ghi cùng một lô thường trùng thời điểm: chỉ định dạng khi đổi
+    last_epoch, last_time = None, ''
+    try:
+        if fmt == 'csv':
+            writer = csv.writer(chunk)
+            writer.writerow(CSV_HEADER if include_user else CSV_HEADER[1:])
+        else:
+            chunk.write('[')
+        for user_id, row_id, conversion_text, conversion_time in rows:
+            if conversion_time != last_epoch:
+                last_epoch, last_time = conversion_time, _format_time(conversion_time)
+            if fmt == 'csv':
+                if include_user:
+                    writer.writerow((user_id, row_id, last_time, conversion_text))
+                else:
+                    writer.writerow((row_id, last_time, conversion_text))
+            else:
+                item = {'id': row_id, 'time': last_time, 'epoch': conversion_time,
+                        'conversion': conversion_text}
+                if include_user:
+                    item = {'id_tele': user_id, **item}
+                chunk.write(',\n' if count else '\n')
+                chunk.write(json.dumps(item, ensure_ascii=False))
+            count += 1
+            if chunk.tell() >= CHUNK_CHARS:
+                text.write(chunk.getvalue())
+                chunk.seek(0)
+                chunk.truncate()
+        if fmt == 'json':
+            chunk.write('\n]\n')
+        text.write(chunk.getvalue())
+    except BaseException:
+        text.close()
+        spool.close()
+        raise
+    # Đóng wrapper để gzip ghi phần đuôi; spool vẫn mở vì GzipFile không sở hữu nó
+    text.close()
+    spool.seek(0)
+    return spool, count
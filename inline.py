@@ -0,0 +1,208 @@
+"""
+Chế độ inline: gõ "@bot 0xFF" trong bất kỳ chat nào để thấy ngay các thẻ kết
+quả (các hệ cơ số khác, nhị phân có dấu, IEEE 754) mà không cần chat riêng.
+
+- Thẻ chỉ dùng các đường nhanh tính kết quả (convert_base_result,
+  signed_binary_result, ieee754_result), không dựng lời giải thích.
+- Bộ thẻ của mỗi query được lưu trong conversion_cache (mục 'inline_results');
+  Telegram cũng giữ câu trả lời theo cache_time.
+- Query chưa có trong cache chỉ được trả lời khi người dùng ngừng gõ `delay`
+  giây (InlineDebouncer), nên gõ từng ký tự không gây một lần chuyển đổi và
+  một lời gọi Bot API cho mỗi phím.
+"""
+import heapq
+import itertools
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from converters import (conversion_cache, convert_base_result, ieee754_result, parse_batch_line,
+                        signed_binary_result)
+
+logger = logging.getLogger(__name__)
+
+INLINE_BASES = (2, 8, 10, 16)
+INLINE_SIGNED_BITS = (8, 16, 32, 64)
+INLINE_INT_IEEE_BITS = (32, 64)
+INLINE_FLOAT_IEEE_BITS = (16, 32, 64)
+# Telegram giới hạn query 256 ký tự và tiêu đề/mô tả thẻ hiển thị được khá ngắn
+MAX_INLINE_QUERY = 256
+MAX_DESCRIPTION = 100
+
+_NEGATIVE_RE = re.compile(r'-\d+')
+_FLOAT_RE = re.compile(r'[+-]?(?:\d+\.\d*|\.\d+)(?:[eE][+-]?\d+)?')
+
+# (id thẻ, tiêu đề, mô tả, nội dung tin nhắn gửi vào chat)
+InlineResult = Tuple[str, str, str, str]
+
+
+def _shorten(text: str) -> str:
+    if len(text) <= MAX_DESCRIPTION:
+        return text
+    return f"{text[:MAX_DESCRIPTION - 1]}…"
+
+
+def _signed_results(decimal: str) -> List[InlineResult]:
+    value = int(decimal)
+    results = []
+    for bits in INLINE_SIGNED_BITS:
+        if -(1 << (bits - 1)) <= value < (1 << (bits - 1)):
+            result = signed_binary_result(decimal, bits)
+            results.append((f'signed{bits}', f"Nhị phân có dấu {bits} bit", result,
+                            f"{decimal} = {result} (nhị phân có dấu {bits} bit)"))
+    return results
+
+
+def _ieee_results(num: str, bits_list: Tuple[int, ...]) -> List[InlineResult]:
+    results = []
+    for bits in bits_list:
+        result = ieee754_result(num, bits)
+        results.append((f'ieee{bits}', f"IEEE 754 {bits}-bit", _shorten(result),
+                        f"{num} = {result} (IEEE 754 {bits}-bit)"))
+    return results
+
+
+def build_inline_results(text: str) -> Tuple[InlineResult, ...]:
+    """
+    Bộ thẻ kết quả cho một query; () nếu query (chưa) phải là một số hợp lệ.
+
+    Nhận số nguyên như chế độ hàng loạt ("FF", "0b1010", "777 8"), số âm hệ 10
+    ("-42") và số thực ("3.14", "-1.5e-3").
+    """
+    text = text.strip()
+    if not text or len(text) > MAX_INLINE_QUERY:
+        return ()
+    if _NEGATIVE_RE.fullmatch(text):
+        decimal = str(int(text))
+        return tuple(_signed_results(decimal) + _ieee_results(decimal, INLINE_INT_IEEE_BITS))
+    if _FLOAT_RE.fullmatch(text):
+        return tuple(_ieee_results(text, INLINE_FLOAT_IEEE_BITS))
+    try:
+        num_str, from_base = parse_batch_line(text)
+    except ValueError:
+        return ()
+
+    results = []
+    for to_base in INLINE_BASES:
+        if to_base != from_base:
+            result = convert_base_result(num_str, from_base, to_base)
+            results.append((f'base{to_base}', f"Hệ {to_base}", _shorten(result),
+                            f"{num_str} (hệ {from_base}) = {result} (hệ {to_base})"))
+    if from_base == 10:
+        decimal = num_str.lstrip('0') or '0'
+    else:
+        decimal = convert_base_result(num_str, from_base, 10)
+    results += _signed_results(decimal)
+    results += _ieee_results(decimal, INLINE_INT_IEEE_BITS)
+    return tuple(results)
+
+
+def cached_inline_results(text: str) -> Optional[Tuple[InlineResult, ...]]:
+    """Bộ thẻ đã tính của query, None nếu chưa có trong cache."""
+    hit, results = conversion_cache.get('inline_results', text)
+    return results if hit else None
+
+
+def inline_results(text: str) -> Tuple[InlineResult, ...]:
+    """Tính bộ thẻ của query và lưu vào cache."""
+    results = build_inline_results(text)
+    conversion_cache.put('inline_results', text, results)
+    return results
+
+
+class InlineDebouncer:
+    """
+    Chỉ trả lời query cuối cùng của mỗi người dùng sau khi họ ngừng gõ.
+
+    Mỗi query mới thay query đang chờ của cùng người dùng và lùi hạn trả lời
+    thêm `delay` giây. Một thread hẹn giờ chọn các query đến hạn, việc tính
+    kết quả và gọi Bot API chạy ở thread pool nên không chặn nhau.
+    """
+
+    def __init__(self, answer: Callable[[Any], None], delay: float = 0.3, workers: int = 4,
+                 max_pending: int = 10000):
+        """
+        Args:
+            answer: Hàm trả lời một query (tính kết quả và gọi answer_inline_query)
+            delay: Số giây không gõ thêm trước khi trả lời
+            workers: Số thread trả lời song song
+            max_pending: Số người dùng có query chờ tối đa; vượt quá thì trả lời ngay
+        """
+        self.answer = answer
+        self.delay = delay
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix='inline-answer')
+        self._cond = threading.Condition()
+        # id người dùng -> (hạn trả lời, query đang chờ)
+        self._pending: Dict[int, Tuple[float, Any]] = {}
+        self._heap: List[Tuple[float, int, int]] = []  # (hạn, seq, id người dùng)
+        self._seq = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._stats = {'submitted': 0, 'answered': 0, 'superseded': 0}
+
+    def submit(self, user_id: int, query) -> None:
+        """Hẹn trả lời query; query trước đó của cùng người dùng bị bỏ."""
+        with self._cond:
+            if self._stopping:
+                return
+            self._stats['submitted'] += 1
+            if user_id in self._pending:
+                self._stats['superseded'] += 1
+            elif len(self._pending) >= self.max_pending:
+                self._dispatch(query)
+                return
+            due = time.monotonic() + self.delay
+            self._pending[user_id] = (due, query)
+            heapq.heappush(self._heap, (due, next(self._seq), user_id))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='inline-debounce', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _dispatch(self, query) -> None:
+        self._stats['answered'] += 1
+        self._executor.submit(self._answer, query)
+
+    def _answer(self, query) -> None:
+        try:
+            self.answer(query)
+        except Exception:
+            logger.exception("Không trả lời được inline query %s", getattr(query, 'id', None))
+
+    def _run(self) -> None:
+        with self._cond:
+            while not self._stopping:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                due, _, user_id = self._heap[0]
+                now = time.monotonic()
+                if due > now:
+                    self._cond.wait(due - now)
+                    continue
+                heapq.heappop(self._heap)
+                pending = self._pending.get(user_id)
+                # Mục cũ trong heap của query đã bị thay thì bỏ qua
+                if pending is not None and pending[0] == due:
+                    del self._pending[user_id]
+                    self._dispatch(pending[1])
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return dict(self._stats, pending=len(self._pending))
+
+    def close(self) -> None:
+        """Trả lời ngay các query đang chờ rồi dừng."""
+        with self._cond:
+            self._stopping = True
+            pending = [query for _, query in self._pending.values()]
+            self._pending.clear()
+            self._heap.clear()
+            self._cond.notify_all()
+        for query in pending:
+            self._answer(query)
+        self._executor.shutdown(wait=True)
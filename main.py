@@ -1,505 +1,330 @@
+"""
+Bot Telegram chuyển đổi hệ số: khởi tạo bot, các handler hội thoại và điểm
+vào dòng lệnh (python main.py).
+
+Import module này không tạo TeleBot và không mở database: bot (get_bot(),
+main.bot) cùng các dịch vụ lưu trữ (db, writer, sessions, warm_store, retention) được tạo
+ở lần dùng đầu tiên. Các hàm chuyển đổi nằm ở converters.py, phần lưu trữ ở
+storage.py.
+"""
 import telebot
 from telebot import types
-import re
-import sqlite3
-from datetime import datetime
-from functools import lru_cache
-from contextlib import contextmanager
-from typing import Optional, Tuple, List, Dict
-from math import log2, floor, isnan, isinf
+import io
+import csv
+import html
+import unicodedata
+import os
 import threading
-# Thay thế 'YOUR_BOT_TOKEN' bằng token thực của bot của bạn
-bot = telebot.TeleBot('your_token')
+import time
+import atexit
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, List, Optional
 
-# Lưu trữ trạng thái
-user_state = {}
+from converters import (CACHED_CONVERTERS, FLOAT_BASE_CHOICES, FLOAT_PRECISION, IEEE_CHOICES,
+                        MAX_BATCH_LINES, conversion_cache, convert_base, convert_base_result,
+                        convert_batch, convert_float_to_binary, convert_to_signed_binary,
+                        IEEE_DECODE_16_CHOICE, decimal_to_ieee754, detect_base, ieee754_to_decimal,
+                        is_ieee754_binary,
+                        parse_batch_line, run_conversion, _parse_in_base)
+from export import EXPORT_FORMATS, MAX_DOCUMENT_BYTES, write_export
+from inline import InlineDebouncer, cached_inline_results, inline_results
+from metrics import metrics
+from storage import (DatabaseManager, HistoryRetention, SessionStore, WarmStartStore, WriteBehindQueue,
+                     compact_history_text)
 
-class DatabaseManager:
-    def __init__(self, db_name: str = 'bot_database.db'):
-        """
-        Khởi tạo DatabaseManager với connection pooling và thread safety.
-        
-        Args:
-            db_name: Tên file database
-        """
-        self.db_name = db_name
-        self._local = threading.local()
+logger = logging.getLogger(__name__)
+
+# ID Telegram (cách nhau bởi dấu phẩy) được dùng các lệnh quản trị như /stats
+ADMIN_IDS = {int(item) for item in os.environ.get('ADMIN_IDS', '').replace(',', ' ').split()}
+
+_bot: Optional[telebot.TeleBot] = None
+_bot_lock = threading.Lock()
+
+
+def get_bot() -> telebot.TeleBot:
+    """TeleBot dùng chung, được tạo và đăng ký handler ở lần gọi đầu tiên."""
+    global _bot
+    with _bot_lock:
+        if _bot is None:
+            # Đặt biến môi trường BOT_TOKEN bằng token thực của bot
+            _bot = telebot.TeleBot(os.environ.get('BOT_TOKEN', 'your_token'))
+            _register_handlers(_bot)
+        return _bot
+
+
+def __getattr__(name):
+    # main.bot chỉ được tạo khi có nơi truy cập đến
+    if name == 'bot':
+        return get_bot()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class _LazyService:
+    """Proxy tạo đối tượng thật (database, hàng đợi ghi...) ở lần truy cập đầu tiên."""
+
+    def __init__(self, factory: Callable[[], object]):
+        self._factory = factory
+        self._instance = None
         self._lock = threading.Lock()
-        self.initialize_db()
-
-    @contextmanager
-    def get_connection(self):
-        """
-        Context manager để quản lý connection pool.
-        Tự động đóng connection sau khi sử dụng.
-        """
-        if not hasattr(self._local, 'connection'):
-            self._local.connection = sqlite3.connect(self.db_name, timeout=20)
-            # Enable WAL mode for better concurrent access
-            self._local.connection.execute('PRAGMA journal_mode=WAL')
-            # Enable foreign key constraints
-            self._local.connection.execute('PRAGMA foreign_keys=ON')
-        
-        try:
-            yield self._local.connection
-        finally:
-            if hasattr(self._local, 'connection'):
-                self._local.connection.close()
-                del self._local.connection
-
-    def initialize_db(self) -> None:
-        """Khởi tạo database với indexes để tối ưu truy vấn."""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Tạo bảng users với các indexes phù hợp
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id_tele INTEGER PRIMARY KEY,
-                hoten TEXT NOT NULL,
-                username TEXT,
-                last_time_using TEXT NOT NULL,
-                convert_all INTEGER DEFAULT 0
-            )
-            ''')
-            
-            # Tạo index cho username để tìm kiếm nhanh
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_username ON users(username)')
-            
-            # Tạo bảng conversion_history với cấu trúc tối ưu
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS conversion_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                id_tele INTEGER NOT NULL,
-                conversion_text TEXT NOT NULL,
-                conversion_time TEXT NOT NULL,
-                FOREIGN KEY (id_tele) REFERENCES users (id_tele) ON DELETE CASCADE
-            )
-            ''')
-            
-            # Tạo index cho id_tele và conversion_time để tối ưu truy vấn lịch sử
-            cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_conversion_history 
-            ON conversion_history(id_tele, conversion_time DESC)
-            ''')
-            
-            conn.commit()
 
-    def update_user_data(self, user) -> None:
-        """
-        Cập nhật thông tin người dùng với prepared statement.
-        
-        Args:
-            user: Đối tượng user từ Telegram
-        """
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        full_name = f"{user.first_name or ''} {user.last_name or ''}".strip()
-        
-        with self.get_connection() as conn:
-            conn.execute('''
-            INSERT INTO users (id_tele, hoten, username, last_time_using)
-            VALUES (?, ?, ?, ?)
-            ON CONFLICT(id_tele) DO UPDATE SET
-                hoten = excluded.hoten,
-                username = excluded.username,
-                last_time_using = excluded.last_time_using
-            ''', (user.id, full_name, user.username, current_time))
-            conn.commit()
-
-    def update_convert_all(self, user_id: int) -> None:
-        """
-        Tăng số lần chuyển đổi với prepared statement.
-        
-        Args:
-            user_id: ID của người dùng
-        """
-        with self.get_connection() as conn:
-            conn.execute('''
-            UPDATE users 
-            SET convert_all = convert_all + 1,
-                last_time_using = ?
-            WHERE id_tele = ?
-            ''', (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), user_id))
-            conn.commit()
-
-    def add_conversion_history(self, user_id: int, conversion_text: str) -> None:
-        """
-        Thêm lịch sử chuyển đổi với prepared statement.
-        
-        Args:
-            user_id: ID của người dùng
-            conversion_text: Nội dung chuyển đổi
-        """
-        with self.get_connection() as conn:
-            conn.execute('''
-            INSERT INTO conversion_history (id_tele, conversion_text, conversion_time)
-            VALUES (?, ?, ?)
-            ''', (user_id, conversion_text, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-            conn.commit()
-
-    def get_user_history(self, user_id: int, limit: int = 10) -> Tuple[int, List[str]]:
-        """
-        Lấy lịch sử chuyển đổi với prepared statement và tối ưu query.
-        
-        Args:
-            user_id: ID của người dùng
-            limit: Số lượng lịch sử muốn lấy
-            
-        Returns:
-            Tuple chứa tổng số lần chuyển đổi và danh sách lịch sử
-        """
-        with self.get_connection() as conn:
-            # Sử dụng một transaction cho nhiều queries
-            cursor = conn.cursor()
-            
-            # Lấy tổng số lần chuyển đổi
-            cursor.execute(
-                'SELECT convert_all FROM users WHERE id_tele = ?', 
-                (user_id,)
-            )
-            total = cursor.fetchone()
-            total_conversions = total[0] if total else 0
-            
-            # Lấy lịch sử gần nhất với index optimization
-            cursor.execute('''
-            SELECT conversion_text 
-            FROM conversion_history 
-            WHERE id_tele = ? 
-            ORDER BY conversion_time DESC 
-            LIMIT ?
-            ''', (user_id, limit))
-            
-            history = cursor.fetchall()
-            return total_conversions, [row[0] for row in history]
+    def _resolve(self):
+        """Đối tượng thật (tạo nếu chưa có)."""
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return self._instance
 
-    def clear_user_history(self, user_id: int) -> None:
-        """
-        Xóa lịch sử chuyển đổi trong một transaction.
-        
-        Args:
-            user_id: ID của người dùng
-        """
-        with self.get_connection() as conn:
-            # Thực hiện cả hai operations trong cùng một transaction
-            conn.execute('BEGIN')
-            try:
-                conn.execute(
-                    'DELETE FROM conversion_history WHERE id_tele = ?', 
-                    (user_id,)
-                )
-                conn.execute(
-                    'UPDATE users SET convert_all = 0 WHERE id_tele = ?', 
-                    (user_id,)
-                )
-                conn.commit()
-            except Exception:
-                conn.rollback()
-                raise
-
-db = DatabaseManager()
-
-def detect_base(num_str):
-# Kiểm tra hệ nhị phân (hệ 2)
-    if re.match(r'^[01]+$', num_str):
-        return 2
-# Kiểm tra hệ bát phân (hệ 8)
-    elif re.match(r'^[0-7]+$', num_str):
-        return 8
-# Kiểm tra hệ thập phân (hệ 10)
-    elif re.match(r'^[0-9]+$', num_str):
-        return 10
-# Kiểm tra hệ thập lục phân (hệ 16)
-    elif re.match(r'^[0-9A-Fa-f]+$', num_str):
-        return 16
-    else:
-        raise ValueError("Không thể xác định hệ cơ số. Vui lòng nhập một số hợp lệ.")
-# Tạo lookup table để tối ưu việc chuyển đổi
-BINARY_LOOKUP: Dict[int, str] = {i: format(i, 'b') for i in range(256)}
-COMPLEMENT_TABLE = str.maketrans('01', '10')
-
-@lru_cache(maxsize=1024)
-def _get_binary_str(num: int, bits: int) -> str:
-    """Helper function để cache các kết quả chuyển đổi phổ biến."""
-    if 0 <= num < 256:
-        return BINARY_LOOKUP[num].zfill(bits)
-    return format(num, f'0{bits}b')
-
-@lru_cache(maxsize=1024)
-def convert_to_signed_binary(num_str: str, bits: int = 8) -> Tuple[str, str]:
-    """
-    Chuyển đổi số thập phân sang số nhị phân có dấu (phiên bản tối ưu).
-    """
-    try:
-        num = int(num_str)
-    except ValueError:
-        raise ValueError(f"'{num_str}' không phải là số nguyên hợp lệ")
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
 
-    is_negative = num < 0
-    abs_num = abs(num)
-    
-    # Kiểm tra giới hạn của số
-    max_value = (1 << (bits - 1)) - 1
-    min_value = -(1 << (bits - 1))
-    if not min_value <= num <= max_value:
-        raise ValueError(f"Số nằm ngoài phạm vi [{min_value}, {max_value}]")
 
-    explanation: List[str] = [f"Chuyển đổi {num_str} sang nhị phân có dấu:"]
-    
-    if is_negative:
-        explanation.append(f"1. Bỏ dấu trừ: {abs_num}")
-        
-        # Sử dụng helper function đã được cache
-        binary = _get_binary_str(abs_num, bits)
-        explanation.append(f"2. Chuyển sang nhị phân {bits}-bit: {binary}")
-        
-        # Tối ưu việc lấy bù 1 với translation table
-        complement_one = binary.translate(COMPLEMENT_TABLE)
-        explanation.append(f"3. Lấy bù 1 (đảo bit): {complement_one}")
-        
-        # Tối ưu việc lấy bù 2 với bitwise operations
-        complement_two = _get_binary_str((int(complement_one, 2) + 1) & ((1 << bits) - 1), bits)
-        explanation.append(f"4. Cộng thêm 1 để có bù 2: {complement_two}")
-        
-        return complement_two, '\n'.join(explanation)
+# Thread giữ connection lâu dài ngoài các worker xử lý update: main, db-writer,
+# HistoryRetention, snapshot phiên, làm mới kho kết quả nóng (còn lại để dự phòng)
+DB_BACKGROUND_CONNECTIONS = 8
+_update_workers = 8
+
+
+def configure_workers(workers: int) -> None:
+    """
+    Đặt số worker xử lý update (ChatDispatcher hoặc thread pool của AsyncEngine).
     
-    binary = _get_binary_str(abs_num, bits)
-    explanation.extend([
-        f"1. Chuyển sang nhị phân {bits}-bit: {binary}",
-        "Số dương nên không cần chuyển đổi thêm."
-    ])
+    Mỗi worker giữ một connection tới khi thread kết thúc, nên pool được cấp
+    workers + DB_BACKGROUND_CONNECTIONS connection; phải gọi trước lần dùng
+    database đầu tiên.
+    """
+    global _update_workers
+    if db._instance is not None and db.max_connections < workers + DB_BACKGROUND_CONNECTIONS:
+        raise RuntimeError(f"Pool database đã mở với {db.max_connections} connection, "
+                           f"không đủ cho {workers} worker")
+    _update_workers = workers
+
+
+def _create_db() -> DatabaseManager:
+    database = DatabaseManager(max_connections=_update_workers + DB_BACKGROUND_CONNECTIONS)
+    atexit.register(database.close)
+    metrics.add_collector('db_pool', database.pool_stats)
+    return database
+
+
+def _create_writer() -> WriteBehindQueue:
+    queue = WriteBehindQueue(db._resolve())
+    # atexit chạy theo thứ tự ngược: writer được flush trước khi đóng pool
+    atexit.register(queue.close)
+    metrics.add_collector('writer', queue.metrics)
+    return queue
+
+
+def _create_sessions() -> SessionStore:
+    # Trạng thái hội thoại theo chat, khôi phục từ snapshot của lần chạy trước
+    store = SessionStore(db=db._resolve())
+    store.restore()
+    store.start_autosnapshot()
+    atexit.register(store.close)
+    metrics.add_collector('sessions', store.stats)
+    return store
+
+
+def _create_warm_store() -> WarmStartStore:
+    # Nạp kết quả nóng từ lần chạy trước (WARM_CACHE_ENTRIES=0 để tắt)
+    store = WarmStartStore(conversion_cache, db._resolve(), CACHED_CONVERTERS,
+                           max_entries=int(os.environ.get('WARM_CACHE_ENTRIES', 2000)))
+    store.load()
+    atexit.register(store.close)
+    metrics.add_collector('warm_store', store.stats)
+    return store
+
+
+def _create_retention() -> HistoryRetention:
+    # Giới hạn lịch sử mỗi người dùng và theo tuổi (0 để bỏ giới hạn)
+    retention = HistoryRetention(db._resolve(),
+                                 max_rows_per_user=int(os.environ.get('HISTORY_MAX_ROWS', 1000)),
+                                 max_age_days=float(os.environ.get('HISTORY_MAX_AGE_DAYS', 365)))
+    atexit.register(retention.close)
+    metrics.add_collector('retention', retention.stats)
+    return retention
+
+
+def _create_inline_debouncer() -> InlineDebouncer:
+    # Chỉ trả lời query cuối cùng khi người dùng ngừng gõ INLINE_DEBOUNCE giây
+    debouncer = InlineDebouncer(_answer_inline_query,
+                                delay=float(os.environ.get('INLINE_DEBOUNCE', 0.3)))
+    atexit.register(debouncer.close)
+    metrics.add_collector('inline', debouncer.stats)
+    return debouncer
+
+
+db = _LazyService(_create_db)
+writer = _LazyService(_create_writer)
+sessions = _LazyService(_create_sessions)
+warm_store = _LazyService(_create_warm_store)
+retention = _LazyService(_create_retention)
+inline_debouncer = _LazyService(_create_inline_debouncer)
+metrics.add_collector('cache', conversion_cache.stats)
+
+_sender_local = threading.local()
+
+
+class _SenderProxy:
+    """
+    Đối tượng gửi tin nhắn dùng trong handler.
     
-    return binary, '\n'.join(explanation)
+    Mặc định chuyển lời gọi tới bot; engine khác (ví dụ asyncio) có thể đặt
+    sender riêng cho thread đang chạy handler bằng use_sender().
+    """
+
+    def __getattr__(self, name):
+        return getattr(_current_sender(), name)
+
+
+sender = _SenderProxy()
+# None: gửi thẳng qua bot
+_default_sender = None
 
-@lru_cache(maxsize=1024)
-def convert_float_to_binary(num_str: str, precision: int = 10) -> Tuple[str, str]:
+
+def _current_sender():
+    """Sender thật của thread hiện tại (sender riêng, sender mặc định hoặc bot)."""
+    target = getattr(_sender_local, 'sender', _default_sender)
+    return target if target is not None else get_bot()
+
+
+def send_document(chat_id, document, **kwargs) -> None:
     """
-    Chuyển đổi số thực sang dạng nhị phân (phiên bản tối ưu).
+    Gửi tệp qua sender hiện tại và đóng tệp khi đã gửi xong.
+    
+    Outbox và engine asyncio gửi sau khi handler trả về nên tự đóng tệp
+    (owns_documents); gửi thẳng qua bot thì tệp được đóng ngay tại đây.
     """
-    # Validation
+    target = _current_sender()
     try:
-        num = float(num_str)
-    except ValueError:
-        raise ValueError(f"'{num_str}' không phải là số hợp lệ")
-    
-    if precision < 0:
-        raise ValueError("Độ chính xác không được là số âm")
-    
-    # Fast path cho các trường hợp đặc biệt
-    if num == 0:
-        return "0", "Số 0 trong hệ nhị phân là 0"
-    elif isnan(num):
-        return "NaN", "Không phải là số (NaN)"
-    elif isinf(num):
-        result = "-inf" if num < 0 else "inf"
-        return result, f"Số vô cùng ({result})"
-    
-    # Xử lý dấu
-    sign = "-" if num < 0 else "+"
-    num = abs(num)
-    
-    # Tối ưu việc tách phần nguyên và thập phân
-    int_part = int(num)
-    decimal_part = num - int_part
-    
-    # Chuyển đổi phần nguyên sử dụng helper function
-    int_binary = _get_binary_str(int_part, max(1, int_part.bit_length()))
-    
-    # Tối ưu việc chuyển đổi phần thập phân
-    binary_decimal = []
-    decimal_steps = []
-    current = decimal_part
-    
-    # Sử dụng loop được tối ưu
-    for _ in range(precision):
-        current *= 2
-        bit = int(current)
-        binary_decimal.append(str(bit))
-        
-        decimal_steps.append(
-            f"   * {decimal_part:.6f} × 2 = {current:.6f} → {bit}"
-        )
-        
-        if bit == 1:
-            current -= 1
-        
-        decimal_part = current
-        if decimal_part == 0:
-            break
-    
-    # Tạo kết quả
-    result = [sign, int_binary]
-    if binary_decimal:
-        result.extend([".", "".join(binary_decimal)])
-    
-    # Tạo giải thích
-    explanation = [
-        f"Chuyển đổi số thực {num_str} sang nhị phân:",
-        f"1. Xác định dấu: {sign}",
-        f"2. Chuyển đổi phần nguyên {int_part}:",
-        f"   {int_part} (10) = {int_binary} (2)"
-    ]
-    
-    if binary_decimal:
-        explanation.extend([
-            f"3. Chuyển đổi phần thập phân {num - int(num):.6f}:",
-            *decimal_steps
-        ])
-    else:
-        explanation.append("3. Không có phần thập phân")
-    
-    final_result = "".join(result)
-    explanation.append(f"Kết quả cuối cùng: {final_result}")
+        target.send_document(chat_id, document, **kwargs)
+    finally:
+        # So với True: sender dạng proxy (__getattr__) không được coi là sở hữu tệp
+        if getattr(target, 'owns_documents', False) is not True:
+            document.close()
+
+
+def set_default_sender(replacement) -> None:
+    """Đặt sender mặc định cho mọi thread (ví dụ Outbox thay cho gửi thẳng qua bot)."""
+    global _default_sender
+    _default_sender = replacement
+
+
+@contextmanager
+def use_sender(replacement):
+    """Tạm thay sender của thread hiện tại trong khi chạy handler."""
+    previous = getattr(_sender_local, 'sender', None)
+    _sender_local.sender = replacement
+    try:
+        yield replacement
+    finally:
+        if previous is None:
+            del _sender_local.sender
+        else:
+            _sender_local.sender = previous
+
+MAX_MESSAGE_LENGTH = 4096
+MAX_CAPTION_LENGTH = 1024
+# Câu trả lời dài hơn ngưỡng này được gửi thành một tệp văn bản thay vì nhiều tin nhắn
+DOCUMENT_THRESHOLD = int(os.environ.get('DOCUMENT_THRESHOLD', 3 * MAX_MESSAGE_LENGTH))
+NEW_CONVERSION_PROMPT = "Bạn có thể bắt đầu một phép chuyển đổi mới bằng cách nhập một số khác."
+SESSION_LOST_MESSAGE = "Phiên chuyển đổi đã hết hạn. Vui lòng nhập lại số cần chuyển đổi."
+# Một trang /history phải vừa một tin nhắn (tin được sửa khi lật trang, không
+# tách được): 10 dòng, mỗi dòng rút gọn còn tối đa 300 ký tự
+HISTORY_PAGE_SIZE = 10
+HISTORY_LINE_LENGTH = 300
+# Số giây Telegram giữ câu trả lời inline cho cùng một query (dùng chung mọi người dùng)
+INLINE_CACHE_TIME = int(os.environ.get('INLINE_CACHE_TIME', 3600))
+
+
+def _hard_cut(line: str, limit: int) -> int:
+    """Vị trí cắt một dòng quá dài, không tách dấu kết hợp khỏi ký tự gốc."""
+    cut = limit
+    while cut > 1 and unicodedata.combining(line[cut]):
+        cut -= 1
+    return cut
+
+
+def split_message(text: str, limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """
+    Chia văn bản thành các phần không quá `limit` ký tự, cắt ở ranh giới dòng.
     
-    return final_result, "\n".join(explanation)
-        
-# Constants
-HEX_DIGITS = "0123456789ABCDEF"
-HEX_TO_DEC: Dict[str, int] = {c: i for i, c in enumerate(HEX_DIGITS)}
-BINARY_TO_OCT = {format(i, '03b'): str(i) for i in range(8)}
-BINARY_TO_HEX = {format(i, '04b'): HEX_DIGITS[i] for i in range(16)}
-OCT_TO_BINARY = {str(i): format(i, '03b') for i in range(8)}
-HEX_TO_BINARY = {HEX_DIGITS[i]: format(i, '04b') for i in range(16)}
-
-@lru_cache(maxsize=5000)
-def convert_base(num_str: str, from_base: int, to_base: int) -> Tuple[str, str]:
+    Chỉ những dòng dài hơn `limit` mới bị cắt giữa dòng.
     """
-    Chuyển đổi số từ hệ cơ số này sang hệ cơ số khác với giải thích chi tiết.
+    chunks: List[str] = []
+    current = ''
+    for line in text.splitlines(keepends=True):
+        if len(current) + len(line) > limit and current:
+            chunks.append(current.rstrip('\n'))
+            current = ''
+        while len(line) > limit:
+            cut = _hard_cut(line, limit)
+            chunks.append(line[:cut])
+            line = line[cut:]
+        current += line
+    if current or not chunks:
+        chunks.append(current.rstrip('\n'))
+    return chunks
+
+
+def deliver(message, text: str, reply_markup=None, prompt: Optional[str] = None,
+            filename: str = 'ket_qua.txt') -> None:
+    """
+    Gửi câu trả lời cho tin nhắn.
     
-    Args:
-        num_str: Số cần chuyển đổi dưới dạng chuỗi
-        from_base: Hệ cơ số gốc (2, 8, 10, 16)
-        to_base: Hệ cơ số đích (2, 8, 10, 16)
+    - Ngắn: một tin nhắn trả lời.
+    - Vừa: nhiều tin nhắn, chia ở ranh giới dòng.
+    - Dài hơn DOCUMENT_THRESHOLD: một tệp văn bản tạo trong bộ nhớ, dòng đầu
+      của câu trả lời làm chú thích.
     
-    Returns:
-        Tuple gồm kết quả chuyển đổi và giải thích
+    Lời nhắc (prompt) được ghép vào tin nhắn cuối (hoặc chú thích của tệp)
+    thay vì gửi riêng; reply_markup luôn gắn với tin nhắn cuối cùng.
     """
-    if from_base == to_base:
-        return num_str, "Không cần chuyển đổi vì cùng hệ cơ số."
-        
-    num_str = num_str.upper()
-    explanation = f"Chuyển đổi {num_str} từ cơ số {from_base} sang cơ số {to_base}:\n\n"
-
-    # Chuyển đổi sang hệ 10
-    if to_base == 10:
-        result = 0
-        power = 1
-        base_name = "8" if from_base == 8 else "16" if from_base == 16 else "2"
-        explanation += f"Sử dụng phương pháp nhân với lũy thừa của {base_name}:\n"
-        
-        for i, digit in enumerate(reversed(num_str)):
-            if from_base == 16:
-                digit_value = HEX_TO_DEC[digit]
-            else:
-                digit_value = int(digit)
-            
-            contribution = digit_value * power
-            result += contribution
-            explanation += f"  {digit} * {base_name}^{i} = {digit_value} * {power} = {contribution}\n"
-            power *= from_base
-        
-        explanation += f"Tổng: {result}\n"
-        return str(result), explanation
-
-    # Chuyển từ hệ 10
-    if from_base == 10:
-        decimal = int(num_str)
-        if decimal == 0:
-            return "0", explanation + "Số 0 giống nhau ở mọi hệ cơ số."
-            
-        # Tìm lũy thừa lớn nhất
-        max_power = 0
-        temp = decimal
-        while temp >= to_base:
-            temp //= to_base
-            max_power += 1
-
-        explanation += f"1. Tìm lũy thừa lớn nhất của {to_base} không vượt quá {decimal}: {to_base}^{max_power} = {to_base**max_power}\n\n"
-        explanation += f"2. Xây dựng số từ trái sang phải:\n"
-
-        result = []
-        remaining = decimal
-
-        for power in range(max_power, -1, -1):
-            value = to_base ** power
-            quotient = remaining // value
-            digit = HEX_DIGITS[quotient] if to_base == 16 else str(quotient)
-            result.append(digit)
-            remaining -= quotient * value
-            explanation += f"  - {remaining + quotient * value} ÷ {to_base}^{power} = {quotient}"
-            if to_base == 16:
-                explanation += f" ({digit})"
-            explanation += f" (dư {remaining})\n"
-
-        return ''.join(result), explanation
-
-    # Chuyển đổi trực tiếp giữa hệ 2, 8, 16
-    if from_base == 2:
-        if to_base == 8:
-            padding = '0' * ((3 - len(num_str) % 3) % 3)
-            padded = padding + num_str
-            groups = [padded[i:i+3] for i in range(0, len(padded), 3)]
-            
-            explanation += "Nhóm các bit thành nhóm 3 bit:\n"
-            result = []
-            
-            for group in groups:
-                oct_digit = BINARY_TO_OCT[group]
-                result.append(oct_digit)
-                explanation += f"  {group} (2) = {oct_digit} (8)\n"
-            
-            final_result = ''.join(result).lstrip('0') or '0'
-            explanation += f"Kết quả cuối cùng: {final_result}\n"
-            return final_result, explanation
-            
-        if to_base == 16:
-            padding = '0' * ((4 - len(num_str) % 4) % 4)
-            padded = padding + num_str
-            groups = [padded[i:i+4] for i in range(0, len(padded), 4)]
-            
-            explanation += "Nhóm các bit thành nhóm 4 bit:\n"
-            result = []
-            
-            for group in groups:
-                hex_digit = BINARY_TO_HEX[group]
-                result.append(hex_digit)
-                explanation += f"  {group} (2) = {hex_digit} (16)\n"
-            
-            final_result = ''.join(result).lstrip('0') or '0'
-            explanation += f"Kết quả cuối cùng: {final_result}\n"
-            return final_result, explanation
+    extra = {'reply_markup': reply_markup} if reply_markup is not None else {}
+    if len(text) > DOCUMENT_THRESHOLD:
+        document = io.BytesIO(text.encode('utf-8'))
+        document.name = filename
+        headline = text.split('\n', 1)[0]
+        if len(headline) > 200:
+            headline = headline[:200] + '…'
+        caption = f"{headline}\n\n(Toàn bộ {len(text)} ký tự trong tệp đính kèm)"
+        if prompt:
+            caption = f"{caption}\n\n{prompt}"
+        send_document(message.chat.id, document, caption=caption[:MAX_CAPTION_LENGTH],
+                      reply_to_message_id=message.message_id, **extra)
+        return
 
-    if from_base in [8, 16] and to_base == 2:
-        explanation += f"Chuyển đổi từng chữ số sang nhị phân:\n"
-        result = []
-        
-        for digit in num_str:
-            if from_base == 8:
-                binary = OCT_TO_BINARY[digit]
-            else:
-                binary = HEX_TO_BINARY[digit]
-            result.append(binary)
-            explanation += f"  {digit} ({from_base}) = {binary} (2)\n"
+    chunks = split_message(text)
+    if prompt:
+        if len(chunks[-1]) + 2 + len(prompt) <= MAX_MESSAGE_LENGTH:
+            chunks[-1] = f"{chunks[-1]}\n\n{prompt}"
+        else:
+            chunks.append(prompt)
+    if len(chunks) == 1:
+        sender.reply_to(message, chunks[0], **extra)
+        return
+    for chunk in chunks[:-1]:
+        sender.send_message(message.chat.id, chunk)
+    sender.send_message(message.chat.id, chunks[-1], **extra)
+
+
+def _decode_ieee754(message, num_str: str, **extra) -> None:
+    """Giải mã chuỗi nhị phân IEEE 754 (độ dài xác định định dạng) và trả lời."""
+    chat_id = message.chat.id
+    try:
+        result, explanation = ieee754_to_decimal(num_str)
+        conversion_history = f"{num_str} (IEEE 754) -> {result}"
+        writer.record_conversion(chat_id, conversion_history)
         
-        final_result = ''.join(result).lstrip('0') or '0'
-        explanation += f"Ghép các nhóm bit lại: {final_result}\n"
-        return final_result, explanation
-
-    # Chuyển đổi gián tiếp qua hệ nhị phân
-    binary, first_exp = convert_base(num_str, from_base, 2)
-    result, second_exp = convert_base(binary, 2, to_base)
-    explanation = first_exp + "\nSau đó:\n" + second_exp
-    return result, explanation
-    
-def convert_to_all_bases(num_str, from_base):
-    # Hàm mới: chuyển đổi số đã nhập sang tất cả các hệ 2, 8, 10, 16
-    conversions = {}
-    for to_base in [2, 8, 10, 16]:
-        if to_base != from_base:  # Bỏ qua chuyển đổi cùng hệ
-            result, _ = (num_str, from_base, to_base)
-            conversions[to_base] = result
-    return conversions
+        sessions.reset(chat_id)
+        deliver(message, explanation, **extra)
+    except Exception as e:
+        sender.reply_to(message, f"Lỗi: {str(e)}")
 
 
+@metrics.timed('handler')
 def handle_user_input(message):
     chat_id = message.chat.id
     num_str = message.text.strip().upper()  # Chuyển về chữ hoa để xử lý hệ 16
@@ -507,48 +332,27 @@ def handle_user_input(message):
     # Kiểm tra xem có phải là chuỗi nhị phân IEEE 754 không
     is_ieee, bits = is_ieee754_binary(num_str)
     if is_ieee:
-        try:
-            result, explanation = ieee754_to_decimal(num_str)
-            response = explanation
-            
-            if len(response) > 4096:
-                for x in range(0, len(response), 4096):
-                    bot.send_message(chat_id, response[x:x+4096])
-            else:
-                bot.reply_to(message, response)
-            
-            conversion_history = f"{num_str} (IEEE 754) -> {result}"
-            db.update_convert_all(chat_id)
-            db.add_conversion_history(chat_id, conversion_history)
-            
-            user_state[chat_id] = {'step': 'input_number'}
-            return
-        except Exception as e:
-            bot.reply_to(message, f"Lỗi: {str(e)}")
-            return
+        _decode_ieee754(message, num_str)
+        return
 
     # Kiểm tra số thực
     try:
         float(num_str)
         if '.' in num_str:
             markup = types.ReplyKeyboardMarkup(row_width=2)
-            markup.add(
-                'Chuyển sang nhị phân đơn giản',
-                'Chuyển sang IEEE 754 (32-bit)',
-                'Chuyển sang IEEE 754 (64-bit)'
-            )
-            user_state[chat_id] = {'step': 'choose_float_conversion', 'number': num_str}
-            bot.reply_to(message, 
+            markup.add(*FLOAT_BASE_CHOICES, *IEEE_CHOICES)
+            sessions.set(chat_id, {'step': 'choose_float_conversion', 'number': num_str})
+            sender.reply_to(message, 
                         "Hãy chọn cách chuyển đổi số thực:",
                         reply_markup=markup)
             return
     except ValueError:
         # Kiểm tra xem có phải là số hex hợp lệ không
         if all(c in '0123456789ABCDEFabcdef' for c in num_str):
-            user_state[chat_id] = {'step': 'choose_input_base', 'number': num_str}
+            sessions.set(chat_id, {'step': 'choose_input_base', 'number': num_str})
             markup = types.ReplyKeyboardMarkup(row_width=2)
             markup.add('16')  # Chỉ cho phép chọn hệ 16 vì đã xác định là số hex
-            bot.reply_to(message, 
+            sender.reply_to(message, 
                         f"Số hex cần chuyển đổi là: {num_str}\n"
                         f"Xác nhận đây là số hệ 16:", 
                         reply_markup=markup)
@@ -559,33 +363,34 @@ def handle_user_input(message):
     if is_negative:
         remaining_num = num_str[1:]
         if not remaining_num.isdigit():
-            bot.reply_to(message, "Vui lòng nhập một số nguyên âm hợp lệ.")
+            sender.reply_to(message, "Vui lòng nhập một số nguyên âm hợp lệ.")
             return
         
-        user_state[chat_id] = {'step': 'choose_bit_length', 'number': num_str}
+        sessions.set(chat_id, {'step': 'choose_bit_length', 'number': num_str})
         markup = types.ReplyKeyboardMarkup(row_width=2)
         markup.add('8 bit', '16 bit', '32 bit', '64 bit')
-        bot.reply_to(message, 
+        sender.reply_to(message, 
                     f"Bạn muốn chuyển số {num_str} sang dạng nhị phân có dấu với bao nhiêu bit?",
                     reply_markup=markup)
         return
     
     # Xử lý số thông thường
-    user_state[chat_id] = {'step': 'choose_input_base', 'number': num_str}
+    sessions.set(chat_id, {'step': 'choose_input_base', 'number': num_str})
     markup = types.ReplyKeyboardMarkup(row_width=2)
     markup.add('Tự động nhận diện', '2', '8', '10', '16')
-    bot.reply_to(message, 
+    if len(num_str) == 16 and set(num_str) <= {'0', '1'}:
+        # Có thể là half precision: chỉ giải mã khi người dùng chọn
+        markup.add(IEEE_DECODE_16_CHOICE)
+    sender.reply_to(message, 
                 f"Số cần chuyển đổi là: {num_str}\n"
                 f"Hãy chọn hệ cơ số đầu vào hoặc để bot tự động nhận diện:", 
                 reply_markup=markup)
     
-    # Cập nhật thông tin người dùng
-    db.update_user_data(message.from_user)
-    
     
-def handle_bit_length_selection(message):
+@metrics.timed('handler')
+def handle_bit_length_selection(message, state: dict):
     chat_id = message.chat.id
-    num_str = user_state[chat_id]['number']
+    num_str = state['number']
     
     try:
         # Lấy số bit từ input (ví dụ: "8 bit" -> 8)
@@ -599,41 +404,36 @@ def handle_bit_length_selection(message):
         
         response = f"Chuyển đổi số âm {num_str} sang dạng nhị phân có dấu {bit_length} bit:\n\n{explanation}\n\nKết quả: {result}"
         
-        # Chia nhỏ tin nhắn dài nếu cần
-        if len(response) > 4096:
-            for x in range(0, len(response), 4096):
-                bot.send_message(chat_id, response[x:x+4096])
-        else:
-            bot.reply_to(message, response, reply_markup=types.ReplyKeyboardRemove())
-        
         # Cập nhật số lần chuyển đổi và lịch sử chuyển đổi
         conversion_history = f"{num_str} (base 10) -> {result} ({bit_length}-bit signed binary)"
-        db.update_convert_all(chat_id)
-        db.add_conversion_history(chat_id, conversion_history)
+        writer.record_conversion(chat_id, conversion_history)
         
-        # Đặt lại trạng thái và yêu cầu chuyển đổi tiếp theo
-        user_state[chat_id] = {'step': 'input_number'}
-        bot.send_message(chat_id, "Bạn có thể bắt đầu một phép chuyển đổi mới bằng cách nhập một số khác.")
+        # Đặt lại trạng thái, gửi kết quả kèm lời nhắc chuyển đổi tiếp theo
+        sessions.reset(chat_id)
+        deliver(message, response, reply_markup=types.ReplyKeyboardRemove(), prompt=NEW_CONVERSION_PROMPT)
         
     except ValueError as e:
-        bot.reply_to(message, f"Lỗi: {str(e)}. Vui lòng chọn một độ dài bit hợp lệ.")
+        sender.reply_to(message, f"Lỗi: {str(e)}. Vui lòng chọn một độ dài bit hợp lệ.")
     except Exception as e:
-        bot.reply_to(message, f"Có lỗi xảy ra: {str(e)}. Vui lòng thử lại.")
-        user_state[chat_id] = {'step': 'input_number'}
+        sender.reply_to(message, f"Có lỗi xảy ra: {str(e)}. Vui lòng thử lại.")
+        sessions.reset(chat_id)
 
 
-def handle_input_base_selection(message):
+@metrics.timed('handler')
+def handle_input_base_selection(message, state: dict):
     chat_id = message.chat.id
     choice = message.text
-    num_str = user_state[chat_id]['number'].upper()  # Chuyển về chữ hoa để xử lý hệ 16
+    num_str = state['number'].upper()  # Chuyển về chữ hoa để xử lý hệ 16
 
+    if choice == IEEE_DECODE_16_CHOICE and len(num_str) == 16:
+        _decode_ieee754(message, num_str, reply_markup=types.ReplyKeyboardRemove())
+        return
     if choice == 'Tự động nhận diện':
         try:
             from_base = detect_base(num_str)
-            user_state[chat_id]['from_base'] = from_base
-            bot.reply_to(message, f"Hệ cơ số đầu vào được xác định là: {from_base}")
+            sender.reply_to(message, f"Hệ cơ số đầu vào được xác định là: {from_base}")
         except ValueError as e:
-            bot.reply_to(message, str(e))
+            sender.reply_to(message, str(e))
             return
     else:
         try:
@@ -648,89 +448,127 @@ def handle_input_base_selection(message):
                     raise ValueError("Số không hợp lệ trong hệ cơ số 16")
             else:
                 # Kiểm tra cho các hệ cơ số khác
-                int(num_str, from_base)
-            
-            user_state[chat_id]['from_base'] = from_base
+                _parse_in_base(num_str, from_base)
         except ValueError:
-            bot.reply_to(message, "Hệ cơ số không hợp lệ hoặc số không phù hợp với hệ cơ số đã chọn. Vui lòng thử lại.")
+            sender.reply_to(message, "Hệ cơ số không hợp lệ hoặc số không phù hợp với hệ cơ số đã chọn. Vui lòng thử lại.")
             return
 
-    user_state[chat_id]['step'] = 'choose_conversion'
+    sessions.set(chat_id, dict(state, from_base=from_base, step='choose_conversion'))
     markup = types.ReplyKeyboardMarkup(row_width=2)
     markup.add('Chuyển đổi sang hệ khác', 'Chuyển đổi sang tất cả các hệ')
-    bot.reply_to(message, "Hãy chọn một lựa chọn:", reply_markup=markup)
+    sender.reply_to(message, "Hãy chọn một lựa chọn:", reply_markup=markup)
 
-def handle_conversion_choice(message):
+@metrics.timed('handler')
+def handle_conversion_choice(message, state: dict):
     chat_id = message.chat.id
     choice = message.text
     if choice == 'Chuyển đổi sang hệ khác':
         markup = types.ReplyKeyboardMarkup(row_width=2)
         markup.add('2', '8', '10', '16')
-        bot.reply_to(message, "Hãy chọn cơ số đích:", reply_markup=markup)
-        user_state[chat_id]['step'] = 'input_to_base'
+        sender.reply_to(message, "Hãy chọn cơ số đích:", reply_markup=markup)
+        sessions.set(chat_id, dict(state, step='input_to_base'))
     elif choice == 'Chuyển đổi sang tất cả các hệ':
-        num = user_state[chat_id]['number']
-        from_base = user_state[chat_id]['from_base']
+        num = state['number']
+        from_base = state['from_base']
         
         result_message = f"Kết quả chuyển đổi từ hệ {from_base}:\n"
         for to_base in [2, 8, 10, 16]:
             if to_base != from_base:
-                result, _ = convert_base(num, from_base, to_base)
+                result = run_conversion(convert_base_result, num, from_base, to_base)
                 result_message += f"- Hệ {to_base}: {result}\n"
         
-        bot.reply_to(message, result_message, reply_markup=types.ReplyKeyboardRemove())
-        
         conversion_history = f"{num} (base {from_base}) -> Tất cả các hệ"
         
         # Cập nhật thông tin chuyển đổi và lịch sử
-        db.update_convert_all(chat_id)
-        db.add_conversion_history(chat_id, conversion_history)
+        writer.record_conversion(chat_id, conversion_history)
 
-        user_state[chat_id] = {'step': 'input_number'}
-        bot.send_message(chat_id, "Bạn có thể bắt đầu một phép chuyển đổi mới bằng cách nhập một số khác.")
+        sessions.reset(chat_id)
+        deliver(message, result_message, reply_markup=types.ReplyKeyboardRemove(), prompt=NEW_CONVERSION_PROMPT)
     else:
-        bot.reply_to(message, "Lựa chọn không hợp lệ. Vui lòng chọn lại.")
+        sender.reply_to(message, "Lựa chọn không hợp lệ. Vui lòng chọn lại.")
 
 
-def handle_base_selection(message):
+@metrics.timed('handler')
+def handle_base_selection(message, state: dict):
     chat_id = message.chat.id
     try:
         to_base = int(message.text)
         if to_base not in [2, 8, 10, 16]:
             raise ValueError("Hệ cơ số đích không hợp lệ. Vui lòng chọn 2, 8, 10 hoặc 16.")
         
-        num = user_state[chat_id]['number']
-        from_base = user_state[chat_id]['from_base']
+        num = state['number']
+        from_base = state['from_base']
         
-        result, explanation = convert_base(num, from_base, to_base)
+        result, explanation = run_conversion(convert_base, num, from_base, to_base)
         
         response = f"Kết quả: {result}\n\nGiải thích:\n{explanation}"
         
-        # Chia nhỏ tin nhắn dài nếu cần
-        if len(response) > 4096:
-            for x in range(0, len(response), 4096):
-                bot.send_message(chat_id, response[x:x+4096])
-        else:
-            bot.reply_to(message, response, reply_markup=types.ReplyKeyboardRemove())
-        
         conversion_history = f"{num} (base {from_base}) -> {result} (base {to_base})"
         
         # Cập nhật số lần chuyển đổi và lịch sử chuyển đổi
-        db.update_convert_all(chat_id)
-        db.add_conversion_history(chat_id, conversion_history)
+        writer.record_conversion(chat_id, conversion_history)
         
-        # Đặt lại trạng thái và yêu cầu chuyển đổi tiếp theo
-        user_state[chat_id] = {'step': 'input_number'}
-        bot.send_message(chat_id, "Bạn có thể bắt đầu một phép chuyển đổi mới bằng cách nhập một số khác.")
+        # Đặt lại trạng thái, gửi kết quả kèm lời nhắc chuyển đổi tiếp theo
+        sessions.reset(chat_id)
+        deliver(message, response, reply_markup=types.ReplyKeyboardRemove(), prompt=NEW_CONVERSION_PROMPT)
     except ValueError as e:
-        bot.reply_to(message, f"Lỗi: {str(e)}. Vui lòng thử lại.")
+        sender.reply_to(message, f"Lỗi: {str(e)}. Vui lòng thử lại.")
     except Exception as e:
-        bot.reply_to(message, f"Có lỗi xảy ra: {str(e)}. Vui lòng thử lại.")
-        user_state[chat_id] = {'step': 'input_number'}
+        sender.reply_to(message, f"Có lỗi xảy ra: {str(e)}. Vui lòng thử lại.")
+        sessions.reset(chat_id)
 
-@bot.message_handler(commands=['start', 'help'])
+@metrics.timed('handler')
+def handle_batch(message):
+    chat_id = message.chat.id
+    lines = [line.strip() for line in message.text.splitlines() if line.strip()]
+    
+    if len(lines) > MAX_BATCH_LINES:
+        sender.reply_to(message, f"Tối đa {MAX_BATCH_LINES} số mỗi lần. Vui lòng chia nhỏ danh sách.")
+        return
+    
+    entries, values, errors = [], [], []
+    for line_no, line in enumerate(lines, 1):
+        try:
+            num_str, from_base = parse_batch_line(line)
+        except ValueError as e:
+            errors.append(f"Dòng {line_no} ({line[:30]}): {e}")
+            continue
+        entries.append((num_str, from_base))
+        values.append(_parse_in_base(num_str, from_base))
+    
+    columns = convert_batch(values)
+    header = ("Số", "Hệ 2", "Hệ 8", "Hệ 10", "Hệ 16")
+    rows = [(f"{num_str} ({from_base})", columns[2][i], columns[8][i], columns[10][i], columns[16][i])
+            for i, (num_str, from_base) in enumerate(entries)]
+    
+    table = "\n".join(" | ".join(row) for row in [header, *rows])
+    summary = f"Đã chuyển đổi {len(rows)} số"
+    if errors:
+        summary += f", bỏ qua {len(errors)} dòng lỗi:\n" + "\n".join(errors[:20])
+    
+    response = f"{summary}\n\n<pre>{html.escape(table)}</pre>"
+    if rows and len(response) > MAX_MESSAGE_LENGTH:
+        # Bảng quá dài: gửi một file CSV thay vì nhiều tin nhắn
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows([header, *rows])
+        document = io.BytesIO(buffer.getvalue().encode('utf-8'))
+        document.name = 'chuyen_doi.csv'
+        send_document(chat_id, document, caption=summary[:1024],
+                      reply_to_message_id=message.message_id,
+                      reply_markup=types.ReplyKeyboardRemove())
+    elif rows:
+        sender.reply_to(message, response, parse_mode='HTML', reply_markup=types.ReplyKeyboardRemove())
+    else:
+        sender.reply_to(message, summary)
+    
+    writer.record_conversions(chat_id, [f"{num_str} (base {from_base}) -> Tất cả các hệ"
+                                        for num_str, from_base in entries])
+    sessions.reset(chat_id)
+
+
+@metrics.timed('handler')
 def send_welcome(message):
-    bot.reply_to(message, 
+    sender.reply_to(message, 
         "Chào mừng! Bot có thể:\n"
         "1. Chuyển đổi giữa các hệ cơ số 2, 8, 10, 16\n"
         "2. Chuyển đổi số âm sang nhị phân có dấu\n"
@@ -738,252 +576,354 @@ def send_welcome(message):
         "4. Chuyển đổi từ IEEE 754 sang số thực\n\n"
         "Các lệnh có sẵn:\n"
         "/history - Xem lịch sử chuyển đổi\n"
-        "/clear_history - Xóa lịch sử chuyển đổi\n\n"
+        "/clear_history - Xóa lịch sử chuyển đổi\n"
+        "/export - Tải toàn bộ lịch sử (thêm csv hoặc json)\n"
+        "/batch - Chuyển đổi nhiều số cùng lúc (mỗi dòng một số)\n\n"
+        "Trong chat bất kỳ, gõ @tên_bot rồi một số (ví dụ 0xFF) để xem nhanh kết quả.\n\n"
         "Hãy nhập số cần chuyển đổi để bắt đầu!")
-    user_state[message.chat.id] = {'step': 'input_number'}
+    sessions.reset(message.chat.id)
     db.update_user_data(message.from_user)
 
-@bot.message_handler(commands=['history'])
+def _history_page(chat_id: int, before_id: Optional[int] = None, after_id: Optional[int] = None):
+    """
+    Nội dung và bàn phím inline của một trang lịch sử; (None, None) nếu trống.
+    
+    Nút bấm mang id đầu/cuối của trang (keyset) nên trang nào cũng chỉ tốn
+    một lần dò index, kể cả khi người dùng lật rất sâu.
+    """
+    total_conversions, rows, has_newer, has_older = db.get_history_page(
+        chat_id, before_id=before_id, after_id=after_id, limit=HISTORY_PAGE_SIZE)
+    if not rows:
+        return None, None
+    
+    response = f"Tổng số lần chuyển đổi: {total_conversions}\n\n"
+    response += "Lịch sử chuyển đổi (mới nhất trước):\n\n"
+    response += "\n".join(
+        f"[{datetime.fromtimestamp(conversion_time).strftime('%d/%m/%Y %H:%M')}] "
+        f"{compact_history_text(text, HISTORY_LINE_LENGTH)}"
+        for _, text, conversion_time in rows
+    )
+    buttons = []
+    if has_newer:
+        buttons.append(types.InlineKeyboardButton("« Mới hơn", callback_data=f"history:newer:{rows[0][0]}"))
+    if has_older:
+        buttons.append(types.InlineKeyboardButton("Cũ hơn »", callback_data=f"history:older:{rows[-1][0]}"))
+    markup = None
+    if buttons:
+        markup = types.InlineKeyboardMarkup()
+        markup.row(*buttons)
+    return response, markup
+
+@metrics.timed('handler')
 def show_history(message):
     chat_id = message.chat.id
     try:
-        total_conversions, history_list = db.get_user_history(chat_id)
+        response, markup = _history_page(chat_id)
         
-        if history_list:
-            response = f"Tổng số lần chuyển đổi: {total_conversions}\n\n"
-            response += "10 lần chuyển đổi gần nhất:\n\n"
-            response += "\n".join(history_list)
-            
-            if len(response) > 4096:
-                for x in range(0, len(response), 4096):
-                    bot.send_message(chat_id, response[x:x+4096])
-            else:
-                bot.reply_to(message, response)
+        if response:
+            sender.reply_to(message, response, reply_markup=markup)
+        else:
+            sender.reply_to(message, "Bạn chưa có lịch sử chuyển đổi nào.")
+    except Exception as e:
+        sender.reply_to(message, f"Có lỗi xảy ra khi đọc lịch sử: {str(e)}")
+
+@metrics.timed('handler')
+def handle_history_page(call):
+    """Nút lật trang của /history: sửa chính tin nhắn lịch sử thay vì gửi tin mới."""
+    chat_id = call.message.chat.id
+    try:
+        _, direction, cursor = call.data.split(':')
+        cursor = int(cursor)
+        if direction == 'older':
+            response, markup = _history_page(chat_id, before_id=cursor)
         else:
-            bot.reply_to(message, "Bạn chưa có lịch sử chuyển đổi nào.")
+            response, markup = _history_page(chat_id, after_id=cursor)
+        sender.answer_callback_query(call.id)
+        sender.edit_message_text(response or "Bạn chưa có lịch sử chuyển đổi nào.",
+                                 chat_id, call.message.message_id, reply_markup=markup)
     except Exception as e:
-        bot.reply_to(message, f"Có lỗi xảy ra khi đọc lịch sử: {str(e)}")
+        sender.answer_callback_query(call.id, text=f"Có lỗi xảy ra khi đọc lịch sử: {str(e)}")
 
 
-@bot.message_handler(commands=['clear_history'])
+def _answer_inline_query(query, results=None) -> None:
+    """Gửi các thẻ kết quả của một inline query (tính nếu chưa có)."""
+    if results is None:
+        results = inline_results(query.query)
+    articles = [types.InlineQueryResultArticle(result_id, title, types.InputTextMessageContent(text),
+                                               description=description)
+                for result_id, title, description, text in results]
+    sender.answer_inline_query(query.id, articles, cache_time=INLINE_CACHE_TIME, is_personal=False)
+
+
+@metrics.timed('handler')
+def handle_inline_query(query):
+    """
+    Chế độ inline (@bot 0xFF): query đã có trong cache được trả lời ngay, còn
+    lại chờ người dùng ngừng gõ để không chuyển đổi mỗi lần nhấn phím.
+    """
+    results = cached_inline_results(query.query)
+    if results is not None:
+        _answer_inline_query(query, results)
+    else:
+        inline_debouncer.submit(query.from_user.id, query)
+
+
+@metrics.timed('handler')
 def clear_history(message):
     chat_id = message.chat.id
     try:
+        # Mốc ẩn lịch sử là id lớn nhất đã commit: các lần chuyển đổi còn trong
+        # hàng đợi ghi phải được commit trước, nếu không sẽ hiện lại sau khi xóa
+        writer.flush(timeout=10)
         db.clear_user_history(chat_id)
-        bot.reply_to(message, "Lịch sử chuyển đổi đã được xóa.")
+        sender.reply_to(message, "Lịch sử chuyển đổi đã được xóa.")
+    except Exception as e:
+        sender.reply_to(message, f"Có lỗi xảy ra khi xóa lịch sử: {str(e)}")
+
+@metrics.timed('handler')
+def export_history(message):
+    """
+    /export [csv|json]: toàn bộ lịch sử của người dùng thành tệp nén gzip.
+    /export_all [csv|json]: lịch sử của mọi người dùng (chỉ admin).
+    
+    Lịch sử được đọc và nén theo luồng (export.write_export) nên bộ nhớ không
+    tăng theo số dòng.
+    """
+    chat_id = message.chat.id
+    parts = message.text.split()
+    all_users = parts[0].split('@')[0] == '/export_all'
+    fmt = parts[1].lower() if len(parts) > 1 else 'csv'
+    if all_users and message.from_user.id not in ADMIN_IDS:
+        sender.reply_to(message, "Lệnh này chỉ dành cho quản trị viên.")
+        return
+    if fmt not in EXPORT_FORMATS:
+        sender.reply_to(message, f"Định dạng không hợp lệ. Dùng: {parts[0]} csv hoặc {parts[0]} json")
+        return
+    try:
+        rows = db.iter_history(None if all_users else chat_id)
+        document, count = write_export(rows, fmt, include_user=all_users)
     except Exception as e:
-        bot.reply_to(message, f"Có lỗi xảy ra khi xóa lịch sử: {str(e)}")
+        sender.reply_to(message, f"Có lỗi xảy ra khi xuất lịch sử: {str(e)}")
+        return
+    
+    size = document.seek(0, io.SEEK_END)
+    document.seek(0)
+    if not count:
+        document.close()
+        sender.reply_to(message, "Bạn chưa có lịch sử chuyển đổi nào.")
+    elif size > MAX_DOCUMENT_BYTES:
+        document.close()
+        sender.reply_to(message, f"Tệp xuất ({size / 1e6:.0f} MB) vượt giới hạn gửi tệp của Telegram.")
+    else:
+        name = 'lich_su_tat_ca' if all_users else 'lich_su_chuyen_doi'
+        send_document(chat_id, document, visible_file_name=f'{name}.{fmt}.gz',
+                      caption=f"Lịch sử chuyển đổi: {count} dòng",
+                      reply_to_message_id=message.message_id)
+
+@metrics.timed('handler')
+def start_batch(message):
+    sessions.set(message.chat.id, {'step': 'batch_input'})
+    sender.reply_to(message,
+        "Gửi danh sách số, mỗi dòng một số (tối đa "
+        f"{MAX_BATCH_LINES} dòng).\n"
+        "Có thể ghi hệ cơ số sau số (ví dụ: FF 16) hoặc dùng tiền tố 0b, 0o, 0x.")
+
+def show_stats(message):
+    if message.from_user.id not in ADMIN_IDS:
+        sender.reply_to(message, "Lệnh này chỉ dành cho quản trị viên.")
+        return
+    deliver(message, metrics.summary(), filename='stats.txt')
+
+# Tên hiển thị các loại chuyển đổi của bảng usage_*
+USAGE_KIND_LABELS = {'base': 'Hệ cơ số', 'signed': 'Số âm có dấu', 'float': 'Số thực',
+                     'ieee': 'IEEE 754', 'other': 'Khác'}
+
 
-@bot.message_handler(func=lambda message: True)
+def _format_usage_kinds(kinds) -> str:
+    return ', '.join(f"{USAGE_KIND_LABELS.get(kind, kind)} {count}"
+                     for kind, count in sorted(kinds.items(), key=lambda item: -item[1])) or 'chưa có'
+
+@metrics.timed('handler')
+def show_usage(message):
+    """Thống kê sử dụng (chỉ admin), đọc từ các bảng usage_* cộng dồn sẵn."""
+    if message.from_user.id not in ADMIN_IDS:
+        sender.reply_to(message, "Lệnh này chỉ dành cho quản trị viên.")
+        return
+    try:
+        summary = db.usage_summary()
+    except Exception as e:
+        sender.reply_to(message, f"Có lỗi xảy ra khi đọc thống kê: {str(e)}")
+        return
+    today = summary['today']
+    lines = [f"Hôm nay: {today['conversions']} lần chuyển đổi, {today['active_users']} người dùng",
+             f"  {_format_usage_kinds(today['kinds'])}"]
+    for days, window in summary['windows'].items():
+        average = window['active_users'] / days
+        lines.append(f"\n{days} ngày qua: {window['conversions']} lần chuyển đổi, "
+                     f"trung bình {average:.1f} người dùng/ngày")
+        lines.append(f"  {_format_usage_kinds(window['kinds'])}")
+    lines.append(f"\nTừ trước đến nay: {sum(summary['totals'].values())} lần chuyển đổi")
+    lines.append(f"  {_format_usage_kinds(summary['totals'])}")
+    sender.reply_to(message, "\n".join(lines))
+
+# Các trường trạng thái mà mỗi bước cần
+_STEP_FIELDS = {
+    'choose_input_base': ('number',),
+    'choose_conversion': ('number', 'from_base'),
+    'input_to_base': ('number', 'from_base'),
+    'choose_bit_length': ('number',),
+    'choose_float_conversion': ('number',),
+}
+
+
+@metrics.timed('handler')
 def handle_conversion(message):
     chat_id = message.chat.id
-    current_step = user_state.get(chat_id, {}).get('step', 'input_number')
+    # Đọc trạng thái một lần rồi truyền cho bước xử lý: phiên có thể hết hạn
+    # hoặc bị loại (TTL/LRU) giữa hai lần đọc
+    state = sessions.get(chat_id)
+    current_step = state.get('step', 'input_number')
+
+    # Cập nhật thông tin người dùng trước khi ghi lịch sử (foreign key).
+    # Hồ sơ không đổi chỉ được gom last_time_using, không tốn một lần commit.
+    db.update_user_data(message.from_user)
 
-    if current_step == 'input_number':
+    if current_step == 'batch_input' or (current_step == 'input_number' and '\n' in message.text.strip()):
+        handle_batch(message)
+    elif current_step == 'input_number':
         handle_user_input(message)
+    elif any(field not in state for field in _STEP_FIELDS.get(current_step, ())):
+        # Phiên cũ hoặc không đầy đủ: yêu cầu nhập lại thay vì báo lỗi
+        sessions.reset(chat_id)
+        sender.reply_to(message, SESSION_LOST_MESSAGE, reply_markup=types.ReplyKeyboardRemove())
     elif current_step == 'choose_input_base':
-        handle_input_base_selection(message)
+        handle_input_base_selection(message, state)
     elif current_step == 'choose_conversion':
-        handle_conversion_choice(message)
+        handle_conversion_choice(message, state)
     elif current_step == 'input_to_base':
-        handle_base_selection(message)
+        handle_base_selection(message, state)
     elif current_step == 'choose_bit_length':
-        handle_bit_length_selection(message)
+        handle_bit_length_selection(message, state)
     elif current_step == 'choose_float_conversion':  # Thêm case mới
-        handle_float_conversion_choice(message)
+        handle_float_conversion_choice(message, state)
 
-    # Cập nhật thời gian sử dụng cuối cùng
-    db.update_user_data(message.from_user)
-  
-def is_ieee754_binary(binary_str: str) -> tuple[bool, int]:
-    """
-    Kiểm tra xem một chuỗi nhị phân có phải là số IEEE 754 hay không.
-    Trả về (True, bits) nếu là IEEE 754, với bits là 32 hoặc 64.
-    """
-    if not all(bit in '01' for bit in binary_str):
-        return False, 0
-        
-    if len(binary_str) == 32:
-        return True, 32
-    elif len(binary_str) == 64:
-        return True, 64
-    return False, 0
-    
-@lru_cache(maxsize=1024)
-def _get_ieee_params(bits: int) -> Tuple[int, int, int]:
-    """Cache các thông số IEEE 754 để tránh tính toán lặp lại."""
-    if bits == 32:
-        return 8, 23, 127
-    elif bits == 64:
-        return 11, 52, 1023
-    raise ValueError("Số bit phải là 32 hoặc 64")
-
-def _fast_binary_conversion(fraction: float, max_bits: int) -> str:
-    """Chuyển đổi phần thập phân sang nhị phân nhanh hơn sử dụng phép nhân 2."""
-    result = []
-    while fraction > 0 and len(result) < max_bits:
-        fraction *= 2
-        if fraction >= 1:
-            result.append('1')
-            fraction -= 1
-        else:
-            result.append('0')
-    return ''.join(result)
 
-@lru_cache(maxsize=1024)
-def decimal_to_ieee754(num: float, bits: int = 32) -> Tuple[str, str]:
-    """
-    Chuyển đổi số thực sang dạng IEEE 754 (phiên bản tối ưu).
-    """
-    exp_bits, mantissa_bits, bias = _get_ieee_params(bits)
-    explanation = [f"Chuyển đổi {num} sang IEEE 754 {bits}-bit:"]
-    
-    # Xử lý các trường hợp đặc biệt với lookup dictionary
-    special_cases = {
-        0: ('0' * bits, "Số 0 được biểu diễn bằng tất cả các bit 0"),
-        float('inf'): ('0' + '1' * exp_bits + '0' * mantissa_bits, "Số dương vô cùng"),
-        float('-inf'): ('1' + '1' * exp_bits + '0' * mantissa_bits, "Số âm vô cùng")
-    }
-    
-    if num != num:  # NaN
-        return ('0' + '1' * exp_bits + '1' + '0' * (mantissa_bits - 1),
-                '\n'.join(explanation + ["Không phải là số (NaN)"]))
-                
-    if num in special_cases:
-        return special_cases[num]
-
-    # Xác định bit dấu và chuyển về số dương
-    sign = '1' if num < 0 else '0'
-    num = abs(num)
-    explanation.append(f"1. Bit dấu: {sign} ({'âm' if num < 0 else 'dương'})")
-
-    # Tối ưu việc tìm số mũ cho số >= 1
-    if num >= 1:
-        exp = floor(log2(num))
-        mantissa_val = num / (2 ** exp) - 1
-    else:
-        exp = floor(log2(num))
-        mantissa_val = (num / (2 ** exp)) - 1
-
-    # Kiểm tra giới hạn số mũ
-    biased_exp = exp + bias
-    if biased_exp <= 0:
-        return '0' * bits, '\n'.join(explanation + ["Số quá nhỏ, được biểu diễn là 0"])
-    if biased_exp >= (1 << exp_bits) - 1:
-        return (sign + '1' * exp_bits + '0' * mantissa_bits,
-                '\n'.join(explanation + ["Số quá lớn, được biểu diễn là vô cùng"]))
-
-    # Tính mantissa
-    mantissa = _fast_binary_conversion(mantissa_val, mantissa_bits)
-    mantissa = (mantissa + '0' * mantissa_bits)[:mantissa_bits]
-    
-    # Tạo kết quả
-    biased_exp_binary = format(biased_exp, f'0{exp_bits}b')
-    result = sign + biased_exp_binary + mantissa
-    
-    # Tạo giải thích
-    explanation.extend([
-        f"2. Số mũ thực: {exp}",
-        f"3. Số mũ bias (E = e + {bias}): {biased_exp}",
-        f"4. Số mũ nhị phân: {biased_exp_binary}",
-        f"5. Mantissa: {mantissa}",
-        f"\nKết quả: {result}",
-        f"- Bit dấu (1 bit): {sign}",
-        f"- Số mũ ({exp_bits} bits): {biased_exp_binary}",
-        f"- Mantissa ({mantissa_bits} bits): {mantissa}"
-    ])
-    
-    return result, '\n'.join(explanation)
-
-@lru_cache(maxsize=1024)
-def ieee754_to_decimal(binary: str) -> Tuple[float, str]:
-    """
-    Chuyển đổi số IEEE 754 sang số thực (phiên bản tối ưu).
-    """
-    bits = len(binary.strip())
-    exp_bits, mantissa_bits, bias = _get_ieee_params(bits)
-    
-    # Validation nhanh với set
-    if not set(binary).issubset({'0', '1'}):
-        raise ValueError("Chuỗi nhị phân chỉ được chứa ký tự 0 và 1")
-
-    explanation = [f"Chuyển đổi IEEE 754 {bits}-bit sang số thực:"]
-    
-    # Tách các phần
-    sign_bit = binary[0]
-    exp_bits_str = binary[1:exp_bits + 1]
-    mantissa_bits_str = binary[exp_bits + 1:]
-    
-    explanation.extend([
-        "1. Tách các thành phần:",
-        f"   - Bit dấu: {sign_bit} ({'âm' if sign_bit == '1' else 'dương'})",
-        f"   - Số mũ (biased): {exp_bits_str}",
-        f"   - Mantissa: {mantissa_bits_str}"
-    ])
-
-    # Chuyển đổi số mũ nhanh hơn với int
-    exp_val = int(exp_bits_str, 2)
-    
-    # Xử lý các trường hợp đặc biệt
-    if exp_val == 0:
-        if int(mantissa_bits_str, 2) == 0:
-            return 0.0 if sign_bit == '0' else -0.0, '\n'.join(explanation + ["Số zero (±0)"])
-    elif exp_val == (1 << exp_bits) - 1:
-        if int(mantissa_bits_str, 2) == 0:
-            return float('inf') if sign_bit == '0' else float('-inf'), '\n'.join(explanation + ["Số vô cùng (±∞)"])
-        return float('nan'), '\n'.join(explanation + ["Không phải là số (NaN)"])
-
-    # Tính toán mantissa hiệu quả hơn
-    mantissa = 1.0 if exp_val != 0 else 0.0
-    for i, bit in enumerate(mantissa_bits_str, 1):
-        if bit == '1':
-            mantissa += 2.0 ** -i
-
-    # Tính kết quả cuối cùng
-    exp = exp_val - bias if exp_val != 0 else 1 - bias
-    result = (-1.0 if sign_bit == '1' else 1.0) * mantissa * (2.0 ** exp)
-    
-    explanation.extend([
-        f"2. Số mũ thực = {exp_val} - {bias} = {exp}",
-        f"3. Giá trị mantissa = {mantissa:.10f}",
-        f"\nKết quả = {'-1' if sign_bit == '1' else '1'} × {mantissa:.10f} × 2^{exp} = {result}"
-    ])
-    
-    return result, '\n'.join(explanation)
-
-def handle_float_conversion_choice(message):
+@metrics.timed('handler')
+def handle_float_conversion_choice(message, state: dict):
     chat_id = message.chat.id
     choice = message.text
-    num_str = user_state[chat_id]['number']
-    num = float(num_str)
+    num_str = state['number']
     
     try:
-        if choice == 'Chuyển sang nhị phân đơn giản':
-            result, explanation = convert_float_to_binary(num_str)
-        elif choice == 'Chuyển sang IEEE 754 (32-bit)':
-            result, explanation = decimal_to_ieee754(num, 32)
-        elif choice == 'Chuyển sang IEEE 754 (64-bit)':
-            result, explanation = decimal_to_ieee754(num, 64)
+        if choice in FLOAT_BASE_CHOICES:
+            result, explanation = run_conversion(convert_float_to_binary, num_str,
+                                                 FLOAT_PRECISION, FLOAT_BASE_CHOICES[choice])
+        elif choice in IEEE_CHOICES:
+            result, explanation = decimal_to_ieee754(num_str, IEEE_CHOICES[choice])
         else:
-            bot.reply_to(message, "Lựa chọn không hợp lệ")
+            sender.reply_to(message, "Lựa chọn không hợp lệ")
             return
             
-        response = explanation
-        
-        if len(response) > 4096:
-            for x in range(0, len(response), 4096):
-                bot.send_message(chat_id, response[x:x+4096])
-        else:
-            bot.reply_to(message, response, reply_markup=types.ReplyKeyboardRemove())
-        
         conversion_history = f"{num_str} -> {result} ({choice})"
-        db.update_convert_all(chat_id)
-        db.add_conversion_history(chat_id, conversion_history)
+        writer.record_conversion(chat_id, conversion_history)
         
-        user_state[chat_id] = {'step': 'input_number'}
-        bot.send_message(chat_id, "Bạn có thể bắt đầu một phép chuyển đổi mới bằng cách nhập một số khác.")
+        sessions.reset(chat_id)
+        deliver(message, explanation, reply_markup=types.ReplyKeyboardRemove(), prompt=NEW_CONVERSION_PROMPT)
     except Exception as e:
-        bot.reply_to(message, f"Có lỗi xảy ra: {str(e)}")
-        user_state[chat_id] = {'step': 'input_number'}
+        sender.reply_to(message, f"Có lỗi xảy ra: {str(e)}")
+        sessions.reset(chat_id)
+
+
+def _register_handlers(bot: telebot.TeleBot) -> None:
+    """Đăng ký handler cho bot; handler hội thoại chung phải đứng cuối."""
+    bot.register_message_handler(send_welcome, commands=['start', 'help'])
+    bot.register_message_handler(show_history, commands=['history'])
+    bot.register_message_handler(clear_history, commands=['clear_history'])
+    bot.register_message_handler(export_history, commands=['export', 'export_all'])
+    bot.register_message_handler(start_batch, commands=['batch'])
+    bot.register_message_handler(show_stats, commands=['stats'])
+    bot.register_message_handler(show_usage, commands=['usage'])
+    bot.register_callback_query_handler(handle_history_page,
+                                        func=lambda call: (call.data or '').startswith('history:'))
+    bot.register_inline_handler(handle_inline_query, func=lambda query: True)
+    bot.register_message_handler(handle_conversion, func=lambda message: True)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Điểm vào dòng lệnh: chạy bot bằng polling, webhook hoặc engine asyncio."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Bot Telegram chuyển đổi hệ số")
+    parser.add_argument('--webhook', action='store_true', help="Chạy ở chế độ webhook thay cho polling")
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help="Chạy bằng engine asyncio (AsyncTeleBot); bị bỏ qua khi có --webhook")
+    parser.add_argument('--workers', type=int, default=8,
+                        help="Số worker xử lý update (mỗi chat luôn do cùng một worker xử lý)")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8443)
+    parser.add_argument('--path', default='/webhook')
+    parser.add_argument('--secret', default=os.environ.get('WEBHOOK_SECRET'),
+                        help="Secret token bắt buộc của webhook (mặc định lấy từ biến môi trường "
+                             "WEBHOOK_SECRET; tự sinh nếu có --public-url)")
+    parser.add_argument('--public-url', help="URL công khai để đăng ký setWebhook")
+    parser.add_argument('--metrics-port', type=int, default=int(os.environ.get('METRICS_PORT', 0)),
+                        help="Cổng endpoint Prometheus trên 127.0.0.1 (0 để tắt); bật luôn đo độ trễ")
+    parser.add_argument('--backfill-usage', action='store_true',
+                        help="Dựng lại bảng thống kê sử dụng (/usage) từ lịch sử hiện có rồi thoát")
+    parser.add_argument('--vacuum', action='store_true',
+                        help="VACUUM database (bật auto_vacuum cho database cũ) rồi thoát")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers phải lớn hơn 0")
+    configure_workers(args.workers)
+    if args.webhook and not args.secret and not args.public_url:
+        parser.error("--webhook cần --secret (hoặc WEBHOOK_SECRET); với --public-url "
+                     "secret được tự sinh nếu bỏ trống")
+    
+    if args.vacuum:
+        start = time.perf_counter()
+        db.vacuum()
+        print(f"Đã VACUUM database trong {time.perf_counter() - start:.1f}s, "
+              f"auto_vacuum = {db.page_stats()['auto_vacuum']}")
+        return
+    
+    if args.backfill_usage:
+        start = time.perf_counter()
+        rows = db.rebuild_usage_rollups()
+        print(f"Đã dựng thống kê sử dụng từ {rows} dòng lịch sử trong {time.perf_counter() - start:.1f}s")
+        return
+    
+    bot = get_bot()
+    warm_store.start_refresh(float(os.environ.get('WARM_CACHE_REFRESH', 3600)))
+    retention.start(float(os.environ.get('HISTORY_PRUNE_INTERVAL', 600)))
+
+    if args.metrics_port:
+        metrics.enabled = True
+        metrics.serve(port=args.metrics_port)
+
+    # Engine asyncio chỉ chạy polling; webhook luôn đi qua ChatDispatcher để giữ
+    # thứ tự update theo chat (server webhook chỉ có một thread chuyển update)
+    if args.webhook or not args.use_async:
+        from dispatcher import ChatDispatcher
+        from outbox import Outbox
+        dispatcher = ChatDispatcher(bot, workers=args.workers).start()
+        outbox = Outbox(bot).start()
+        set_default_sender(outbox)
+        atexit.register(outbox.close)
+        metrics.add_collector('dispatcher', dispatcher.stats)
+        metrics.add_collector('outbox', outbox.stats)
+
+    if args.webhook:
+        from webhook import run_webhook
+        run_webhook(bot, args.host, args.port, args.path, args.secret, args.public_url)
+    elif args.use_async:
+        from async_engine import run_async
+        # Câu trả lời inline sau debounce được gửi từ thread riêng, không qua handler
+        run_async(bot, use_sender, bot.token, workers=args.workers,
+                  set_default_sender=set_default_sender)
+    else:
+        bot.polling(none_stop=True)
+
 
-bot.polling(none_stop=True)
+if __name__ == '__main__':
+    main()
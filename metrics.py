@@ -0,0 +1,267 @@
+"""
+Số liệu vận hành của bot: histogram độ trễ theo bước, số lần gọi, số lỗi và
+các chỉ số lấy từ những thành phần sẵn có (cache, hàng đợi ghi, outbox...).
+
+Histogram chỉ được ghi khi bật (Metrics.enabled); khi tắt, hàm được bọc bởi
+timed() chỉ tốn thêm một phép kiểm tra cờ. Các collector luôn đọc được vì
+chúng dùng thống kê mà từng thành phần tự giữ.
+
+Số liệu được xem qua lệnh /stats (chỉ admin) hoặc endpoint HTTP dạng text
+của Prometheus (serve()).
+"""
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Cận trên (giây) của các bucket độ trễ
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIX = 'bot'
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'total', 'count', 'errors')
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # phần tử cuối: lớn hơn bucket cuối
+        self.total = 0.0
+        self.count = 0
+        self.errors = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Ước lượng phân vị bằng nội suy tuyến tính trong bucket chứa nó."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class Metrics:
+    def __init__(self, enabled: bool = False, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        """
+        Args:
+            enabled: Có ghi histogram hay không (có thể đổi khi đang chạy)
+            buckets: Cận trên (giây) của các bucket độ trễ
+        """
+        self.enabled = enabled
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # (nhóm, bước) -> histogram, ví dụ ('handler', 'handle_base_selection')
+        self._histograms: Dict[Tuple[str, str], Histogram] = {}
+        self._collectors: List[Tuple[str, Callable[[], dict]]] = []
+
+    def _histogram(self, group: str, step: str) -> Histogram:
+        histogram = self._histograms.get((group, step))
+        if histogram is None:
+            histogram = self._histograms[(group, step)] = Histogram(self.buckets)
+        return histogram
+
+    def observe(self, group: str, step: str, seconds: float, error: bool = False) -> None:
+        with self._lock:
+            histogram = self._histogram(group, step)
+            histogram.observe(seconds)
+            if error:
+                histogram.errors += 1
+
+    def timed(self, group: str, step: Optional[str] = None):
+        """Decorator đo thời gian mỗi lần gọi hàm (bước mặc định là tên hàm)."""
+        def decorator(func):
+            name = step or func.__name__
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                error = False
+                try:
+                    return func(*args, **kwargs)
+                except BaseException:
+                    error = True
+                    raise
+                finally:
+                    self.observe(group, name, time.perf_counter() - start, error)
+            return wrapper
+        return decorator
+
+    def add_collector(self, name: str, collect: Callable[[], dict]) -> None:
+        """
+        Đăng ký nguồn số liệu có sẵn, đọc mỗi khi xuất số liệu.
+
+        Args:
+            name: Tên nhóm (tiền tố của metric)
+            collect: Hàm trả dict số liệu; giá trị có thể là số, list số hoặc
+                     dict con (tên nhãn -> dict số liệu), ví dụ cache.stats()
+        """
+        self._collectors.append((name, collect))
+
+    def histograms(self) -> Dict[Tuple[str, str], Histogram]:
+        """Bản sao các histogram hiện có."""
+        with self._lock:
+            copies = {}
+            for key, histogram in self._histograms.items():
+                copy = Histogram(histogram.buckets)
+                copy.counts = list(histogram.counts)
+                copy.total, copy.count, copy.errors = histogram.total, histogram.count, histogram.errors
+                copies[key] = copy
+            return copies
+
+    def collect(self) -> Dict[str, dict]:
+        result = {}
+        for name, collect in self._collectors:
+            try:
+                result[name] = collect()
+            except Exception:
+                logger.exception("Không đọc được số liệu của %s", name)
+        return result
+
+    def render_prometheus(self) -> str:
+        """Toàn bộ số liệu ở định dạng text của Prometheus."""
+        lines = []
+        groups: Dict[str, List[Tuple[str, Histogram]]] = {}
+        for (group, step), histogram in sorted(self.histograms().items()):
+            groups.setdefault(group, []).append((step, histogram))
+        for group, items in groups.items():
+            metric = f'{PREFIX}_{group}_seconds'
+            lines.append(f'# TYPE {metric} histogram')
+            for step, histogram in items:
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{step="{step}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{step="{step}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{metric}_sum{{step="{step}"}} {histogram.total:.6f}')
+                lines.append(f'{metric}_count{{step="{step}"}} {histogram.count}')
+            lines.append(f'# TYPE {PREFIX}_{group}_errors_total counter')
+            for step, histogram in items:
+                lines.append(f'{PREFIX}_{group}_errors_total{{step="{step}"}} {histogram.errors}')
+
+        for name, values in self.collect().items():
+            for key, value in sorted(values.items(), key=lambda item: str(item[0])):
+                if isinstance(value, dict):
+                    label = str(key).strip('_')
+                    for field, number in value.items():
+                        if isinstance(number, (int, float)):
+                            lines.append(f'{PREFIX}_{name}_{field}{{name="{label}"}} {number}')
+                elif isinstance(value, (list, tuple)):
+                    for index, number in enumerate(value):
+                        lines.append(f'{PREFIX}_{name}_{key}{{index="{index}"}} {number}')
+                elif isinstance(value, (int, float)):
+                    lines.append(f'{PREFIX}_{name}_{key} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self) -> str:
+        """Bản tóm tắt dễ đọc cho lệnh /stats."""
+        lines = []
+        histograms = self.histograms()
+        if not self.enabled:
+            lines.append("Đo độ trễ đang tắt (đặt METRICS=1 để bật).")
+        elif not histograms:
+            lines.append("Chưa có số liệu độ trễ.")
+        for (group, step), histogram in sorted(histograms.items()):
+            lines.append(
+                f"{group}.{step}: {histogram.count} lần, lỗi {histogram.errors}, "
+                f"tb {histogram.total / histogram.count * 1000:.1f} ms, "
+                f"p50 {histogram.quantile(0.5) * 1000:.1f} ms, p99 {histogram.quantile(0.99) * 1000:.1f} ms"
+            )
+        for name, values in self.collect().items():
+            flat, nested = [], []
+            for key, value in values.items():
+                if isinstance(value, dict):
+                    shown = ', '.join(f"{field}={_format_number(number)}" for field, number in value.items()
+                                      if isinstance(number, (int, float)))
+                    nested.append(f"  {key}: {shown}")
+                elif isinstance(value, (list, tuple)):
+                    flat.append(f"{key}=[{', '.join(_format_number(v) for v in value)}]")
+                else:
+                    flat.append(f"{key}={_format_number(value)}")
+            lines.append(f"\n[{name}] {', '.join(flat)}".rstrip())
+            lines.extend(nested)
+        return '\n'.join(lines)
+
+    def serve(self, host: str = '127.0.0.1', port: int = 9464, path: str = '/metrics') -> 'MetricsServer':
+        """Chạy endpoint HTTP ở nền và trả về server (để dừng hoặc lấy cổng)."""
+        server = MetricsServer(self, host, port, path)
+        server.start()
+        return server
+
+
+def _format_number(value) -> str:
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return str(value)
+
+
+class MetricsServer:
+    def __init__(self, metrics: Metrics, host: str = '127.0.0.1', port: int = 9464,
+                 path: str = '/metrics'):
+        """
+        Args:
+            metrics: Nguồn số liệu
+            host: Địa chỉ lắng nghe (mặc định chỉ máy cục bộ)
+            port: Cổng lắng nghe (0 để hệ điều hành tự chọn)
+            path: Đường dẫn trả số liệu
+        """
+        # http.server chỉ được import khi thật sự mở endpoint
+        from http.server import ThreadingHTTPServer
+        self.metrics = metrics
+        self.path = path
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def _make_handler(self):
+        from http.server import BaseHTTPRequestHandler
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != server.path:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = server.metrics.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("metrics: " + format, *args)
+
+        return Handler
+
+    def start(self) -> None:
+        threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True).start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# Bộ số liệu dùng chung của bot (METRICS=1 để đo độ trễ)
+metrics = Metrics(enabled=os.environ.get('METRICS') == '1')
@@ -0,0 +1,326 @@
+"""
+Hàng đợi gửi tin nhắn ra Telegram, tôn trọng giới hạn flood của Bot API.
+
+Mọi lời gọi reply_to/send_message/send_document/edit_message_text của
+handler được đưa vào Outbox thay vì gọi thẳng bot. Các thread gửi lấy tin
+theo:
+
+- thứ tự FIFO trong từng chat (một chat chỉ có một tin đang gửi);
+- token bucket riêng cho mỗi chat và một bucket chung cho cả bot;
+- độ ưu tiên giữa các chat: trả lời trực tiếp (reply_to, sửa tin khi bấm
+  nút) trước, tin nhắn tiếp nối (send_message) rồi mới đến tệp
+  (send_document);
+- khi gặp lỗi 429, chờ đúng retry_after rồi gửi lại chính tin đó; khi chưa
+  kết nối được tới Telegram (requests.ConnectionError), gửi lại với thời gian
+  chờ tăng dần. Các lỗi khác, kể cả hết thời gian chờ trả lời (ReadTimeout,
+  khi Telegram có thể đã nhận tin), không được gửi lại để tránh tin trùng.
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+import requests
+from telebot.apihelper import ApiTelegramException
+
+logger = logging.getLogger(__name__)
+
+# Giới hạn của Telegram: khoảng 1 tin/giây mỗi chat (cho phép gửi dồn ngắn) và
+# 30 tin/giây toàn bot. Bucket cho phép tối đa burst + rate tin trong một giây
+# bất kỳ nên cần giữ tổng này không vượt giới hạn.
+CHAT_RATE = 1.0
+CHAT_BURST = 2
+GLOBAL_RATE = 25.0
+GLOBAL_BURST = 5
+
+PRIORITIES = {'reply_to': 0, 'edit_message_text': 0, 'send_message': 1, 'send_document': 2}
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Số giây phải chờ đến khi có token (0 nếu có ngay)."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class _Outgoing:
+    __slots__ = ('method', 'args', 'kwargs', 'priority', 'enqueued', 'attempts')
+
+    def __init__(self, method: str, args: tuple, kwargs: dict):
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = PRIORITIES.get(method, 1)
+        self.enqueued = time.monotonic()
+        self.attempts = 0
+
+
+class _ChatQueue:
+    __slots__ = ('items', 'bucket', 'busy', 'scheduled')
+
+    def __init__(self, rate: float, burst: float):
+        self.items: Deque[_Outgoing] = deque()
+        self.bucket = TokenBucket(rate, burst)
+        self.busy = False
+        self.scheduled = False
+
+
+def _chat_id_of_call(method: str, args: tuple, kwargs: dict) -> Any:
+    if method == 'reply_to':
+        return args[0].chat.id
+    if method == 'edit_message_text':
+        return args[1] if len(args) > 1 else kwargs.get('chat_id')
+    return args[0] if args else kwargs.get('chat_id')
+
+
+def _close_document(item: _Outgoing) -> None:
+    if item.method == 'send_document' and hasattr(item.args[1], 'close'):
+        item.args[1].close()
+
+
+class Outbox:
+    # send_document gửi sau khi handler trả về: Outbox đóng tệp khi đã xong
+    owns_documents = True
+
+    def __init__(self, bot, workers: int = 4, chat_rate: float = CHAT_RATE,
+                 chat_burst: float = CHAT_BURST, global_rate: float = GLOBAL_RATE,
+                 global_burst: float = GLOBAL_BURST, max_retries: int = 5,
+                 max_chats: int = 10000):
+        """
+        Args:
+            bot: TeleBot dùng để gửi thật
+            workers: Số thread gửi song song (các chat khác nhau)
+            chat_rate, chat_burst: Tốc độ (tin/giây) và số tin gửi dồn tối đa mỗi chat
+            global_rate, global_burst: Tương tự cho toàn bộ bot
+            max_retries: Số lần gửi lại tối đa một tin (429 hoặc chưa kết nối được)
+            max_chats: Số chat giữ trạng thái bucket trước khi dọn các chat rảnh
+        """
+        self.bot = bot
+        self.workers = workers
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.max_chats = max_chats
+        self._global = TokenBucket(global_rate, global_burst)
+        self._chats: Dict[Any, _ChatQueue] = {}
+        self._ready: List[tuple] = []     # (priority, seq, chat_id)
+        self._delayed: List[tuple] = []   # (due, priority, seq, chat_id)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._pending = 0
+        self._stopping = False
+        self._threads: List[threading.Thread] = []
+        self._latencies: Deque[float] = deque(maxlen=2000)
+        # Thời gian của riêng lời gọi Bot API (không tính thời gian chờ trong hàng đợi)
+        self._call_times: Deque[float] = deque(maxlen=2000)
+        self._stats = {'enqueued': 0, 'sent': 0, 'retried': 0, 'failed': 0, 'rate_limited': 0}
+
+    # Giao diện giống TeleBot để dùng làm sender của handler
+    def reply_to(self, message, text, **kwargs) -> None:
+        self.enqueue('reply_to', (message, text), kwargs)
+
+    def send_message(self, chat_id, text, **kwargs) -> None:
+        self.enqueue('send_message', (chat_id, text), kwargs)
+
+    def send_document(self, chat_id, document, **kwargs) -> None:
+        self.enqueue('send_document', (chat_id, document), kwargs)
+
+    def edit_message_text(self, text, chat_id, message_id, **kwargs) -> None:
+        self.enqueue('edit_message_text', (text, chat_id, message_id), kwargs)
+
+    def answer_callback_query(self, callback_query_id, **kwargs) -> None:
+        # Không phải tin nhắn nên không tính vào giới hạn gửi; trả lời ngay để
+        # Telegram tắt vòng chờ trên nút bấm
+        try:
+            self.bot.answer_callback_query(callback_query_id, **kwargs)
+        except Exception:
+            logger.warning("Không trả lời được callback query %s", callback_query_id, exc_info=True)
+
+    def answer_inline_query(self, inline_query_id, results, **kwargs) -> None:
+        # Như callback query: không gắn với chat nào và query hết hạn sau vài giây
+        try:
+            self.bot.answer_inline_query(inline_query_id, results, **kwargs)
+        except Exception:
+            logger.warning("Không trả lời được inline query %s", inline_query_id, exc_info=True)
+
+    def enqueue(self, method: str, args: tuple, kwargs: dict) -> None:
+        chat_id = _chat_id_of_call(method, args, kwargs)
+        item = _Outgoing(method, args, kwargs)
+        with self._cond:
+            chat = self._chats.get(chat_id)
+            if chat is None:
+                if len(self._chats) >= self.max_chats:
+                    self._prune(time.monotonic())
+                chat = self._chats[chat_id] = _ChatQueue(self.chat_rate, self.chat_burst)
+            chat.items.append(item)
+            self._pending += 1
+            self._stats['enqueued'] += 1
+            if not chat.busy and not chat.scheduled:
+                self._schedule(chat_id, chat, 0.0)
+            self._cond.notify()
+
+    def _schedule(self, chat_id, chat: _ChatQueue, delay: float) -> None:
+        """Đưa chat (đang rảnh, còn tin) vào hàng chờ gửi. Gọi khi giữ _cond."""
+        chat.scheduled = True
+        priority = chat.items[0].priority
+        if delay > 0:
+            heapq.heappush(self._delayed, (time.monotonic() + delay, priority, next(self._seq), chat_id))
+        else:
+            heapq.heappush(self._ready, (priority, next(self._seq), chat_id))
+
+    def _prune(self, now: float) -> None:
+        idle = [chat_id for chat_id, chat in self._chats.items()
+                if not chat.items and not chat.busy and chat.bucket.full(now)]
+        for chat_id in idle:
+            del self._chats[chat_id]
+
+    def _next(self) -> Optional[tuple]:
+        """Chờ và lấy tin tiếp theo được phép gửi; None khi đã dừng và hết việc."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                while self._delayed and self._delayed[0][0] <= now:
+                    _, priority, seq, chat_id = heapq.heappop(self._delayed)
+                    heapq.heappush(self._ready, (priority, seq, chat_id))
+
+                if self._ready:
+                    wait = self._global.delay(now)
+                    if wait > 0:
+                        self._cond.wait(wait)
+                        continue
+                    _, _, chat_id = heapq.heappop(self._ready)
+                    chat = self._chats[chat_id]
+                    wait = chat.bucket.delay(now)
+                    if wait > 0:
+                        heapq.heappush(self._delayed, (now + wait, chat.items[0].priority,
+                                                       next(self._seq), chat_id))
+                        continue
+                    self._global.take(now)
+                    chat.bucket.take(now)
+                    chat.scheduled = False
+                    chat.busy = True
+                    return chat_id, chat, chat.items.popleft()
+
+                if self._stopping and not self._pending:
+                    return None
+                timeout = self._delayed[0][0] - now if self._delayed else None
+                self._cond.wait(timeout)
+
+    def _work(self) -> None:
+        while True:
+            job = self._next()
+            if job is None:
+                return
+            chat_id, chat, item = job
+            retry_after = None
+            failed = False
+            started = time.monotonic()
+            try:
+                if item.method == 'send_document' and hasattr(item.args[1], 'seek'):
+                    # Tệp trong bộ nhớ có thể đã bị đọc ở lần gửi trước
+                    item.args[1].seek(0)
+                getattr(self.bot, item.method)(*item.args, **item.kwargs)
+            except ApiTelegramException as e:
+                if e.error_code == 429:
+                    with self._cond:
+                        self._stats['rate_limited'] += 1
+                    retry_after = float((e.result_json.get('parameters') or {}).get('retry_after', 1))
+                else:
+                    failed = True
+                    logger.warning("Telegram từ chối tin nhắn tới chat %s: %s", chat_id, e.description)
+            except requests.exceptions.ConnectionError as e:
+                # Gồm cả ConnectTimeout: request chưa tới được Telegram nên gửi lại an toàn
+                logger.warning("Không kết nối được Telegram khi gửi tới chat %s: %s", chat_id, e)
+                retry_after = min(30.0, 2.0 ** item.attempts)
+            except requests.exceptions.ReadTimeout:
+                failed = True
+                logger.warning("Telegram không trả lời kịp khi gửi tới chat %s; "
+                               "không gửi lại vì tin có thể đã được nhận", chat_id)
+            except Exception:
+                failed = True
+                logger.exception("Lỗi khi gửi tin nhắn tới chat %s", chat_id)
+
+            done = retry_after is None or item.attempts >= self.max_retries
+            if done:
+                # Gửi xong hoặc bỏ cuộc: giải phóng tệp (tệp tạm, bộ đệm trong bộ nhớ)
+                _close_document(item)
+            with self._cond:
+                self._call_times.append(time.monotonic() - started)
+                chat.busy = False
+                if not done:
+                    item.attempts += 1
+                    self._stats['retried'] += 1
+                    chat.items.appendleft(item)
+                    self._schedule(chat_id, chat, retry_after)
+                else:
+                    self._pending -= 1
+                    if failed or retry_after is not None:
+                        self._stats['failed'] += 1
+                    else:
+                        self._stats['sent'] += 1
+                        self._latencies.append(time.monotonic() - item.enqueued)
+                    if chat.items:
+                        self._schedule(chat_id, chat, 0.0)
+                self._cond.notify_all()
+
+    def start(self) -> 'Outbox':
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'outbox-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Chờ đến khi mọi tin đã được gửi (hoặc bỏ cuộc). Trả về False nếu hết thời gian."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Gửi nốt các tin đang chờ rồi dừng các thread gửi."""
+        self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            stats = dict(self._stats)
+            stats['queue_depth'] = self._pending
+            latencies = sorted(self._latencies)
+            call_times = sorted(self._call_times)
+        for name, values in (('latency', latencies), ('api_call', call_times)):
+            if values:
+                stats[f'{name}_p50'] = values[len(values) // 2]
+                stats[f'{name}_p99'] = values[min(len(values) - 1, int(len(values) * 0.99))]
+                stats[f'{name}_max'] = values[-1]
+        return stats
@@ -0,0 +1,1811 @@
+"""
+Lưu trữ của bot: DatabaseManager (SQLite với connection pool), hàng đợi ghi
+trễ, kho trạng thái hội thoại và kho kết quả chuyển đổi nóng.
+
+Không có gì được tạo khi import module; main.py khởi tạo các đối tượng này ở
+lần dùng đầu tiên.
+"""
+import json
+import logging
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from converters import (ConversionCache, FLOAT_BASE_CHOICES, FLOAT_PRECISION,
+                        HEAVY_CONVERSION_DIGITS, IEEE_CHOICES)
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Các câu lệnh SQL dùng chung, giữ nguyên chuỗi để sqlite3 tái sử dụng
+# prepared statement trong cache của từng connection.
+SQL_UPSERT_USER = '''
+            INSERT INTO users (id_tele, hoten, username, last_time_using)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(id_tele) DO UPDATE SET
+                hoten = excluded.hoten,
+                username = excluded.username,
+                last_time_using = excluded.last_time_using
+            '''
+SQL_INCREMENT_CONVERT_ALL = '''
+            UPDATE users 
+            SET convert_all = convert_all + 1,
+                last_time_using = ?
+            WHERE id_tele = ?
+            '''
+SQL_ADD_CONVERT_ALL = '''
+            UPDATE users 
+            SET convert_all = convert_all + ?,
+                last_time_using = ?
+            WHERE id_tele = ?
+            '''
+SQL_TOUCH_USER = '''
+            UPDATE users SET last_time_using = ? WHERE id_tele = ?
+            '''
+SQL_INSERT_HISTORY = '''
+            INSERT INTO conversion_history (id_tele, conversion_text, conversion_time)
+            VALUES (?, ?, ?)
+            '''
+SQL_CREATE_HISTORY = '''
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                id_tele INTEGER NOT NULL,
+                conversion_text TEXT NOT NULL,
+                conversion_time INTEGER NOT NULL,
+                FOREIGN KEY (id_tele) REFERENCES users (id_tele) ON DELETE CASCADE
+            )
+            '''
+# id tăng theo thứ tự ghi nên cũng là thứ tự thời gian của lịch sử; index
+# (id_tele, id) cho phép phân trang keyset với chi phí như nhau ở mọi trang
+SQL_CREATE_HISTORY_INDEX = '''
+            CREATE INDEX IF NOT EXISTS idx_conversion_history_user 
+            ON conversion_history(id_tele, id)
+            '''
+
+# Bảng thống kê sử dụng, cộng dồn cùng transaction với lịch sử chuyển đổi;
+# day là ngày theo giờ địa phương dạng 'YYYY-MM-DD'
+SQL_CREATE_USAGE = (
+    '''
+    CREATE TABLE IF NOT EXISTS usage_days (
+        day TEXT PRIMARY KEY,
+        conversions INTEGER NOT NULL DEFAULT 0,
+        active_users INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS usage_daily (
+        day TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        conversions INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, kind)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS usage_totals (
+        kind TEXT PRIMARY KEY,
+        conversions INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+    ''',
+    # Người dùng đã được đếm trong ngày (chỉ cần cho vài ngày gần nhất)
+    '''
+    CREATE TABLE IF NOT EXISTS usage_active_users (
+        day TEXT NOT NULL,
+        id_tele INTEGER NOT NULL,
+        PRIMARY KEY (day, id_tele)
+    ) WITHOUT ROWID
+    ''',
+)
+SQL_INSERT_ACTIVE_USER = '''
+            INSERT OR IGNORE INTO usage_active_users (day, id_tele) VALUES (?, ?)
+            '''
+SQL_ADD_USAGE_DAY = '''
+            INSERT INTO usage_days (day, conversions, active_users) VALUES (?, ?, ?)
+            ON CONFLICT(day) DO UPDATE SET
+                conversions = conversions + excluded.conversions,
+                active_users = active_users + excluded.active_users
+            '''
+SQL_ADD_USAGE_KIND = '''
+            INSERT INTO usage_daily (day, kind, conversions) VALUES (?, ?, ?)
+            ON CONFLICT(day, kind) DO UPDATE SET conversions = conversions + excluded.conversions
+            '''
+SQL_ADD_USAGE_TOTAL = '''
+            INSERT INTO usage_totals (kind, conversions) VALUES (?, ?)
+            ON CONFLICT(kind) DO UPDATE SET conversions = conversions + excluded.conversions
+            '''
+
+# rowid lớn nhất của SQLite, dùng làm cận trên khi lấy trang đầu tiên
+MAX_ROWID = 2 ** 63 - 1
+
+# Phiên bản schema lưu trong PRAGMA user_version (xem DatabaseManager._migrate)
+SCHEMA_VERSION = 3
+# Số ngày giữ danh sách người dùng đã đếm (usage_active_users); lô ghi trễ cho
+# ngày cũ hơn không được đếm người dùng hoạt động vì không còn gì để khử trùng
+USAGE_ACTIVE_DAYS = 2
+
+
+def _format_time(epoch: float) -> str:
+    """Thời điểm dạng chuỗi của cột users.last_time_using."""
+    return datetime.fromtimestamp(epoch).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _usage_day(epoch: float) -> str:
+    """Ngày (giờ địa phương) của các bảng usage_*."""
+    return time.strftime('%Y-%m-%d', time.localtime(epoch))
+
+
+def _usage_active_horizon() -> str:
+    """Ngày cũ nhất còn danh sách usage_active_users."""
+    return _usage_day(time.time() - USAGE_ACTIVE_DAYS * 86400)
+
+
+def compact_history_text(text: str, limit: int) -> str:
+    """
+    Rút gọn conversion_text dài hơn limit ký tự: giữ phần đầu (đầu vào) và
+    phần cuối (hệ đích), bỏ phần giữa của kết quả.
+    """
+    if limit <= 0 or len(text) <= limit:
+        return text
+    head = (limit - 1) // 2
+    return f"{text[:head]}…{text[len(text) - (limit - 1 - head):]}"
+
+
+class UserProfileCache:
+    """
+    Cache LRU có giới hạn cho hồ sơ người dùng đã biết (id -> (họ tên, username)).
+    Dùng để bỏ qua các upsert không làm thay đổi dữ liệu.
+    """
+
+    def __init__(self, max_users: int = 10000):
+        self.max_users = max_users
+        self._profiles: "OrderedDict[int, Tuple[str, Optional[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def matches(self, user_id: int, profile: Tuple[str, Optional[str]]) -> bool:
+        """Kiểm tra hồ sơ trong cache có trùng với hồ sơ hiện tại không."""
+        with self._lock:
+            cached = self._profiles.get(user_id)
+            if cached == profile:
+                self._profiles.move_to_end(user_id)
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def put(self, user_id: int, profile: Tuple[str, Optional[str]]) -> None:
+        """Lưu hồ sơ đã được ghi xuống database."""
+        with self._lock:
+            self._profiles[user_id] = profile
+            self._profiles.move_to_end(user_id)
+            while len(self._profiles) > self.max_users:
+                self._profiles.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'size': len(self._profiles), 'max_users': self.max_users,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+class DatabaseManager:
+    def __init__(self, db_name: str = 'bot_database.db', max_connections: int = 16,
+                 health_check_interval: float = 30.0, cached_statements: int = 128,
+                 acquire_timeout: float = 20.0, profile_cache_size: int = 10000,
+                 max_history_text: int = 1024):
+        """
+        Khởi tạo DatabaseManager với connection pooling và thread safety.
+        
+        Mỗi worker thread giữ một connection lâu dài (mở một lần, chạy PRAGMA
+        một lần) cho tới khi thread kết thúc, tổng số connection bị giới hạn
+        bởi max_connections: phải không nhỏ hơn số thread dùng database.
+        
+        Args:
+            db_name: Tên file database
+            max_connections: Số connection tối đa được mở đồng thời
+            health_check_interval: Số giây connection rảnh trước khi kiểm tra lại
+            cached_statements: Số prepared statement được cache trên mỗi connection
+            acquire_timeout: Số giây chờ tối đa khi pool đã đầy
+            profile_cache_size: Số hồ sơ người dùng tối đa được cache
+            max_history_text: Độ dài tối đa của một conversion_text được lưu
+                              (dài hơn thì bỏ phần giữa, 0 để giữ nguyên)
+        """
+        self.db_name = db_name
+        self.max_connections = max_connections
+        self.health_check_interval = health_check_interval
+        self.cached_statements = cached_statements
+        self.acquire_timeout = acquire_timeout
+        self.max_history_text = max_history_text
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        # id(connection) -> (thread sở hữu, connection)
+        self._connections: Dict[int, Tuple[threading.Thread, sqlite3.Connection]] = {}
+        self._closed = False
+        self._stats = {'opened': 0, 'reused': 0, 'reconnects': 0, 'reaped': 0}
+        self.profiles = UserProfileCache(profile_cache_size)
+        self._touch_lock = threading.Lock()
+        # id_tele -> last_time_using chưa ghi xuống database
+        self._pending_touches: Dict[int, str] = {}
+        # Người dùng có lịch sử mới kể từ lần HistoryRetention kiểm tra trước
+        self._history_writers: set = set()
+        self.initialize_db()
+
+    def _open_connection(self) -> sqlite3.Connection:
+        """Mở connection mới và cấu hình PRAGMA (chỉ chạy một lần mỗi connection)."""
+        conn = sqlite3.connect(
+            self.db_name,
+            timeout=20,
+            check_same_thread=False,  # Cho phép close() từ thread khác khi shutdown
+            cached_statements=self.cached_statements
+        )
+        # Phải đặt trước journal_mode=WAL: lệnh đó ghi header của file mới, sau
+        # đó auto_vacuum chỉ đổi được bằng VACUUM (database cũ không bị ảnh hưởng)
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        # Enable WAL mode for better concurrent access
+        conn.execute('PRAGMA journal_mode=WAL')
+        # Enable foreign key constraints
+        conn.execute('PRAGMA foreign_keys=ON')
+        return conn
+
+    def _reap_dead_threads(self) -> None:
+        """Đóng connection của các thread đã kết thúc để trả slot về pool."""
+        with self._lock:
+            dead = [key for key, (thread, _) in self._connections.items()
+                    if not thread.is_alive()]
+            for key in dead:
+                _, conn = self._connections.pop(key)
+                conn.close()
+                self._slots.release()
+                self._stats['reaped'] += 1
+
+    def _discard_local(self) -> None:
+        """Bỏ connection hiện tại của thread (khi hỏng) và trả slot."""
+        conn = self._local.connection
+        del self._local.connection
+        with self._lock:
+            if self._connections.pop(id(conn), None) is not None:
+                self._slots.release()
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _checkout(self) -> sqlite3.Connection:
+        """Lấy connection của thread hiện tại, mở mới nếu chưa có."""
+        if self._closed:
+            raise sqlite3.ProgrammingError("DatabaseManager đã được đóng")
+
+        conn = getattr(self._local, 'connection', None)
+        if conn is not None:
+            now = time.monotonic()
+            # Health check chỉ khi connection đã rảnh một thời gian
+            if now - self._local.last_used > self.health_check_interval:
+                try:
+                    conn.execute('SELECT 1').fetchone()
+                except sqlite3.Error:
+                    self._discard_local()
+                    with self._lock:
+                        self._stats['reconnects'] += 1
+                    return self._checkout()
+            self._local.last_used = now
+            with self._lock:
+                self._stats['reused'] += 1
+            return conn
+
+        if not self._slots.acquire(blocking=False):
+            self._reap_dead_threads()
+            if not self._slots.acquire(timeout=self.acquire_timeout):
+                raise sqlite3.OperationalError(
+                    f"Connection pool đã đầy ({self.max_connections} connection)"
+                )
+        try:
+            conn = self._open_connection()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._connections[id(conn)] = (threading.current_thread(), conn)
+            self._stats['opened'] += 1
+        self._local.connection = conn
+        self._local.last_used = time.monotonic()
+        return conn
+
+    @contextmanager
+    def get_connection(self):
+        """
+        Context manager để lấy connection từ pool.
+        Connection được giữ lại cho thread hiện tại; nếu có lỗi thì
+        transaction đang mở sẽ được rollback để connection vẫn dùng lại được.
+        """
+        conn = self._checkout()
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+
+    def pool_stats(self) -> Dict[str, int]:
+        """Thống kê pool: số connection đang mở, số lần mở mới/tái sử dụng."""
+        with self._lock:
+            return dict(self._stats, active=len(self._connections),
+                        max_connections=self.max_connections)
+
+    def close(self) -> None:
+        """Đóng toàn bộ connection trong pool (gọi khi tắt bot)."""
+        with self._lock:
+            self._closed = True
+            for _, conn in self._connections.values():
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+                self._slots.release()
+            self._connections.clear()
+
+    def initialize_db(self) -> None:
+        """Khởi tạo database với indexes để tối ưu truy vấn."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Tạo bảng users với các indexes phù hợp
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id_tele INTEGER PRIMARY KEY,
+                hoten TEXT NOT NULL,
+                username TEXT,
+                last_time_using TEXT NOT NULL,
+                convert_all INTEGER DEFAULT 0,
+                history_floor INTEGER NOT NULL DEFAULT 0
+            )
+            ''')
+            
+            # Tạo index cho username để tìm kiếm nhanh
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_username ON users(username)')
+            
+            # Tạo bảng conversion_history, conversion_time là epoch (giây)
+            cursor.execute(SQL_CREATE_HISTORY.format(table='conversion_history'))
+            
+            # Tạo index cho id_tele và id để tối ưu truy vấn lịch sử
+            cursor.execute(SQL_CREATE_HISTORY_INDEX)
+            
+            # Bảng lưu snapshot trạng thái hội thoại để khôi phục sau khi khởi động lại
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS chat_sessions (
+                id_tele INTEGER PRIMARY KEY,
+                state TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            ''')
+            
+            # Kho kết quả chuyển đổi nóng, nạp vào cache khi khởi động
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS warm_conversions (
+                converter TEXT NOT NULL,
+                args TEXT NOT NULL,
+                value TEXT NOT NULL,
+                hits INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (converter, args)
+            )
+            ''')
+            
+            # Các bảng thống kê sử dụng (usage_*)
+            for statement in SQL_CREATE_USAGE:
+                cursor.execute(statement)
+            
+            conn.commit()
+            self._migrate(conn)
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        """Nâng cấp database cũ lên SCHEMA_VERSION (theo PRAGMA user_version)."""
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        conn.execute('BEGIN')
+        try:
+            if version < 1:
+                self._migrate_v1(conn)
+            if version < 2:
+                self._migrate_v2(conn)
+            if version < 3:
+                rows = self._rebuild_usage(conn)
+                logger.info("Đã dựng bảng thống kê sử dụng từ %d dòng lịch sử", rows)
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def _migrate_v1(self, conn: sqlite3.Connection) -> None:
+        """
+        v1: conversion_time từ chuỗi "%Y-%m-%d %H:%M:%S" (giờ địa phương) sang
+        epoch dạng số nguyên, rút gọn conversion_text quá dài và thêm cột
+        users.history_floor.
+        """
+        user_columns = {row[1] for row in conn.execute('PRAGMA table_info(users)')}
+        if 'history_floor' not in user_columns:
+            conn.execute('ALTER TABLE users ADD COLUMN history_floor INTEGER NOT NULL DEFAULT 0')
+        
+        columns = {row[1]: row[2] for row in conn.execute('PRAGMA table_info(conversion_history)')}
+        if columns['conversion_time'].upper() == 'INTEGER':
+            return
+        # Cột TEXT sẽ đổi số thành chuỗi, nên phải dựng lại bảng
+        limit = self.max_history_text
+        head = (limit - 1) // 2
+        conn.execute(SQL_CREATE_HISTORY.format(table='conversion_history_v1'))
+        rows = conn.execute(
+            '''
+            INSERT INTO conversion_history_v1 (id, id_tele, conversion_text, conversion_time)
+            SELECT id, id_tele,
+                   CASE WHEN ? > 0 AND length(conversion_text) > ?
+                        THEN substr(conversion_text, 1, ?) || '…' || substr(conversion_text, -?)
+                        ELSE conversion_text END,
+                   COALESCE(CAST(strftime('%s', conversion_time, 'utc') AS INTEGER), 0)
+            FROM conversion_history
+            ''',
+            (limit, limit, head, limit - 1 - head)
+        ).rowcount
+        # DROP xóa luôn index cũ (id_tele, conversion_time)
+        conn.execute('DROP TABLE conversion_history')
+        conn.execute('ALTER TABLE conversion_history_v1 RENAME TO conversion_history')
+        conn.execute(SQL_CREATE_HISTORY_INDEX)
+        logger.info("Đã chuyển %d dòng conversion_history sang schema v1", rows)
+
+    def _migrate_v2(self, conn: sqlite3.Connection) -> None:
+        """
+        v2: lịch sử sắp theo id thay vì (conversion_time, id); index
+        (id_tele, conversion_time, id) được thay bằng (id_tele, id).
+        """
+        conn.execute('DROP INDEX IF EXISTS idx_conversion_history')
+        conn.execute(SQL_CREATE_HISTORY_INDEX)
+
+    @metrics.timed('db')
+    def update_user_data(self, user) -> None:
+        """
+        Cập nhật thông tin người dùng với prepared statement.
+        
+        Nếu hồ sơ (họ tên, username) không đổi so với cache thì bỏ qua upsert,
+        chỉ gom last_time_using để flush_user_touches() ghi hàng loạt sau.
+        Hồ sơ mới hoặc đã thay đổi được ghi ngay.
+        
+        Args:
+            user: Đối tượng user từ Telegram
+        """
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        full_name = f"{user.first_name or ''} {user.last_name or ''}".strip()
+        profile = (full_name, user.username)
+        
+        if self.profiles.matches(user.id, profile):
+            with self._touch_lock:
+                self._pending_touches[user.id] = current_time
+            return
+        
+        with self.get_connection() as conn:
+            conn.execute(SQL_UPSERT_USER, (user.id, full_name, user.username, current_time))
+            conn.commit()
+        self.profiles.put(user.id, profile)
+        with self._touch_lock:
+            self._pending_touches.pop(user.id, None)
+
+    @metrics.timed('db')
+    def flush_user_touches(self) -> int:
+        """
+        Ghi hàng loạt các last_time_using đã được gom trong một transaction.
+        
+        Returns:
+            Số người dùng được cập nhật
+        """
+        with self._touch_lock:
+            pending, self._pending_touches = self._pending_touches, {}
+        if not pending:
+            return 0
+        
+        try:
+            with self.get_connection() as conn:
+                conn.executemany(SQL_TOUCH_USER,
+                                 [(when, user_id) for user_id, when in pending.items()])
+                conn.commit()
+        except sqlite3.Error:
+            # Trả lại để lần flush sau ghi tiếp (giữ thời gian mới hơn nếu có)
+            with self._touch_lock:
+                for user_id, when in pending.items():
+                    self._pending_touches.setdefault(user_id, when)
+            raise
+        return len(pending)
+
+    @metrics.timed('db')
+    def update_convert_all(self, user_id: int) -> None:
+        """
+        Tăng số lần chuyển đổi với prepared statement.
+        
+        Args:
+            user_id: ID của người dùng
+        """
+        with self.get_connection() as conn:
+            conn.execute(SQL_INCREMENT_CONVERT_ALL,
+                         (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), user_id))
+            conn.commit()
+
+    @metrics.timed('db')
+    def add_conversion_history(self, user_id: int, conversion_text: str) -> None:
+        """
+        Thêm lịch sử chuyển đổi với prepared statement.
+        
+        Args:
+            user_id: ID của người dùng
+            conversion_text: Nội dung chuyển đổi
+        """
+        now = int(time.time())
+        with self.get_connection() as conn:
+            conn.execute(SQL_INSERT_HISTORY,
+                         (user_id, compact_history_text(conversion_text, self.max_history_text), now))
+            self._record_usage(conn, [(user_id, conversion_text, now)])
+            conn.commit()
+        with self._touch_lock:
+            self._history_writers.add(user_id)
+
+    @metrics.timed('db')
+    def write_batch(self, events: List[Tuple]) -> None:
+        """
+        Ghi một lô sự kiện bookkeeping trong cùng một transaction (một lần commit).
+        
+        Args:
+            events: Danh sách ('conversion', (id, text, epoch))
+                    hoặc ('conversions', (id, [text, ...], epoch))
+        """
+        limit = self.max_history_text
+        history: List[Tuple[int, str, int]] = []
+        # id_tele -> (số lần chuyển đổi, thời điểm cuối)
+        counts: Dict[int, Tuple[int, int]] = {}
+        for kind, params in events:
+            if kind == 'conversion':
+                user_id, text, when = params
+                history.append((user_id, text, when))
+                counts[user_id] = (counts.get(user_id, (0, when))[0] + 1, when)
+            elif kind == 'conversions':
+                user_id, texts, when = params
+                history.extend((user_id, text, when) for text in texts)
+                counts[user_id] = (counts.get(user_id, (0, when))[0] + len(texts), when)
+        
+        with self.get_connection() as conn:
+            if history:
+                conn.executemany(SQL_ADD_CONVERT_ALL,
+                                 [(count, _format_time(when), user_id)
+                                  for user_id, (count, when) in counts.items()])
+                conn.executemany(SQL_INSERT_HISTORY,
+                                 [(user_id, compact_history_text(text, limit), when)
+                                  for user_id, text, when in history])
+                self._record_usage(conn, history)
+            conn.commit()
+        if counts:
+            with self._touch_lock:
+                self._history_writers.update(counts)
+
+    def _record_usage(self, conn: sqlite3.Connection, history: List[Tuple[int, str, int]],
+                      rebuild: bool = False) -> None:
+        """
+        Cộng dồn các bảng usage_* cho các lần chuyển đổi (id, conversion_text,
+        epoch) trong transaction của người gọi: vài câu lệnh cho cả lô.
+
+        Khi ghi thường, người dùng hoạt động của các ngày trước
+        _usage_active_horizon() không được đếm (danh sách khử trùng đã bị xóa);
+        khi dựng lại (rebuild) mọi ngày đều được đếm và usage_totals để người
+        gọi tính sau.
+        """
+        horizon = None if rebuild else _usage_active_horizon()
+        conversions: Counter = Counter()
+        kinds: Counter = Counter()
+        active: Dict[str, set] = {}
+        # Các sự kiện trong một lô thường cùng vài giây, chỉ đổi sang ngày một lần
+        days: Dict[int, str] = {}
+        for user_id, text, when in history:
+            day = days.get(when)
+            if day is None:
+                day = days[when] = _usage_day(when)
+            conversions[day] += 1
+            kinds[(day, conversion_kind(text))] += 1
+            if horizon is None or day >= horizon:
+                active.setdefault(day, set()).add(user_id)
+        # Chỉ người dùng chưa có trong usage_active_users của ngày mới được đếm
+        new_users = {day: conn.executemany(SQL_INSERT_ACTIVE_USER,
+                                           [(day, user_id) for user_id in users]).rowcount
+                     for day, users in active.items()}
+        conn.executemany(SQL_ADD_USAGE_DAY,
+                         [(day, count, new_users.get(day, 0)) for day, count in conversions.items()])
+        conn.executemany(SQL_ADD_USAGE_KIND,
+                         [(day, kind, count) for (day, kind), count in kinds.items()])
+        if not rebuild:
+            by_kind: Counter = Counter()
+            for (_, kind), count in kinds.items():
+                by_kind[kind] += count
+            conn.executemany(SQL_ADD_USAGE_TOTAL, list(by_kind.items()))
+
+    def _rebuild_usage(self, conn: sqlite3.Connection, batch: int = 5000) -> int:
+        """
+        Tính lại usage_* từ conversion_history trong transaction của người gọi.
+
+        Lịch sử được đọc theo từng cửa sổ batch dòng (theo id). Các ngày trước
+        dòng lịch sử cũ nhất còn lại (đã bị HistoryRetention xóa) giữ nguyên số
+        liệu đã cộng dồn.
+
+        Returns:
+            Số dòng lịch sử đã đọc
+        """
+        oldest = conn.execute('SELECT MIN(conversion_time) FROM conversion_history').fetchone()[0]
+        if oldest is None:
+            return 0
+        since = _usage_day(oldest)
+        for table in ('usage_days', 'usage_daily', 'usage_active_users'):
+            conn.execute(f'DELETE FROM {table} WHERE day >= ?', (since,))
+
+        rows, after_id = 0, 0
+        while True:
+            window = conn.execute(
+                '''
+                SELECT id, id_tele, conversion_text, conversion_time FROM conversion_history
+                WHERE id > ? ORDER BY id LIMIT ?
+                ''',
+                (after_id, batch)
+            ).fetchall()
+            if not window:
+                break
+            self._record_usage(conn, [(user_id, text, when) for _, user_id, text, when in window],
+                               rebuild=True)
+            rows += len(window)
+            after_id = window[-1][0]
+
+        conn.execute('DELETE FROM usage_totals')
+        conn.execute('INSERT INTO usage_totals (kind, conversions) '
+                     'SELECT kind, SUM(conversions) FROM usage_daily GROUP BY kind')
+        return rows
+
+    @metrics.timed('db')
+    def rebuild_usage_rollups(self, batch: int = 5000) -> int:
+        """
+        Công cụ backfill: dựng lại các bảng usage_* từ lịch sử hiện có.
+
+        Chạy trong một transaction ghi nên writer phải chờ đến khi xong.
+
+        Returns:
+            Số dòng lịch sử đã đọc
+        """
+        with self.get_connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                rows = self._rebuild_usage(conn, batch)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            return rows
+
+    @metrics.timed('db')
+    def usage_summary(self, today: Optional[str] = None,
+                      windows: Tuple[int, ...] = (7, 30)) -> Dict[str, dict]:
+        """
+        Thống kê sử dụng từ các bảng usage_*: chỉ đọc tối đa max(windows) ngày,
+        không phụ thuộc kích thước lịch sử.
+
+        Args:
+            today: Ngày 'YYYY-MM-DD' được xem là hôm nay (mặc định ngày hiện tại)
+            windows: Số ngày của các khoảng thống kê (tính cả hôm nay)
+
+        Returns:
+            {'today': ..., 'windows': {số ngày: ...}, 'totals': {loại: số lần}};
+            mỗi khoảng gồm conversions, active_users (cộng theo ngày), days (số
+            ngày có dữ liệu) và kinds (loại -> số lần)
+        """
+        today = today or _usage_day(time.time())
+        end = datetime.strptime(today, '%Y-%m-%d')
+        with self.get_connection() as conn:
+            def window(days: int) -> dict:
+                since = (end - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+                count, conversions, active_users = conn.execute(
+                    'SELECT COUNT(*), COALESCE(SUM(conversions), 0), COALESCE(SUM(active_users), 0) '
+                    'FROM usage_days WHERE day >= ? AND day <= ?',
+                    (since, today)
+                ).fetchone()
+                kinds = dict(conn.execute(
+                    'SELECT kind, SUM(conversions) FROM usage_daily '
+                    'WHERE day >= ? AND day <= ? GROUP BY kind',
+                    (since, today)
+                ).fetchall())
+                return {'conversions': conversions, 'active_users': active_users,
+                        'days': count, 'kinds': kinds}
+
+            return {'today': window(1),
+                    'windows': {days: window(days) for days in windows},
+                    'totals': dict(conn.execute('SELECT kind, conversions FROM usage_totals').fetchall())}
+
+    @metrics.timed('db')
+    def prune_usage_active(self, before_day: str) -> int:
+        """Xóa danh sách người dùng đã đếm của các ngày trước before_day."""
+        with self.get_connection() as conn:
+            deleted = conn.execute(
+                'DELETE FROM usage_active_users WHERE day < ?', (before_day,)).rowcount
+            conn.commit()
+            return deleted
+
+    @metrics.timed('db')
+    def save_sessions(self, rows: List[Tuple[int, str, float]]) -> None:
+        """
+        Thay toàn bộ snapshot trạng thái hội thoại trong một transaction.
+        
+        Args:
+            rows: Danh sách (id chat, trạng thái dạng JSON, thời điểm cập nhật)
+        """
+        with self.get_connection() as conn:
+            conn.execute('DELETE FROM chat_sessions')
+            conn.executemany(
+                'INSERT INTO chat_sessions (id_tele, state, updated_at) VALUES (?, ?, ?)',
+                rows
+            )
+            conn.commit()
+
+    @metrics.timed('db')
+    def load_sessions(self) -> List[Tuple[int, str, float]]:
+        """Đọc snapshot trạng thái hội thoại đã lưu."""
+        with self.get_connection() as conn:
+            return conn.execute(
+                'SELECT id_tele, state, updated_at FROM chat_sessions'
+            ).fetchall()
+
+    @metrics.timed('db')
+    def save_warm_conversions(self, rows: List[Tuple[str, str, str, int]]) -> None:
+        """
+        Thay toàn bộ kho kết quả nóng trong một transaction.
+        
+        Args:
+            rows: Danh sách (tên converter, tham số JSON, kết quả JSON, số lần dùng)
+        """
+        now = time.time()
+        with self.get_connection() as conn:
+            conn.execute('DELETE FROM warm_conversions')
+            conn.executemany(
+                'INSERT INTO warm_conversions (converter, args, value, hits, updated_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                [row + (now,) for row in rows]
+            )
+            conn.commit()
+
+    @metrics.timed('db')
+    def load_warm_conversions(self, limit: int) -> List[Tuple[str, str, str, int, float]]:
+        """Đọc kho kết quả nóng, mục dùng nhiều nhất trước."""
+        with self.get_connection() as conn:
+            return conn.execute(
+                'SELECT converter, args, value, hits, updated_at FROM warm_conversions '
+                'ORDER BY hits DESC LIMIT ?',
+                (limit,)
+            ).fetchall()
+
+    @metrics.timed('db')
+    def conversion_frequencies(self, recent: int) -> List[Tuple[str, int]]:
+        """
+        Đếm số lần xuất hiện của từng conversion_text trong lịch sử gần đây.
+        
+        Args:
+            recent: Số dòng lịch sử mới nhất được xét
+        """
+        with self.get_connection() as conn:
+            return conn.execute(
+                'SELECT conversion_text, COUNT(*) FROM '
+                '(SELECT conversion_text FROM conversion_history ORDER BY id DESC LIMIT ?) '
+                'GROUP BY conversion_text',
+                (recent,)
+            ).fetchall()
+
+    @metrics.timed('db')
+    def get_user_history(self, user_id: int, limit: int = 10) -> Tuple[int, List[str]]:
+        """
+        Lấy lịch sử chuyển đổi với prepared statement và tối ưu query.
+        
+        Args:
+            user_id: ID của người dùng
+            limit: Số lượng lịch sử muốn lấy
+            
+        Returns:
+            Tuple chứa tổng số lần chuyển đổi và danh sách lịch sử
+        """
+        with self.get_connection() as conn:
+            # Sử dụng một transaction cho nhiều queries
+            cursor = conn.cursor()
+            
+            # Lấy tổng số lần chuyển đổi và mốc xóa lịch sử
+            cursor.execute(
+                'SELECT convert_all, history_floor FROM users WHERE id_tele = ?', 
+                (user_id,)
+            )
+            total = cursor.fetchone()
+            total_conversions, floor = total if total else (0, 0)
+            
+            # Lấy lịch sử gần nhất với index optimization (bỏ các dòng đã xóa)
+            cursor.execute('''
+            SELECT conversion_text 
+            FROM conversion_history 
+            WHERE id_tele = ? AND id > ?
+            ORDER BY id DESC 
+            LIMIT ?
+            ''', (user_id, floor, limit))
+            
+            history = cursor.fetchall()
+            return total_conversions, [row[0] for row in history]
+
+    @metrics.timed('db')
+    def get_history_page(self, user_id: int, before_id: Optional[int] = None,
+                         after_id: Optional[int] = None, limit: int = 10
+                         ) -> Tuple[int, List[Tuple[int, str, int]], bool, bool]:
+        """
+        Một trang lịch sử theo keyset (id), mới nhất trước.
+
+        Mỗi trang là một lần dò range trên index (id_tele, id) cộng hai lần dò
+        kiểm tra trang trước/sau, nên chi phí không tăng theo độ sâu như OFFSET.
+
+        Args:
+            user_id: ID của người dùng
+            before_id: Lấy các dòng cũ hơn id này (trang sau)
+            after_id: Lấy các dòng mới hơn id này (trang trước); nếu không đủ
+                      một trang thì trả về trang mới nhất
+            limit: Số dòng mỗi trang
+            
+        Returns:
+            (tổng số lần chuyển đổi, các dòng (id, conversion_text, conversion_time),
+             còn trang mới hơn, còn trang cũ hơn)
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'SELECT convert_all, history_floor FROM users WHERE id_tele = ?',
+                (user_id,)
+            )
+            total = cursor.fetchone()
+            total_conversions, floor = total if total else (0, 0)
+
+            rows = None
+            if after_id is not None:
+                cursor.execute('''
+                SELECT id, conversion_text, conversion_time
+                FROM conversion_history
+                WHERE id_tele = ? AND id > ?
+                ORDER BY id
+                LIMIT ?
+                ''', (user_id, max(after_id, floor), limit))
+                rows = cursor.fetchall()[::-1]
+                if len(rows) < limit:
+                    rows = None
+            if rows is None:
+                upper = before_id if before_id is not None else MAX_ROWID
+                cursor.execute('''
+                SELECT id, conversion_text, conversion_time
+                FROM conversion_history
+                WHERE id_tele = ? AND id > ? AND id < ?
+                ORDER BY id DESC
+                LIMIT ?
+                ''', (user_id, floor, upper, limit))
+                rows = cursor.fetchall()
+
+            if not rows:
+                return total_conversions, [], False, False
+            has_newer = cursor.execute(
+                'SELECT 1 FROM conversion_history WHERE id_tele = ? AND id > ? LIMIT 1',
+                (user_id, rows[0][0])
+            ).fetchone() is not None
+            has_older = cursor.execute(
+                'SELECT 1 FROM conversion_history WHERE id_tele = ? AND id > ? AND id < ? LIMIT 1',
+                (user_id, floor, rows[-1][0])
+            ).fetchone() is not None
+            return total_conversions, rows, has_newer, has_older
+
+    def iter_history(self, user_id: Optional[int] = None,
+                     batch: int = 1000) -> Iterator[Tuple[int, int, str, int]]:
+        """
+        Duyệt lịch sử theo id tăng dần, bỏ các dòng đã bị /clear_history ẩn.
+
+        Mỗi cửa sổ batch dòng là một truy vấn keyset ngắn; giữa hai cửa sổ
+        không giữ transaction đọc nên writer và checkpoint WAL không bị chặn,
+        và bộ nhớ chỉ chứa một cửa sổ.
+
+        Args:
+            user_id: Chỉ lấy lịch sử của người dùng này (None: mọi người dùng)
+            batch: Số dòng mỗi lần đọc
+
+        Yields:
+            (id_tele, id, conversion_text, conversion_time)
+        """
+        if user_id is not None:
+            with self.get_connection() as conn:
+                floor = conn.execute(
+                    'SELECT history_floor FROM users WHERE id_tele = ?', (user_id,)).fetchone()
+            if floor is None:
+                return
+            after_id = floor[0]
+        else:
+            after_id = 0
+
+        while True:
+            with self.get_connection() as conn:
+                if user_id is not None:
+                    rows = conn.execute(
+                        '''
+                        SELECT id_tele, id, conversion_text, conversion_time
+                        FROM conversion_history
+                        WHERE id_tele = ? AND id > ?
+                        ORDER BY id LIMIT ?
+                        ''',
+                        (user_id, after_id, batch)
+                    ).fetchall()
+                else:
+                    rows = conn.execute(
+                        '''
+                        SELECT h.id_tele, h.id, h.conversion_text, h.conversion_time
+                        FROM conversion_history h JOIN users u ON u.id_tele = h.id_tele
+                        WHERE h.id > ? AND h.id > u.history_floor
+                        ORDER BY h.id LIMIT ?
+                        ''',
+                        (after_id, batch)
+                    ).fetchall()
+            if not rows:
+                return
+            yield from rows
+            if len(rows) < batch:
+                return
+            after_id = rows[-1][1]
+
+    @metrics.timed('db')
+    def clear_user_history(self, user_id: int) -> None:
+        """
+        Xóa lịch sử chuyển đổi bằng một câu UPDATE, không phụ thuộc số dòng.
+        
+        Các dòng hiện có được ẩn bằng mốc history_floor (id lớn nhất lúc xóa)
+        và được HistoryRetention xóa thật ở nền.
+        
+        Args:
+            user_id: ID của người dùng
+        """
+        with self.get_connection() as conn:
+            conn.execute(
+                '''
+                UPDATE users
+                SET convert_all = 0,
+                    history_floor = (SELECT COALESCE(MAX(id), 0) FROM conversion_history)
+                WHERE id_tele = ?
+                ''',
+                (user_id,)
+            )
+            conn.commit()
+
+    def take_history_writers(self) -> set:
+        """Lấy và xóa tập người dùng có lịch sử mới kể từ lần gọi trước."""
+        with self._touch_lock:
+            writers, self._history_writers = self._history_writers, set()
+        return writers
+
+    @metrics.timed('db')
+    def prune_history_before(self, cutoff: int, after_id: int, batch: int) -> Tuple[int, Optional[int]]:
+        """
+        Xóa các dòng có conversion_time < cutoff trong batch dòng kế tiếp sau
+        after_id (theo id), nên mỗi lần gọi tốn thời gian giới hạn.
+        
+        Returns:
+            (số dòng đã xóa, id lớn nhất của cửa sổ đã xét hoặc None nếu hết bảng)
+        """
+        with self.get_connection() as conn:
+            window = conn.execute(
+                'SELECT MAX(id) FROM (SELECT id FROM conversion_history WHERE id > ? ORDER BY id LIMIT ?)',
+                (after_id, batch)
+            ).fetchone()[0]
+            if window is None:
+                return 0, None
+            deleted = conn.execute(
+                'DELETE FROM conversion_history WHERE id > ? AND id <= ? AND conversion_time < ?',
+                (after_id, window, cutoff)
+            ).rowcount
+            conn.commit()
+            return deleted, window
+
+    def users_over_history_cap(self, keep: int) -> List[int]:
+        """Người dùng có thể có hơn keep dòng lịch sử (theo convert_all)."""
+        with self.get_connection() as conn:
+            return [row[0] for row in conn.execute(
+                'SELECT id_tele FROM users WHERE convert_all > ?', (keep,))]
+
+    @metrics.timed('db')
+    def trim_user_history(self, user_id: int, keep: int, batch: int) -> int:
+        """
+        Xóa tối đa batch dòng lịch sử cũ nhất vượt quá keep dòng của người dùng.
+        
+        Returns:
+            Số dòng đã xóa
+        """
+        with self.get_connection() as conn:
+            boundary = conn.execute(
+                '''
+                SELECT id FROM conversion_history
+                WHERE id_tele = ?
+                ORDER BY id DESC
+                LIMIT 1 OFFSET ?
+                ''',
+                (user_id, keep)
+            ).fetchone()
+            if boundary is None:
+                return 0
+            deleted = conn.execute(
+                '''
+                DELETE FROM conversion_history WHERE id IN (
+                    SELECT id FROM conversion_history
+                    WHERE id_tele = ? AND id <= ?
+                    LIMIT ?)
+                ''',
+                (user_id, boundary[0], batch)
+            ).rowcount
+            conn.commit()
+            return deleted
+
+    def cleared_history_users(self) -> List[Tuple[int, int]]:
+        """(id người dùng, history_floor) của những người dùng còn lịch sử đã xóa chưa dọn."""
+        with self.get_connection() as conn:
+            return conn.execute(
+                'SELECT id_tele, history_floor FROM users WHERE history_floor > 0'
+            ).fetchall()
+
+    @metrics.timed('db')
+    def purge_cleared_history(self, user_id: int, floor: int, batch: int) -> int:
+        """
+        Xóa tối đa batch dòng lịch sử có id <= floor của người dùng; khi đã
+        xóa hết thì đặt lại history_floor = 0 (id mới luôn lớn hơn floor).
+        
+        Returns:
+            Số dòng đã xóa
+        """
+        with self.get_connection() as conn:
+            deleted = conn.execute(
+                '''
+                DELETE FROM conversion_history WHERE id IN (
+                    SELECT id FROM conversion_history WHERE id_tele = ? AND id <= ? LIMIT ?)
+                ''',
+                (user_id, floor, batch)
+            ).rowcount
+            if deleted < batch:
+                conn.execute(
+                    'UPDATE users SET history_floor = 0 WHERE id_tele = ? AND history_floor = ?',
+                    (user_id, floor)
+                )
+            conn.commit()
+            return deleted
+
+    def page_stats(self) -> Dict[str, int]:
+        """Số trang, số trang trống và chế độ auto_vacuum của database."""
+        with self.get_connection() as conn:
+            return {name: conn.execute(f'PRAGMA {name}').fetchone()[0]
+                    for name in ('page_count', 'freelist_count', 'auto_vacuum')}
+
+    @metrics.timed('db')
+    def incremental_vacuum(self, pages: int) -> None:
+        """Trả tối đa pages trang trống về hệ điều hành (cần auto_vacuum = INCREMENTAL)."""
+        with self.get_connection() as conn:
+            # execute() chỉ chạy một bước (một trang); executescript chạy đến hết
+            conn.executescript(f'PRAGMA incremental_vacuum({int(pages)})')
+
+    @metrics.timed('db')
+    def analyze(self) -> None:
+        """Cập nhật thống kê cho query planner."""
+        with self.get_connection() as conn:
+            conn.execute('ANALYZE')
+            conn.commit()
+
+    @metrics.timed('db')
+    def vacuum(self) -> None:
+        """Dựng lại toàn bộ file database (chặn các thao tác ghi khác trong lúc chạy)."""
+        with self.get_connection() as conn:
+            if conn.in_transaction:
+                conn.commit()
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('VACUUM')
+            # Ở chế độ WAL file chỉ nhỏ lại sau checkpoint
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchall()
+
+class WriteBehindQueue:
+    """
+    Hàng đợi ghi trễ cho các thao tác bookkeeping (convert_all, lịch sử chuyển
+    đổi); hồ sơ người dùng do update_user_data ghi, last_time_using được flush
+    theo touch_interval.
+    
+    Handler chỉ enqueue sự kiện rồi trả về ngay; một writer thread duy nhất
+    gom sự kiện thành lô (giới hạn bởi max_batch và max_delay) và commit
+    một lần cho cả lô.
+    """
+    _STOP = object()
+
+    def __init__(self, db: DatabaseManager, max_batch: int = 200,
+                 max_delay: float = 0.05, max_queue: int = 10000,
+                 touch_interval: float = 30.0):
+        """
+        Args:
+            db: DatabaseManager dùng để ghi
+            max_batch: Số sự kiện tối đa trong một lô
+            max_delay: Số giây tối đa một sự kiện chờ trước khi được commit
+            max_queue: Kích thước tối đa của hàng đợi (handler bị chặn khi đầy)
+            touch_interval: Chu kỳ (giây) ghi hàng loạt last_time_using đã gom
+        """
+        self.db = db
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.touch_interval = touch_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._stats_lock = threading.Lock()
+        self._stats = {'events': 0, 'batches': 0, 'failed_events': 0,
+                       'last_batch_size': 0, 'max_batch_size': 0}
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+
+    def _put(self, item) -> None:
+        if self._closed:
+            raise RuntimeError("WriteBehindQueue đã được đóng")
+        self._queue.put(item)
+
+    def record_conversion(self, user_id: int, conversion_text: str) -> None:
+        """Enqueue một lần chuyển đổi: tăng convert_all và thêm lịch sử."""
+        current_time = int(time.time())
+        self._put(('conversion', (user_id, conversion_text, current_time)))
+
+    def record_conversions(self, user_id: int, conversion_texts: List[str]) -> None:
+        """Enqueue nhiều lần chuyển đổi, được ghi trong cùng một transaction."""
+        if not conversion_texts:
+            return
+        current_time = int(time.time())
+        self._put(('conversions', (user_id, list(conversion_texts), current_time)))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Chờ đến khi mọi sự kiện đã enqueue trước đó được commit."""
+        if not self._thread.is_alive():
+            return self._queue.empty()
+        done = threading.Event()
+        self._queue.put(('flush', done))
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Ghi nốt các sự kiện còn lại rồi dừng writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+
+    def metrics(self) -> Dict[str, float]:
+        """Độ sâu hàng đợi và thống kê kích thước lô."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['avg_batch_size'] = (stats['events'] / stats['batches']) if stats['batches'] else 0.0
+        return stats
+
+    def _flush_touches(self) -> None:
+        try:
+            self.db.flush_user_touches()
+        except sqlite3.Error as e:
+            logger.warning("Không ghi được last_time_using: %s", e)
+
+    def _run(self) -> None:
+        stopping = False
+        next_touch = time.monotonic() + self.touch_interval
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=max(0.0, next_touch - time.monotonic()))
+            except queue.Empty:
+                self._flush_touches()
+                next_touch = time.monotonic() + self.touch_interval
+                continue
+            batch, waiters = [], []
+            deadline = time.monotonic() + self.max_delay
+            while True:
+                if item is self._STOP:
+                    stopping = True
+                elif item[0] == 'flush':
+                    waiters.append(item[1])
+                else:
+                    batch.append(item)
+                # Flush/stop thì commit ngay, không chờ thêm
+                if stopping or waiters or len(batch) >= self.max_batch:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if stopping:
+                # Lấy nốt những gì còn trong hàng đợi trước khi dừng
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not self._STOP and item[0] == 'flush':
+                        waiters.append(item[1])
+                    elif item is not self._STOP:
+                        batch.append(item)
+
+            if batch:
+                self._write(batch)
+            if stopping or waiters or time.monotonic() >= next_touch:
+                self._flush_touches()
+                next_touch = time.monotonic() + self.touch_interval
+            for waiter in waiters:
+                waiter.set()
+
+    def _write(self, batch: List[Tuple]) -> None:
+        failed = 0
+        try:
+            self.db.write_batch(batch)
+        except sqlite3.Error:
+            # Ghi lại từng sự kiện để một sự kiện lỗi không làm mất cả lô
+            for event in batch:
+                try:
+                    self.db.write_batch([event])
+                except sqlite3.Error as e:
+                    failed += 1
+                    logger.warning("Bỏ qua sự kiện bookkeeping lỗi %r: %s", event, e)
+
+        with self._stats_lock:
+            self._stats['events'] += len(batch)
+            self._stats['batches'] += 1
+            self._stats['failed_events'] += failed
+            self._stats['last_batch_size'] = len(batch)
+            self._stats['max_batch_size'] = max(self._stats['max_batch_size'], len(batch))
+
+class SessionStore:
+    """
+    Kho trạng thái hội thoại theo chat.
+    
+    Thread-safe, giới hạn theo số phiên và dung lượng ước tính, loại bỏ
+    phiên ít dùng nhất (LRU) và phiên quá hạn (TTL). Có thể snapshot xuống
+    SQLite để khởi động lại không làm mất người dùng đang giữa chừng.
+    """
+
+    def __init__(self, max_sessions: int = 10000, ttl: float = 3600.0,
+                 max_bytes: int = 16 * 1024 * 1024, db: Optional[DatabaseManager] = None):
+        """
+        Args:
+            max_sessions: Số phiên tối đa được giữ trong bộ nhớ
+            ttl: Số giây không hoạt động trước khi phiên hết hạn
+            max_bytes: Dung lượng ước tính tối đa của toàn bộ phiên
+            db: DatabaseManager dùng cho snapshot (None để tắt)
+        """
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.db = db
+        # chat_id -> (trạng thái, thời điểm truy cập cuối, kích thước ước tính)
+        self._sessions: "OrderedDict[int, Tuple[dict, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0,
+                       'evicted_lru': 0, 'evicted_memory': 0}
+        self._snapshot_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @staticmethod
+    def _estimate_size(state: dict) -> int:
+        return sys.getsizeof(state) + sum(
+            sys.getsizeof(k) + sys.getsizeof(v) for k, v in state.items()
+        )
+
+    def _remove(self, chat_id: int) -> None:
+        _, _, size = self._sessions.pop(chat_id)
+        self._bytes -= size
+
+    def _expire(self, now: float) -> None:
+        # Phiên được sắp theo thời điểm truy cập nên phiên hết hạn nằm ở đầu
+        while self._sessions:
+            chat_id, (_, last_access, _) = next(iter(self._sessions.items()))
+            if now - last_access < self.ttl:
+                break
+            self._remove(chat_id)
+            self._stats['expired'] += 1
+
+    def _store(self, chat_id: int, state: dict, now: float) -> None:
+        if chat_id in self._sessions:
+            self._remove(chat_id)
+        size = self._estimate_size(state)
+        self._sessions[chat_id] = (state, now, size)
+        self._bytes += size
+        self._expire(now)
+        while len(self._sessions) > self.max_sessions:
+            self._remove(next(iter(self._sessions)))
+            self._stats['evicted_lru'] += 1
+        while self._bytes > self.max_bytes and len(self._sessions) > 1:
+            self._remove(next(iter(self._sessions)))
+            self._stats['evicted_memory'] += 1
+
+    def get(self, chat_id: int) -> dict:
+        """Lấy bản sao trạng thái của chat ({} nếu chưa có hoặc đã hết hạn)."""
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(chat_id)
+            if entry is None:
+                self._stats['misses'] += 1
+                return {}
+            state, last_access, size = entry
+            if now - last_access >= self.ttl:
+                self._remove(chat_id)
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return {}
+            self._sessions[chat_id] = (state, now, size)
+            self._sessions.move_to_end(chat_id)
+            self._stats['hits'] += 1
+            return dict(state)
+
+    def set(self, chat_id: int, state: dict) -> None:
+        """Thay toàn bộ trạng thái của chat."""
+        with self._lock:
+            self._store(chat_id, dict(state), time.time())
+
+    def update(self, chat_id: int, **fields) -> dict:
+        """
+        Cập nhật nguyên tử một số trường trong trạng thái của chat.
+        
+        Phiên không còn (hết hạn hoặc bị loại) thì không tạo lại từ vài trường
+        rời rạc: trả về {} và chat quay về bước nhập số.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(chat_id)
+            if entry is None or now - entry[1] >= self.ttl:
+                if entry is not None:
+                    self._remove(chat_id)
+                    self._stats['expired'] += 1
+                return {}
+            state = dict(entry[0])
+            state.update(fields)
+            self._store(chat_id, state, now)
+            return dict(state)
+
+    def reset(self, chat_id: int) -> None:
+        """Đưa chat về bước nhập số."""
+        self.set(chat_id, {'step': 'input_number'})
+
+    def stats(self) -> Dict[str, int]:
+        """Thống kê số phiên, dung lượng và số lần loại bỏ."""
+        with self._lock:
+            return dict(self._stats, sessions=len(self._sessions), bytes=self._bytes,
+                        max_sessions=self.max_sessions, max_bytes=self.max_bytes)
+
+    def snapshot(self) -> int:
+        """
+        Lưu các phiên đang giữa chừng xuống SQLite.
+        
+        Returns:
+            Số phiên đã lưu
+        """
+        if self.db is None:
+            return 0
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            rows = [(chat_id, json.dumps(state, ensure_ascii=False), last_access)
+                    for chat_id, (state, last_access, _) in self._sessions.items()
+                    if state.get('step', 'input_number') != 'input_number']
+        self.db.save_sessions(rows)
+        return len(rows)
+
+    def restore(self) -> int:
+        """
+        Nạp lại các phiên còn hạn từ snapshot.
+        
+        Returns:
+            Số phiên đã khôi phục
+        """
+        if self.db is None:
+            return 0
+        now = time.time()
+        restored = 0
+        with self._lock:
+            for chat_id, state_json, updated_at in sorted(self.db.load_sessions(),
+                                                          key=lambda row: row[2]):
+                if now - updated_at >= self.ttl:
+                    continue
+                state = json.loads(state_json)
+                if chat_id in self._sessions:
+                    self._remove(chat_id)
+                size = self._estimate_size(state)
+                self._sessions[chat_id] = (state, updated_at, size)
+                self._bytes += size
+                restored += 1
+            while len(self._sessions) > self.max_sessions:
+                self._remove(next(iter(self._sessions)))
+                self._stats['evicted_lru'] += 1
+        return restored
+
+    def start_autosnapshot(self, interval: float = 60.0) -> None:
+        """Chạy thread nền snapshot định kỳ."""
+        if self.db is None or self._snapshot_thread is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.snapshot()
+                except sqlite3.Error as e:
+                    logger.warning("Không lưu được snapshot phiên: %s", e)
+
+        self._snapshot_thread = threading.Thread(target=run, name='session-snapshot', daemon=True)
+        self._snapshot_thread.start()
+
+    def close(self) -> None:
+        """Dừng snapshot định kỳ và lưu snapshot cuối cùng."""
+        self._stop.set()
+        try:
+            self.snapshot()
+        except sqlite3.Error as e:
+            logger.warning("Không lưu được snapshot phiên: %s", e)
+
+
+
+# Kho kết quả nóng (WarmStartStore)
+_IEEE_HISTORY_RE = re.compile(r'(.+?) \(IEEE 754\) -> .*')
+_SIGNED_HISTORY_RE = re.compile(r'(\S+) \(base 10\) -> \S+ \((\d+)-bit signed binary\)')
+_BASE_HISTORY_RE = re.compile(r'(\S+) \(base (\d+)\) -> (?:\S+ \(base (\d+)\)|Tất cả các hệ)')
+
+
+def _history_inputs(text: str) -> List[Tuple[str, tuple]]:
+    """Suy ra các lời gọi converter (tên, tham số) từ một dòng conversion_text."""
+    match = _IEEE_HISTORY_RE.fullmatch(text)
+    if match:
+        return [('ieee754_to_decimal', (match.group(1),))]
+    match = _SIGNED_HISTORY_RE.fullmatch(text)
+    if match:
+        return [('convert_to_signed_binary', (match.group(1), int(match.group(2))))]
+    match = _BASE_HISTORY_RE.fullmatch(text)
+    if match:
+        num, from_base = match.group(1), int(match.group(2))
+        targets = [int(match.group(3))] if match.group(3) else [2, 8, 10, 16]
+        return [('convert_base', (num, from_base, to_base))
+                for to_base in targets if to_base != from_base]
+    num = text.split(' -> ', 1)[0]
+    for choice, base in FLOAT_BASE_CHOICES.items():
+        if text.endswith(f' ({choice})'):
+            return [('convert_float_to_binary', (num, FLOAT_PRECISION, base))]
+    for choice, bits in IEEE_CHOICES.items():
+        if text.endswith(f' ({choice})'):
+            return [('decimal_to_ieee754', (num, bits))]
+    return []
+
+
+# Loại chuyển đổi của các bảng usage_*
+USAGE_KINDS = ('base', 'signed', 'float', 'ieee')
+_CONVERTER_KINDS = {'convert_base': 'base', 'convert_to_signed_binary': 'signed',
+                    'convert_float_to_binary': 'float', 'decimal_to_ieee754': 'ieee',
+                    'ieee754_to_decimal': 'ieee'}
+
+
+# Dòng đổi hệ cơ số đã bị compact_history_text rút gọn mất cả phần " (base N) -> "
+# ở giữa: chỉ còn đầu của số vào, "…" và cuối của kết quả kèm hệ đích
+_COMPACTED_BASE_HISTORY_RE = re.compile(r'\S*…\S* \(base \d+\)')
+
+
+def conversion_kind(text: str) -> str:
+    """
+    Loại của một dòng conversion_text: một trong USAGE_KINDS hoặc 'other'.
+
+    Cho cùng kết quả với văn bản đầy đủ (lúc ghi) và văn bản đã rút gọn trong
+    conversion_history (lúc dựng lại usage_*).
+    """
+    if _BASE_HISTORY_RE.fullmatch(text) or _COMPACTED_BASE_HISTORY_RE.fullmatch(text):
+        # Kể cả đổi sang chính hệ nguồn (khi đó _history_inputs không trả lời gọi nào)
+        return 'base'
+    inputs = _history_inputs(text)
+    return _CONVERTER_KINDS[inputs[0][0]] if inputs else 'other'
+
+
+def _textbook_inputs() -> List[Tuple[str, tuple]]:
+    """Các đầu vào kinh điển luôn có trong kho: số âm 8 bit, byte hex, 0.1/0.5/3.14."""
+    inputs = [('convert_to_signed_binary', (f'-{value}', 8)) for value in range(1, 129)]
+    inputs += [('convert_base', (format(byte, '02X'), 16, to_base))
+               for byte in range(256) for to_base in (2, 8, 10)]
+    for num in ('0.1', '0.5', '3.14'):
+        inputs.append(('convert_float_to_binary', (num, FLOAT_PRECISION, 2)))
+        inputs += [('decimal_to_ieee754', (num, bits)) for bits in (32, 64)]
+    return inputs
+
+
+class WarmStartStore:
+    """
+    Kho kết quả chuyển đổi nóng lưu trong SQLite (bảng warm_conversions).
+    
+    Kho gồm các đầu vào xuất hiện nhiều nhất trong conversion_history cộng
+    với các đầu vào kinh điển. Khi khởi động, kết quả được nạp thẳng vào
+    ConversionCache mà không phải tính lại; thread nền định kỳ dựng lại kho
+    từ lịch sử mới.
+    """
+
+    def __init__(self, cache: ConversionCache, db: DatabaseManager,
+                 converters: Dict[str, Callable], max_entries: int = 2000,
+                 history_rows: int = 50000, min_count: int = 2):
+        """
+        Args:
+            cache: Cache được làm ấm
+            db: DatabaseManager chứa lịch sử và kho kết quả
+            converters: Tên converter -> hàm đã bọc bởi ConversionCache.cached
+            max_entries: Số mục tối đa của kho (0 để tắt)
+            history_rows: Số dòng lịch sử mới nhất dùng để đếm tần suất
+            min_count: Số lần xuất hiện tối thiểu để một đầu vào được đưa vào kho
+        """
+        self.cache = cache
+        self.db = db
+        self.converters = converters
+        self.max_entries = max_entries
+        self.history_rows = history_rows
+        self.min_count = min_count
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._stats = {'loaded': 0, 'refreshes': 0, 'stored': 0, 'skipped': 0,
+                       'last_refresh_seconds': 0.0}
+
+    def _canonical(self, name: str, args: tuple) -> tuple:
+        return tuple(self.converters[name].cache_canonical(*args))
+
+    def rank_inputs(self) -> List[Tuple[Tuple[str, tuple], int]]:
+        """Các đầu vào nên có trong kho kèm số lần dùng, nhiều nhất trước."""
+        counts: Counter = Counter()
+        for text, count in self.db.conversion_frequencies(self.history_rows):
+            for name, args in _history_inputs(text):
+                try:
+                    counts[(name, self._canonical(name, args))] += count
+                except (ValueError, TypeError):
+                    continue
+        ranked = [(key, count) for key, count in counts.most_common() if count >= self.min_count]
+        chosen = {key for key, _ in ranked}
+        for name, args in _textbook_inputs():
+            key = (name, self._canonical(name, args))
+            if key not in chosen:
+                chosen.add(key)
+                ranked.append((key, counts[key]))
+        return ranked[:self.max_entries]
+
+    def refresh(self) -> int:
+        """
+        Dựng lại kho từ lịch sử, lưu xuống SQLite và nạp vào cache.
+        
+        Returns:
+            Số mục đã lưu
+        """
+        if self.max_entries <= 0:
+            return 0
+        start = time.perf_counter()
+        rows, skipped = [], 0
+        for (name, args), hits in self.rank_inputs():
+            if len(str(args[0])) >= HEAVY_CONVERSION_DIGITS:
+                skipped += 1
+                continue
+            try:
+                value = self.converters[name].__wrapped__(*args)
+            except Exception:
+                # Lịch sử cũ có thể chứa đầu vào mà phiên bản hiện tại từ chối
+                skipped += 1
+                continue
+            rows.append((name, json.dumps(args, ensure_ascii=False),
+                         json.dumps(value, ensure_ascii=False), hits))
+        self.db.save_warm_conversions(rows)
+        self._stats['refreshes'] += 1
+        self._stats['stored'] = len(rows)
+        self._stats['skipped'] = skipped
+        self._stats['last_refresh_seconds'] = time.perf_counter() - start
+        self.load()
+        return len(rows)
+
+    def load(self) -> int:
+        """
+        Nạp kho vào cache, mục dùng nhiều nhất được nạp sau cùng (ít bị loại nhất).
+        
+        Returns:
+            Số mục đã nạp
+        """
+        if self.max_entries <= 0:
+            return 0
+        loaded = 0
+        for name, args_json, value_json, _, _ in reversed(self.db.load_warm_conversions(self.max_entries)):
+            func = self.converters.get(name)
+            if func is None:
+                continue
+            value = json.loads(value_json)
+            func.cache_store(tuple(value) if isinstance(value, list) else value, *json.loads(args_json))
+            loaded += 1
+        self._stats['loaded'] = loaded
+        return loaded
+
+    def _age(self) -> Optional[float]:
+        rows = self.db.load_warm_conversions(1)
+        return time.time() - rows[0][4] if rows else None
+
+    def start_refresh(self, interval: float = 3600.0) -> None:
+        """Chạy thread nền dựng lại kho định kỳ (ngay lập tức nếu kho trống hoặc đã cũ)."""
+        if self.max_entries <= 0 or self._thread is not None:
+            return
+
+        def run():
+            age = self._age()
+            wait = 0.0 if age is None else max(0.0, interval - age)
+            while not self._stop.wait(wait):
+                try:
+                    self.refresh()
+                except sqlite3.Error as e:
+                    logger.warning("Không dựng lại được kho kết quả nóng: %s", e)
+                wait = interval
+
+        self._thread = threading.Thread(target=run, name='warm-store-refresh', daemon=True)
+        self._thread.start()
+
+    def stats(self) -> Dict[str, float]:
+        return dict(self._stats)
+
+    def close(self) -> None:
+        """Dừng thread dựng lại kho."""
+        self._stop.set()
+
+
+
+class HistoryRetention:
+    """
+    Giữ conversion_history trong giới hạn, chạy ở thread nền ngoài luồng xử lý tin nhắn.
+    
+    Mỗi lượt xóa theo lô nhỏ, mỗi lô một transaction ngắn và nghỉ giữa các lô
+    để writer và handler không phải chờ lâu:
+    - dòng cũ hơn max_age_days;
+    - dòng vượt quá max_rows_per_user của mỗi người dùng (lượt đầu xét mọi
+      người dùng, các lượt sau chỉ xét người dùng có lịch sử mới);
+    - dòng đã bị /clear_history ẩn đi (history_floor).
+    Sau đó trả trang trống về hệ điều hành bằng incremental_vacuum, chạy
+    ANALYZE định kỳ và VACUUM khi tỉ lệ trang trống quá lớn (không sớm hơn
+    vacuum_interval kể từ lúc khởi động).
+    """
+
+    def __init__(self, db: DatabaseManager, max_rows_per_user: int = 1000,
+                 max_age_days: float = 365, batch_size: int = 500, pause: float = 0.05,
+                 analyze_interval: float = 86400.0, vacuum_interval: float = 7 * 86400.0,
+                 vacuum_ratio: float = 0.25, vacuum_pages: int = 1000):
+        """
+        Args:
+            db: DatabaseManager chứa lịch sử
+            max_rows_per_user: Số dòng lịch sử tối đa mỗi người dùng (0 để bỏ giới hạn)
+            max_age_days: Tuổi tối đa (ngày) của một dòng lịch sử (0 để bỏ giới hạn)
+            batch_size: Số dòng tối đa bị xóa trong một transaction
+            pause: Số giây nghỉ giữa hai lô
+            analyze_interval: Chu kỳ (giây) chạy ANALYZE
+            vacuum_interval: Khoảng cách tối thiểu (giây) giữa hai lần VACUUM
+            vacuum_ratio: Tỉ lệ trang trống từ đó VACUUM thay cho incremental_vacuum
+            vacuum_pages: Số trang tối đa trả lại mỗi lượt bằng incremental_vacuum
+        """
+        self.db = db
+        self.max_rows_per_user = max_rows_per_user
+        self.max_age_days = max_age_days
+        self.batch_size = batch_size
+        self.pause = pause
+        self.analyze_interval = analyze_interval
+        self.vacuum_interval = vacuum_interval
+        self.vacuum_ratio = vacuum_ratio
+        self.vacuum_pages = vacuum_pages
+        self._checked_all_users = False
+        self._last_analyze = 0.0
+        # Không VACUUM ngay lượt đầu: lệnh giữ khóa ghi suốt lúc dựng lại file
+        self._last_vacuum = time.time()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._stats = {'runs': 0, 'deleted_age': 0, 'deleted_cap': 0, 'deleted_cleared': 0,
+                       'analyzes': 0, 'vacuums': 0, 'last_run_seconds': 0.0}
+
+    def _drain(self, delete: Callable[[], int]) -> int:
+        """Gọi delete() đến khi một lô xóa ít hơn batch_size dòng (hoặc bị dừng)."""
+        total = 0
+        while not self._stop.is_set():
+            deleted = delete()
+            total += deleted
+            if deleted < self.batch_size:
+                break
+            self._stop.wait(self.pause)
+        return total
+
+    def _prune_by_age(self, cutoff: int) -> int:
+        """
+        Quét các cửa sổ batch_size dòng từ id nhỏ nhất; id tăng theo thời gian
+        ghi nên dừng ở cửa sổ đầu tiên không còn dòng nào quá hạn.
+        """
+        total, after_id = 0, 0
+        while not self._stop.is_set():
+            deleted, after_id = self.db.prune_history_before(cutoff, after_id, self.batch_size)
+            total += deleted
+            if not deleted or after_id is None:
+                break
+            self._stop.wait(self.pause)
+        return total
+
+    def prune(self) -> Dict[str, int]:
+        """Một lượt xóa theo tuổi, theo giới hạn mỗi người dùng và lịch sử đã ẩn."""
+        deleted = {'age': 0, 'cap': 0, 'cleared': 0}
+        if self.max_age_days > 0:
+            deleted['age'] = self._prune_by_age(int(time.time() - self.max_age_days * 86400))
+        
+        if self.max_rows_per_user > 0:
+            users = self.db.take_history_writers()
+            if not self._checked_all_users:
+                users.update(self.db.users_over_history_cap(self.max_rows_per_user))
+                self._checked_all_users = True
+            for user_id in users:
+                deleted['cap'] += self._drain(
+                    lambda: self.db.trim_user_history(user_id, self.max_rows_per_user, self.batch_size))
+        
+        for user_id, floor in self.db.cleared_history_users():
+            deleted['cleared'] += self._drain(
+                lambda: self.db.purge_cleared_history(user_id, floor, self.batch_size))
+
+        # Danh sách người dùng đã đếm chỉ cần cho hôm nay (và lô ghi trễ của hôm qua)
+        self.db.prune_usage_active(_usage_active_horizon())
+        return deleted
+
+    def maintain(self) -> None:
+        """Trả trang trống về hệ điều hành, ANALYZE/VACUUM khi đến hạn."""
+        now = time.time()
+        pages = self.db.page_stats()
+        free_ratio = pages['freelist_count'] / pages['page_count'] if pages['page_count'] else 0.0
+        # Database cũ (auto_vacuum khác 2 = INCREMENTAL) chuyển sang ở lần VACUUM
+        # đầu tiên, hoặc chủ động bằng `python main.py --vacuum`
+        if free_ratio >= self.vacuum_ratio and now - self._last_vacuum >= self.vacuum_interval:
+            self.db.vacuum()
+            self._last_vacuum = now
+            self._stats['vacuums'] += 1
+        elif pages['freelist_count']:
+            self.db.incremental_vacuum(self.vacuum_pages)
+        
+        if now - self._last_analyze >= self.analyze_interval:
+            self.db.analyze()
+            self._last_analyze = now
+            self._stats['analyzes'] += 1
+
+    def run_once(self) -> Dict[str, int]:
+        """Một lượt dọn lịch sử và bảo trì database."""
+        start = time.perf_counter()
+        deleted = self.prune()
+        if not self._stop.is_set():
+            self.maintain()
+        self._stats['runs'] += 1
+        for kind, count in deleted.items():
+            self._stats[f'deleted_{kind}'] += count
+        self._stats['last_run_seconds'] = time.perf_counter() - start
+        return deleted
+
+    def start(self, interval: float = 600.0) -> None:
+        """Chạy thread nền dọn lịch sử mỗi interval giây (lượt đầu chạy ngay)."""
+        if self._thread is not None:
+            return
+
+        def run():
+            wait = 0.0
+            while not self._stop.wait(wait):
+                try:
+                    self.run_once()
+                except sqlite3.Error as e:
+                    logger.warning("Không dọn được lịch sử chuyển đổi: %s", e)
+                wait = interval
+
+        self._thread = threading.Thread(target=run, name='history-retention', daemon=True)
+        self._thread.start()
+
+    def stats(self) -> Dict[str, float]:
+        return dict(self._stats)
+
+    def close(self) -> None:
+        """Dừng thread dọn lịch sử (lô đang chạy vẫn được commit)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(10)
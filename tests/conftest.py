@@ -0,0 +1,7 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# main.py đọc BOT_TOKEN khi tạo bot; các test không gọi mạng
+os.environ.setdefault('BOT_TOKEN', '123456:test')
@@ -0,0 +1,99 @@
+"""AsyncEngine: giới hạn gửi theo chat/toàn bot và gửi lại khi gặp 429."""
+import asyncio
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from telebot.asyncio_helper import ApiTelegramException
+
+from async_engine import AsyncEngine
+
+
+class FakeApi:
+    def __init__(self, rate_limited=0):
+        self.rate_limited = rate_limited
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if self.rate_limited:
+            self.rate_limited -= 1
+            raise ApiTelegramException('sendMessage', None, {
+                'error_code': 429, 'description': 'Too Many Requests',
+                'parameters': {'retry_after': 0.05}})
+        self.sent.append((chat_id, text, time.monotonic()))
+
+
+class EchoBot:
+    """Mỗi update gửi replies tin nhắn qua sender của thread hiện tại."""
+
+    threaded = True
+
+    def __init__(self, replies=1):
+        self.replies = replies
+        self.sender = None
+
+    def process_new_updates(self, updates):
+        for update in updates:
+            for i in range(self.replies):
+                self.sender.send_message(update.message.chat.id, f'{update.update_id}.{i}')
+
+
+def _engine(bot, api, **kwargs):
+    @contextmanager
+    def use_sender(sender):
+        bot.sender = sender
+        yield sender
+
+    return AsyncEngine(bot, use_sender, api=api, workers=2, **kwargs)
+
+
+def _update(update_id, chat_id):
+    return SimpleNamespace(update_id=update_id, message=SimpleNamespace(chat=SimpleNamespace(id=chat_id)))
+
+
+def _run(engine, updates):
+    async def main():
+        for update in updates:
+            await engine.handle_update(update)
+        await engine.join()
+
+    try:
+        asyncio.run(main())
+    finally:
+        engine.close()
+
+
+def test_rate_limited_message_is_resent_after_retry_after():
+    api = FakeApi(rate_limited=2)
+    engine = _engine(EchoBot(), api)
+    start = time.monotonic()
+    _run(engine, [_update(1, 10)])
+    assert [text for _, text, _ in api.sent] == ['1.0']
+    assert api.sent[0][2] - start >= 0.1
+    assert (engine.stats['sent'], engine.stats['rate_limited'], engine.stats['send_errors']) == (1, 2, 0)
+
+
+def test_gives_up_after_max_retries():
+    api = FakeApi(rate_limited=5)
+    engine = _engine(EchoBot(), api, max_retries=1)
+    _run(engine, [_update(1, 10)])
+    assert api.sent == []
+    assert engine.stats['send_errors'] == 1
+
+
+def test_sends_respect_chat_and_global_rates():
+    api = FakeApi()
+    engine = _engine(EchoBot(replies=3), api, chat_rate=20, chat_burst=1,
+                     global_rate=1000, global_burst=100)
+    _run(engine, [_update(1, 10), _update(2, 11)])
+    for chat_id in (10, 11):
+        times = [when for chat, _, when in api.sent if chat == chat_id]
+        # 3 tin, bucket 1 token với 20 tin/giây: ít nhất 2 khoảng 50 ms
+        assert len(times) == 3 and times[-1] - times[0] >= 0.09
+    assert [text for chat, text, _ in api.sent if chat == 10] == ['1.0', '1.1', '1.2']
+
+    api = FakeApi()
+    engine = _engine(EchoBot(), api, global_rate=20, global_burst=1)
+    _run(engine, [_update(i, 100 + i) for i in range(4)])
+    times = sorted(when for _, _, when in api.sent)
+    assert len(times) == 4 and times[-1] - times[0] >= 0.14
@@ -0,0 +1,272 @@
+"""Round-trip và trường hợp biên của các converter (so với int/struct của Python), cache dùng chung."""
+import random
+import re
+import struct
+import sys
+from decimal import Decimal
+from fractions import Fraction
+
+import pytest
+
+from converters import (_DC_BITS, _DC_DECIMAL_DIGITS, IEEE_FORMATS, ConversionCache, _canonical_digits,
+                        _decimal_str_to_int, _encode_fraction, _int_to_decimal_str, conversion_cache,
+                        convert_base_result, convert_float_to_binary, decimal_to_ieee754, decode_ieee754,
+                        encode_ieee754, ieee754_to_decimal, is_ieee754_binary)
+
+STRUCT_FORMATS = {16: ('>e', '>H'), 32: ('>f', '>I'), 64: ('>d', '>Q')}
+RANDOM_VALUES = 20000
+
+
+@pytest.fixture
+def unlimited_int_str():
+    """Bỏ giới hạn số chữ số của int()/str() để làm đáp án."""
+    limit = sys.get_int_max_str_digits()
+    sys.set_int_max_str_digits(0)
+    yield
+    sys.set_int_max_str_digits(limit)
+
+
+@pytest.mark.parametrize('digits', [1, 19, _DC_DECIMAL_DIGITS, _DC_DECIMAL_DIGITS + 1,
+                                    3 * _DC_DECIMAL_DIGITS + 7, 20000])
+def test_decimal_string_round_trip(digits, unlimited_int_str):
+    rng = random.Random(digits)
+    text = str(rng.randint(1, 9)) + ''.join(rng.choice('0123456789') for _ in range(digits - 1))
+    value = _decimal_str_to_int(text)
+    assert value == int(text)
+    assert _int_to_decimal_str(value) == text
+
+
+@pytest.mark.parametrize('bits', [1, 64, _DC_BITS, _DC_BITS + 1, 5 * _DC_BITS + 3, 100000])
+def test_int_to_decimal_matches_str(bits, unlimited_int_str):
+    value = random.Random(bits).getrandbits(bits) | 1 << (bits - 1)
+    text = _int_to_decimal_str(value)
+    assert text == str(value)
+    assert _decimal_str_to_int(text) == value
+
+
+def test_leading_zeros_and_powers_of_ten(unlimited_int_str):
+    assert _decimal_str_to_int('0' * 5000 + '42') == 42
+    for exponent in (_DC_DECIMAL_DIGITS, 4 * _DC_DECIMAL_DIGITS):
+        assert _decimal_str_to_int('1' + '0' * exponent) == 10 ** exponent
+        assert _int_to_decimal_str(10 ** exponent - 1) == '9' * exponent
+
+
+@pytest.mark.parametrize('text', ['', '12a', '-5', '１２'])
+def test_invalid_decimal_string(text):
+    with pytest.raises(ValueError):
+        _decimal_str_to_int(text)
+
+
+def test_large_base_round_trip():
+    value = random.Random(7).getrandbits(3 * _DC_BITS)
+    binary = format(value, 'b')
+    decimal = convert_base_result(binary, 2, 10)
+    assert _decimal_str_to_int(decimal) == value
+    for base in (8, 16):
+        other = convert_base_result(decimal, 10, base)
+        assert int(other, base) == value
+        assert convert_base_result(other, base, 2) == binary
+
+
+def _pattern(value, bits):
+    """Mẫu bit của float Python làm tròn về định dạng `bits` bằng struct (tràn thì ±inf)."""
+    float_format, uint_format = STRUCT_FORMATS[bits]
+    try:
+        packed = struct.pack(float_format, value)
+    except OverflowError:
+        packed = struct.pack(float_format, float('inf') if value > 0 else float('-inf'))
+    return struct.unpack(uint_format, packed)[0]
+
+
+@pytest.mark.parametrize('bits', [16, 32, 64])
+def test_ieee754_random_patterns_match_struct(bits):
+    """Mọi mẫu bit hữu hạn: giải mã đúng giá trị của struct, mã hóa lại ra đúng mẫu."""
+    float_format, uint_format = STRUCT_FORMATS[bits]
+    rng = random.Random(bits)
+    checked = 0
+    while checked < RANDOM_VALUES:
+        pattern = rng.getrandbits(bits)
+        value = struct.unpack(float_format, struct.pack(uint_format, pattern))[0]
+        if value != value or value in (float('inf'), float('-inf')):
+            continue
+        checked += 1
+        assert decode_ieee754(pattern, bits) == Fraction(value)
+        assert encode_ieee754(value, bits) == pattern
+        # Đường phân số (không qua struct) cũng phải ra đúng mẫu
+        sign = pattern >> (bits - 1)
+        biased, fraction = _encode_fraction(abs(Fraction(value)), bits)
+        mantissa_bits = IEEE_FORMATS[bits][1]
+        assert (sign << (bits - 1)) | (biased << mantissa_bits) | fraction == pattern
+
+
+@pytest.mark.parametrize('bits', [16, 32])
+def test_ieee754_rounding_matches_struct(bits):
+    """Làm tròn một lần từ giá trị thập phân chính xác của double, kể cả tràn và subnormal."""
+    rng = random.Random(bits)
+    for _ in range(RANDOM_VALUES):
+        value = rng.uniform(-1, 1) * 2.0 ** rng.randint(-160, 140)
+        assert encode_ieee754(str(Decimal(value)), bits) == _pattern(value, bits)
+
+
+def test_ieee754_128_round_trip(unlimited_int_str):
+    rng = random.Random(128)
+    exp_bits, mantissa_bits, _ = IEEE_FORMATS[128]
+    checked = 0
+    while checked < RANDOM_VALUES:
+        pattern = rng.getrandbits(128)
+        biased = pattern >> mantissa_bits & ((1 << exp_bits) - 1)
+        if biased == (1 << exp_bits) - 1 or pattern & ((1 << 127) - 1) == 0:
+            continue
+        checked += 1
+        value = decode_ieee754(pattern, 128)
+        biased, fraction = _encode_fraction(abs(value), 128)
+        assert (pattern >> 127) << 127 | biased << mantissa_bits | fraction == pattern
+        if checked % 100 == 0:
+            assert encode_ieee754(str(value), 128) == pattern
+    # Mọi double biểu diễn chính xác được trong 128 bit
+    for _ in range(1000):
+        value = struct.unpack('>d', struct.pack('>Q', rng.getrandbits(64)))[0]
+        if value == value and abs(value) != float('inf'):
+            assert decode_ieee754(encode_ieee754(value, 128), 128) == Fraction(value)
+
+
+@pytest.mark.parametrize('bits', sorted(IEEE_FORMATS))
+def test_ieee754_edge_cases(bits, unlimited_int_str):
+    exp_bits, mantissa_bits, bias = IEEE_FORMATS[bits]
+    sign_bit = 1 << (bits - 1)
+    inf = ((1 << exp_bits) - 1) << mantissa_bits
+    smallest = Fraction(1, 2 ** (bias - 1 + mantissa_bits))
+    largest = (2 - Fraction(1, 2 ** mantissa_bits)) * Fraction(2) ** bias
+
+    # -0 giữ bit dấu
+    assert encode_ieee754(-0.0, bits) == sign_bit
+    assert encode_ieee754('-0', bits) == sign_bit
+    assert ieee754_to_decimal(format(sign_bit, f'0{bits}b'))[0] == 0.0
+    # Subnormal nhỏ nhất, nửa của nó làm tròn về 0 (half-to-even), 3/4 lên subnormal
+    assert decode_ieee754(1, bits) == smallest
+    assert encode_ieee754(str(smallest), bits) == 1
+    assert encode_ieee754(str(smallest / 2), bits) == 0
+    assert encode_ieee754(str(smallest * 3 / 4), bits) == 1
+    # Subnormal lớn nhất và số chuẩn nhỏ nhất
+    assert encode_ieee754(str(smallest * ((1 << mantissa_bits) - 1)), bits) == (1 << mantissa_bits) - 1
+    assert encode_ieee754(str(smallest * (1 << mantissa_bits)), bits) == 1 << mantissa_bits
+    # Số lớn nhất; vượt quá nửa ulp thì tràn thành ±inf
+    assert decode_ieee754(inf - 1, bits) == largest
+    ulp = Fraction(2) ** (bias - mantissa_bits)
+    assert encode_ieee754(str(largest + ulp / 4), bits) == inf - 1
+    assert encode_ieee754(str(largest + ulp / 2), bits) == inf
+    assert encode_ieee754('-' + str(largest * 2), bits) == sign_bit | inf
+    assert encode_ieee754('inf', bits) == inf
+    assert decode_ieee754(sign_bit | inf, bits) == float('-inf')
+    nan = encode_ieee754('nan', bits)
+    assert nan & inf == inf and nan & ((1 << mantissa_bits) - 1)
+    assert decode_ieee754(nan, bits) != decode_ieee754(nan, bits)
+
+
+def test_ieee754_autodetect_lengths():
+    assert is_ieee754_binary('0' * 32) == (True, 32)
+    assert is_ieee754_binary('1' * 64) == (True, 64)
+    assert is_ieee754_binary('0' + '1' * 127) == (True, 128)
+    # Chuỗi 16 bit chỉ giải mã khi người dùng chọn rõ
+    assert is_ieee754_binary('0' * 16) == (False, 0)
+    assert is_ieee754_binary('2' * 32) == (False, 0)
+    assert ieee754_to_decimal('0011110000000000')[0] == 1.0
+    assert ieee754_to_decimal('00' + '1' * 14 + '0' * 112)[0] == 1.0
+
+
+_EXPANSION_RE = re.compile(r'([+-])([0-9A-F]+)(?:\.([0-9A-F]*)(?:\(([0-9A-F]+)\))?)?$')
+
+
+def _expansion_value(result, base):
+    """Đọc lại kết quả dạng '+1.0(011)' thành phân số chính xác."""
+    sign, whole, prefix, cycle = _EXPANSION_RE.match(result).groups()
+    prefix = prefix or ''
+    value = Fraction(int(whole, base))
+    if prefix:
+        value += Fraction(int(prefix, base), base ** len(prefix))
+    if cycle:
+        value += Fraction(int(cycle, base), base ** len(prefix) * (base ** len(cycle) - 1))
+    return -value if sign == '-' else value
+
+
+@pytest.mark.parametrize('text, base, expected', [
+    ('0.1', 2, '+0.0(0011)'),
+    ('0.5', 2, '+0.1'),
+    ('-3.75', 2, '-11.11'),
+    ('0.1', 16, '+0.1(9)'),
+    ('1/3', 8, '+0.(25)'),
+    ('0.2', 8, '+0.(1463)'),
+    ('255.0625', 16, '+FF.1'),
+])
+def test_fraction_expansion_examples(text, base, expected):
+    assert convert_float_to_binary(text, base=base)[0] == expected
+
+
+@pytest.mark.parametrize('base', [2, 8, 16])
+def test_fraction_expansion_round_trip(base):
+    """Phần trước chu kỳ và chu kỳ tìm được phải cho lại đúng phân số, chu kỳ ngắn nhất."""
+    rng = random.Random(base)
+    for _ in range(300):
+        denominator = rng.randint(2, 2000)
+        value = Fraction(rng.randint(-10 ** 6, 10 ** 6), denominator)
+        if value == 0:
+            continue
+        result = convert_float_to_binary(f'{value.numerator}/{value.denominator}', 4000, base)[0]
+        assert '…' not in result
+        assert _expansion_value(result, base) == value
+        cycle = _EXPANSION_RE.match(result).group(4)
+        if cycle:
+            assert all(cycle != cycle[:n] * (len(cycle) // n)
+                       for n in range(1, len(cycle)) if len(cycle) % n == 0)
+
+
+def test_fraction_expansion_truncates_at_precision():
+    assert convert_float_to_binary('1/997', 10)[0] == '+0.0000000001…'
+    assert convert_float_to_binary('2.5', 0)[0] == '+10'
+
+
+def test_cache_shares_entries_for_equivalent_inputs():
+    cache = ConversionCache()
+    calls = []
+
+    @cache.cached('digits', _canonical_digits)
+    def convert(num_str, from_base, to_base):
+        calls.append(num_str)
+        return int(num_str, from_base)
+
+    assert convert('ff', 16, 2) == convert('00FF', 16, 2) == convert(' FF ', 16, 2) == 255
+    assert calls == ['FF']
+    assert convert('0', 16, 2) == convert('000', 16, 2) == 0
+    stats = cache.stats()['digits']
+    assert (stats['hits'], stats['misses'], stats['entries']) == (3, 2, 2)
+
+
+def test_cache_keeps_signed_zero_apart():
+    conversion_cache.clear()
+    negative = decimal_to_ieee754(-0.0, 32)[0]
+    positive = decimal_to_ieee754(0.0, 32)[0]
+    assert negative == '1' + '0' * 31 and positive == '0' * 32
+    assert decimal_to_ieee754('-0', 32)[0] == negative
+    assert decimal_to_ieee754('+0.000', 32)[0] == positive
+    assert conversion_cache.stats()['decimal_to_ieee754']['entries'] == 4
+    # Chuỗi tương đương thì dùng chung mục
+    assert convert_base_result('ff', 16, 10) == convert_base_result('00FF', 16, 10) == '255'
+    assert conversion_cache.stats()['convert_base']['entries'] == 1
+
+
+def test_cache_is_bounded_by_bytes():
+    cache = ConversionCache(max_bytes=20_000, max_entry_bytes=5_000)
+    for i in range(200):
+        cache.put('x', i, 'v' * 100)
+    total = cache.stats()['_total']
+    assert total['bytes'] <= 20_000 and 0 < total['entries'] < 200
+    assert cache.stats()['x']['evictions'] == 200 - total['entries']
+    # Mục cũ nhất bị loại trước, mục vừa dùng được giữ
+    assert cache.get('x', 0) == (False, None)
+    assert cache.get('x', 199)[0]
+    # Mục quá lớn không được lưu
+    cache.put('x', 'big', 'v' * 10_000)
+    assert cache.get('x', 'big') == (False, None)
+    assert cache.stats()['x']['skipped'] == 1
+    cache.resize(max_bytes=1_000)
+    assert cache.stats()['_total']['bytes'] <= 1_000
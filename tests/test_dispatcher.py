@@ -0,0 +1,69 @@
+"""ChatDispatcher: thứ tự update theo chat và offset của polling."""
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+from dispatcher import ChatDispatcher, chat_id_of
+
+
+class RecordingBot:
+    def __init__(self):
+        self.last_update_id = 0
+        self.threaded = True
+        self.processed = []
+        self.lock = threading.Lock()
+
+    def process_new_updates(self, updates):
+        for update in updates:
+            # Độ trễ ngẫu nhiên để các worker chạy xen kẽ nhau
+            time.sleep(random.random() * 0.002)
+            with self.lock:
+                self.processed.append((chat_id_of(update), update.update_id,
+                                       threading.current_thread().name))
+
+
+def _message(update_id, chat_id):
+    return SimpleNamespace(update_id=update_id, message=SimpleNamespace(chat=SimpleNamespace(id=chat_id)))
+
+
+def test_updates_of_one_chat_stay_in_order():
+    bot = RecordingBot()
+    dispatcher = ChatDispatcher(bot, workers=4).start()
+    try:
+        rng = random.Random(1)
+        updates = [_message(i, rng.randrange(20)) for i in range(500)]
+        for start in range(0, len(updates), 37):
+            bot.process_new_updates(updates[start:start + 37])
+    finally:
+        dispatcher.stop()
+    assert bot.threaded is False
+    assert len(bot.processed) == 500
+    by_chat = {}
+    for chat_id, update_id, thread in bot.processed:
+        by_chat.setdefault(chat_id, []).append((update_id, thread))
+    for items in by_chat.values():
+        assert [update_id for update_id, _ in items] == sorted(update_id for update_id, _ in items)
+        # Mỗi chat luôn do cùng một worker xử lý
+        assert len({thread for _, thread in items}) == 1
+    assert dispatcher.stats()['processed'] == 500
+
+
+def test_dispatch_advances_polling_offset():
+    bot = RecordingBot()
+    dispatcher = ChatDispatcher(bot, workers=2).start()
+    try:
+        bot.process_new_updates([_message(7, 1), _message(9, 2), _message(8, 1)])
+        # Offset tăng ngay khi nhận, không chờ worker xử lý xong
+        assert bot.last_update_id == 9
+        bot.process_new_updates([_message(5, 3)])
+        assert bot.last_update_id == 9
+    finally:
+        dispatcher.stop()
+    assert len(bot.processed) == 4
+
+
+def test_inline_queries_are_sharded_by_user():
+    query = SimpleNamespace(update_id=1, inline_query=SimpleNamespace(from_user=SimpleNamespace(id=42)))
+    assert chat_id_of(query) == 42
+    assert chat_id_of(SimpleNamespace(update_id=2)) is None
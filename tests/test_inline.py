@@ -0,0 +1,72 @@
+"""InlineDebouncer: chỉ trả lời query cuối cùng của mỗi người dùng."""
+import threading
+import time
+from types import SimpleNamespace
+
+from inline import InlineDebouncer
+
+
+def _query(user_id, text):
+    return SimpleNamespace(id=f'{user_id}:{text}', query=text, from_user=SimpleNamespace(id=user_id))
+
+
+class Recorder:
+    def __init__(self):
+        self.answered = []
+        self.done = threading.Event()
+        self.expected = 0
+
+    def __call__(self, query):
+        self.answered.append(query.query)
+        if len(self.answered) >= self.expected:
+            self.done.set()
+
+
+def test_only_latest_query_is_answered():
+    answer = Recorder()
+    answer.expected = 2
+    debouncer = InlineDebouncer(answer, delay=0.1)
+    try:
+        for text in ('1', '12', '123', '1234'):
+            debouncer.submit(1, _query(1, text))
+            debouncer.submit(2, _query(2, 'x' + text))
+            time.sleep(0.02)
+        assert answer.done.wait(2)
+        time.sleep(0.2)
+        assert sorted(answer.answered) == ['1234', 'x1234']
+        stats = debouncer.stats()
+        assert (stats['submitted'], stats['superseded'], stats['answered'], stats['pending']) == (8, 6, 2, 0)
+    finally:
+        debouncer.close()
+
+
+def test_query_waits_until_typing_stops():
+    answer = Recorder()
+    answer.expected = 1
+    debouncer = InlineDebouncer(answer, delay=0.15)
+    try:
+        start = time.monotonic()
+        for text in ('F', 'FF', 'FFF'):
+            debouncer.submit(1, _query(1, text))
+            time.sleep(0.1)
+        # Mỗi phím lùi hạn thêm delay: chưa trả lời khi còn đang gõ
+        assert answer.answered == []
+        assert answer.done.wait(2)
+        assert time.monotonic() - start >= 0.2 + 0.15
+        assert answer.answered == ['FFF']
+    finally:
+        debouncer.close()
+
+
+def test_close_answers_pending_and_overflow_is_answered_at_once():
+    answer = Recorder()
+    answer.expected = 1
+    debouncer = InlineDebouncer(answer, delay=60, max_pending=1)
+    debouncer.submit(1, _query(1, 'a'))
+    # Quá max_pending người dùng chờ: trả lời ngay thay vì giữ lại
+    debouncer.submit(2, _query(2, 'b'))
+    assert answer.done.wait(2) and answer.answered == ['b']
+    debouncer.close()
+    assert answer.answered == ['b', 'a']
+    debouncer.submit(3, _query(3, 'c'))
+    assert debouncer.stats()['submitted'] == 2
@@ -0,0 +1,77 @@
+"""Máy trạng thái hội thoại của main.py (sender, database và hàng đợi ghi giả)."""
+from types import SimpleNamespace
+
+import pytest
+
+import main
+from storage import SessionStore
+
+
+class RecordingSender:
+    def __init__(self):
+        self.replies = []
+
+    def reply_to(self, message, text, **kwargs):
+        self.replies.append(text)
+
+    def send_message(self, chat_id, text, **kwargs):
+        self.replies.append(text)
+
+
+@pytest.fixture
+def bot(monkeypatch):
+    store = SessionStore()
+    recorded = []
+    monkeypatch.setattr(main, 'sessions', store)
+    monkeypatch.setattr(main, 'db', SimpleNamespace(update_user_data=lambda user: None))
+    monkeypatch.setattr(main, 'writer', SimpleNamespace(
+        record_conversion=lambda user_id, text: recorded.append(text)))
+    sender = RecordingSender()
+
+    def send(text):
+        message = SimpleNamespace(chat=SimpleNamespace(id=1), text=text,
+                                  from_user=SimpleNamespace(id=1))
+        with main.use_sender(sender):
+            main.handle_conversion(message)
+        return sender.replies[-1]
+
+    return SimpleNamespace(send=send, sessions=store, recorded=recorded)
+
+
+def test_base_conversion_flow(bot):
+    bot.send('255')
+    bot.send('10')
+    bot.send('Chuyển đổi sang hệ khác')
+    assert bot.send('16').startswith('Kết quả: FF')
+    assert bot.recorded == ['255 (base 10) -> FF (base 16)']
+    assert bot.sessions.get(1) == {'step': 'input_number'}
+
+
+@pytest.mark.parametrize('state', [
+    {'step': 'choose_input_base'},
+    {'step': 'choose_conversion', 'number': '255'},
+    {'step': 'input_to_base', 'from_base': 10},
+    {'step': 'choose_bit_length'},
+    {'step': 'choose_float_conversion'},
+])
+def test_incomplete_session_asks_for_the_number_again(bot, state):
+    bot.sessions.set(1, state)
+    assert bot.send('16') == main.SESSION_LOST_MESSAGE
+    assert bot.sessions.get(1) == {'step': 'input_number'}
+    assert bot.recorded == []
+
+
+def test_session_evicted_mid_step_keeps_the_state_read_once(bot, monkeypatch):
+    bot.send('255')
+    get = bot.sessions.get
+
+    def get_then_evict(chat_id):
+        # Phiên bị loại ngay sau lần đọc của handle_conversion
+        state = get(chat_id)
+        bot.sessions._remove(chat_id)
+        return state
+
+    monkeypatch.setattr(bot.sessions, 'get', get_then_evict)
+    bot.send('10')
+    monkeypatch.setattr(bot.sessions, 'get', get)
+    assert bot.sessions.get(1) == {'step': 'choose_conversion', 'number': '255', 'from_base': 10}
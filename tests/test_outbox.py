@@ -0,0 +1,65 @@
+"""Outbox: chỉ gửi lại khi chắc chắn tin chưa tới Telegram, đóng tệp khi gửi xong."""
+import io
+
+import pytest
+import requests
+
+from outbox import Outbox
+
+
+class FlakyBot:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def send_message(self, chat_id, text, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+
+    def send_document(self, chat_id, document, **kwargs):
+        # Lần gửi lại phải đọc được tệp từ đầu
+        assert document.read() == b'data'
+        self.send_message(chat_id, None)
+
+
+def _send_once(errors):
+    bot = FlakyBot(errors)
+    outbox = Outbox(bot).start()
+    try:
+        outbox.send_message(1, 'x')
+        assert outbox.flush(10)
+        return bot.calls, outbox.stats()
+    finally:
+        outbox.close()
+
+
+def test_connection_error_is_retried():
+    calls, stats = _send_once([requests.exceptions.ConnectionError()])
+    assert calls == 2
+    assert (stats['sent'], stats['failed'], stats['retried']) == (1, 0, 1)
+
+
+@pytest.mark.parametrize('error', [requests.exceptions.ReadTimeout(), ValueError()])
+def test_ambiguous_errors_are_not_resent(error):
+    calls, stats = _send_once([error])
+    assert calls == 1
+    assert (stats['sent'], stats['failed'], stats['retried']) == (0, 1, 0)
+
+
+@pytest.mark.parametrize('errors, sent', [
+    ([], 1),
+    ([requests.exceptions.ConnectionError()], 1),
+    ([requests.exceptions.ReadTimeout()], 0),
+])
+def test_document_is_closed_once_done(errors, sent):
+    bot = FlakyBot(errors)
+    outbox = Outbox(bot).start()
+    document = io.BytesIO(b'data')
+    try:
+        outbox.send_document(1, document)
+        assert outbox.flush(10)
+        assert outbox.stats()['sent'] == sent
+        assert document.closed
+    finally:
+        outbox.close()
@@ -0,0 +1,401 @@
+"""Pool connection, hàng đợi ghi, cache hồ sơ, schema, migration và bảo trì database (trên database tạm)."""
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from converters import convert_base_result
+from storage import (SCHEMA_VERSION, USAGE_ACTIVE_DAYS, DatabaseManager, UserProfileCache,
+                     SessionStore, WriteBehindQueue, _usage_day, compact_history_text,
+                     conversion_kind)
+
+# Schema của bản đầu tiên (trước user_version): thời gian lưu dạng chuỗi giờ địa phương
+BASELINE_SCHEMA = '''
+CREATE TABLE users (
+    id_tele INTEGER PRIMARY KEY,
+    hoten TEXT NOT NULL,
+    username TEXT,
+    last_time_using TEXT NOT NULL,
+    convert_all INTEGER DEFAULT 0
+);
+CREATE INDEX idx_username ON users(username);
+CREATE TABLE conversion_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_tele INTEGER NOT NULL,
+    conversion_text TEXT NOT NULL,
+    conversion_time TEXT NOT NULL,
+    FOREIGN KEY (id_tele) REFERENCES users (id_tele) ON DELETE CASCADE
+);
+CREATE INDEX idx_conversion_history ON conversion_history(id_tele, conversion_time DESC);
+'''
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'bot.db')
+
+
+def _in_thread(func):
+    """Chạy func trong thread mới (thread kết thúc ngay sau đó), trả về kết quả."""
+    result = []
+
+    def run():
+        try:
+            result.append((True, func()))
+        except Exception as exc:
+            result.append((False, exc))
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join()
+    ok, value = result[0]
+    if not ok:
+        raise value
+    return value
+
+
+def test_pool_reuses_one_connection_per_thread(db_path):
+    db = DatabaseManager(db_path, max_connections=4)
+    try:
+        with db.get_connection() as first:
+            pass
+        with db.get_connection() as second:
+            assert second is first
+        stats = db.pool_stats()
+        assert stats['active'] == 1
+        assert stats['opened'] == 1  # initialize_db đã mở connection của thread này
+        assert stats['reused'] >= 1
+    finally:
+        db.close()
+
+
+def test_pool_cap_and_reaping_dead_threads(db_path):
+    db = DatabaseManager(db_path, max_connections=2, acquire_timeout=0.2)
+    try:
+        db.get_user_history(1)
+        release = threading.Event()
+        holding = threading.Event()
+
+        def hold():
+            db.get_user_history(1)
+            holding.set()
+            release.wait()
+
+        holder = threading.Thread(target=hold, daemon=True)
+        holder.start()
+        holding.wait(5)
+        try:
+            # Hai slot đều do thread còn sống giữ: thread thứ ba chờ rồi báo lỗi
+            with pytest.raises(sqlite3.OperationalError):
+                _in_thread(lambda: db.get_user_history(1))
+        finally:
+            release.set()
+            holder.join()
+        # Thread đã kết thúc được dọn để trả slot
+        assert _in_thread(lambda: db.get_user_history(1)) == (0, [])
+        assert db.pool_stats()['reaped'] >= 1
+    finally:
+        db.close()
+
+
+def test_pool_is_sized_for_update_workers(tmp_path, monkeypatch):
+    import main
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, '_update_workers', 8)
+    main.configure_workers(20)
+    db = main._create_db()
+    try:
+        assert db.max_connections == 20 + main.DB_BACKGROUND_CONNECTIONS
+    finally:
+        db.close()
+
+
+def test_fresh_database_uses_incremental_auto_vacuum(db_path):
+    db = DatabaseManager(db_path)
+    try:
+        assert db.page_stats()['auto_vacuum'] == 2
+    finally:
+        db.close()
+
+
+def test_baseline_database_migrates_to_current_schema(db_path):
+    when = '2024-03-01 12:30:00'
+    conn = sqlite3.connect(db_path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.execute("INSERT INTO users VALUES (1, 'A', 'a', ?, 3)", (when,))
+    conn.executemany(
+        'INSERT INTO conversion_history (id_tele, conversion_text, conversion_time) VALUES (1, ?, ?)',
+        [('FF (base 16) -> 11111111 (base 2)', when),
+         ('12 (base 10) -> 1100 (base 2)', when),
+         ('7 (base 10) -> 111 (base 2)', when)])
+    conn.commit()
+    conn.close()
+
+    db = DatabaseManager(db_path)
+    try:
+        with db.get_connection() as conn:
+            assert conn.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION == 3
+            types = {row[1]: row[2] for row in conn.execute('PRAGMA table_info(conversion_history)')}
+            assert types['conversion_time'].upper() == 'INTEGER'
+            assert 'history_floor' in {row[1] for row in conn.execute('PRAGMA table_info(users)')}
+            indexes = {row[1] for row in conn.execute('PRAGMA index_list(conversion_history)')}
+            assert 'idx_conversion_history' not in indexes
+            assert 'idx_conversion_history_user' in indexes
+            epochs = {row[0] for row in conn.execute('SELECT conversion_time FROM conversion_history')}
+        assert epochs == {int(time.mktime(time.strptime(when, '%Y-%m-%d %H:%M:%S')))}
+
+        total, history = db.get_user_history(1)
+        assert total == 3
+        assert history[0] == '7 (base 10) -> 111 (base 2)'
+        assert sum(db.usage_summary()['totals'].values()) == 3
+    finally:
+        db.close()
+
+    # Mở lại không chạy migration lần nữa
+    db = DatabaseManager(db_path)
+    try:
+        assert db.get_user_history(1)[0] == 3
+    finally:
+        db.close()
+
+
+def _user(user_id, first_name='A', username=None):
+    return SimpleNamespace(id=user_id, first_name=first_name, last_name=None, username=username)
+
+
+def _add_user(db, user_id):
+    db.update_user_data(_user(user_id))
+
+
+def _history_count(db, user_id):
+    with db.get_connection() as conn:
+        return conn.execute('SELECT COUNT(*) FROM conversion_history WHERE id_tele = ?',
+                            (user_id,)).fetchone()[0]
+
+
+def _last_time_using(db, user_id):
+    with db.get_connection() as conn:
+        return conn.execute('SELECT hoten, username, last_time_using FROM users WHERE id_tele = ?',
+                            (user_id,)).fetchone()
+
+
+def test_unchanged_profile_skips_upsert_until_touch_flush(db_path):
+    db = DatabaseManager(db_path)
+    try:
+        db.update_user_data(_user(1, username='a'))
+        with db.get_connection() as conn:
+            conn.execute("UPDATE users SET last_time_using = '2000-01-01 00:00:00'")
+            conn.commit()
+        # Hồ sơ không đổi: chỉ gom last_time_using, không ghi
+        db.update_user_data(_user(1, username='a'))
+        assert _last_time_using(db, 1)[2] == '2000-01-01 00:00:00'
+        assert db.profiles.stats()['hits'] == 1
+        assert db.flush_user_touches() == 1
+        assert _last_time_using(db, 1)[2] > '2000'
+        assert db.flush_user_touches() == 0
+        # Đổi username: upsert ngay và bỏ touch đang chờ
+        db.update_user_data(_user(1, username='a'))
+        db.update_user_data(_user(1, username='b'))
+        assert _last_time_using(db, 1)[1] == 'b'
+        assert db.flush_user_touches() == 0
+    finally:
+        db.close()
+
+
+def test_profile_cache_is_bounded():
+    cache = UserProfileCache(max_users=2)
+    for user_id in (1, 2):
+        cache.put(user_id, ('A', None))
+    assert cache.matches(1, ('A', None))
+    cache.put(3, ('A', None))
+    # 2 ít dùng nhất nên bị loại, 1 vừa được dùng nên còn
+    assert not cache.matches(2, ('A', None))
+    assert cache.matches(1, ('A', None))
+    assert not cache.matches(1, ('B', None))
+    assert cache.stats()['size'] == 2
+
+
+def test_write_behind_queue_commits_one_batch(db_path):
+    db = DatabaseManager(db_path)
+    writer = WriteBehindQueue(db, max_delay=5.0)
+    try:
+        _add_user(db, 1)
+        for i in range(50):
+            writer.record_conversion(1, f'{i} (base 10) -> {i:b} (base 2)')
+        writer.record_conversions(1, ['1 (base 10) -> 1 (base 2)', '2 (base 10) -> 10 (base 2)'])
+        assert writer.flush(timeout=5)
+        stats = writer.metrics()
+        assert (stats['events'], stats['batches'], stats['failed_events']) == (51, 1, 0)
+        assert _history_count(db, 1) == 52
+        with db.get_connection() as conn:
+            assert conn.execute('SELECT convert_all FROM users WHERE id_tele = 1').fetchone()[0] == 52
+    finally:
+        writer.close()
+        db.close()
+
+
+def test_write_behind_queue_flushes_on_close(db_path):
+    db = DatabaseManager(db_path)
+    try:
+        _add_user(db, 1)
+        writer = WriteBehindQueue(db, max_delay=60.0)
+        writer.record_conversion(1, '3 (base 10) -> 11 (base 2)')
+        writer.close()
+        assert _history_count(db, 1) == 1
+        with pytest.raises(RuntimeError):
+            writer.record_conversion(1, '4 (base 10) -> 100 (base 2)')
+    finally:
+        db.close()
+
+
+def test_write_behind_queue_falls_back_to_single_events(db_path):
+    db = DatabaseManager(db_path)
+    writer = WriteBehindQueue(db, max_delay=5.0)
+    try:
+        _add_user(db, 1)
+        writer.record_conversion(1, '1 (base 10) -> 1 (base 2)')
+        # Người dùng chưa có trong users: vi phạm foreign key, cả lô bị rollback
+        writer.record_conversion(2, '2 (base 10) -> 10 (base 2)')
+        writer.record_conversion(1, '3 (base 10) -> 11 (base 2)')
+        assert writer.flush(timeout=5)
+        assert writer.metrics()['failed_events'] == 1
+        assert _history_count(db, 1) == 2
+        assert _history_count(db, 2) == 0
+    finally:
+        writer.close()
+        db.close()
+
+
+def _active_users(db, day):
+    with db.get_connection() as conn:
+        row = conn.execute('SELECT active_users FROM usage_days WHERE day = ?', (day,)).fetchone()
+    return row[0] if row else None
+
+
+def test_conversion_kind_survives_history_compaction(db_path):
+    num = 'F' * 700
+    text = f"{num} (base 16) -> {convert_base_result(num, 16, 2)} (base 2)"
+    assert conversion_kind(text) == 'base'
+    assert conversion_kind(compact_history_text(text, 1024)) == 'base'
+
+    db = DatabaseManager(db_path)
+    try:
+        _add_user(db, 1)
+        db.write_batch([('conversion', (1, text, int(time.time()))),
+                        ('conversion', (1, '-5 (base 10) -> 11111011 (8-bit signed binary)',
+                                        int(time.time())))])
+        live = db.usage_summary()['totals']
+        db.rebuild_usage_rollups()
+        assert db.usage_summary()['totals'] == live == {'base': 1, 'signed': 1}
+    finally:
+        db.close()
+
+
+def test_late_batch_does_not_recount_pruned_active_user(db_path):
+    old = int(time.time()) - (USAGE_ACTIVE_DAYS + 1) * 86400
+    day = _usage_day(old)
+    db = DatabaseManager(db_path)
+    try:
+        _add_user(db, 1)
+        db.write_batch([('conversion', (1, '7 (base 10) -> 111 (base 2)', old))])
+        db.rebuild_usage_rollups()
+        assert _active_users(db, day) == 1
+        db.prune_usage_active(_usage_day(time.time() - USAGE_ACTIVE_DAYS * 86400))
+        # Lô ghi trễ cho ngày đã bị dọn danh sách khử trùng
+        db.write_batch([('conversion', (1, '8 (base 10) -> 1000 (base 2)', old))])
+        assert _active_users(db, day) == 1
+        assert db.usage_summary(today=day)['today']['conversions'] == 2
+    finally:
+        db.close()
+
+
+def test_session_ttl_and_update_of_expired_session():
+    store = SessionStore(ttl=0.05)
+    store.set(1, {'step': 'choose_input_base', 'number': '255'})
+    assert store.update(1, from_base=10)['number'] == '255'
+    time.sleep(0.1)
+    assert store.get(1) == {}
+    store.set(2, {'step': 'choose_input_base', 'number': '7'})
+    time.sleep(0.1)
+    # Không dựng lại phiên chỉ gồm from_base
+    assert store.update(2, from_base=10) == {}
+    assert store.get(2) == {}
+    assert store.stats()['expired'] == 2
+
+
+def test_session_lru_and_byte_eviction():
+    store = SessionStore(max_sessions=2)
+    store.set(1, {'step': 'a'})
+    store.set(2, {'step': 'b'})
+    store.get(1)
+    store.set(3, {'step': 'c'})
+    assert store.get(2) == {} and store.get(1) and store.get(3)
+    assert store.stats()['evicted_lru'] == 1
+
+    small = {'step': 'choose_input_base', 'number': '1'}
+    store = SessionStore(max_bytes=SessionStore._estimate_size(small) * 3)
+    for chat_id in range(3):
+        store.set(chat_id, small)
+    store.set(3, {'step': 'choose_input_base', 'number': '1' * 200})
+    stats = store.stats()
+    assert stats['bytes'] <= stats['max_bytes'] and stats['evicted_memory'] >= 1
+    assert store.get(0) == {} and store.get(3)['number'] == '1' * 200
+
+
+def test_session_snapshot_and_restore(db_path):
+    db = DatabaseManager(db_path)
+    try:
+        store = SessionStore(db=db)
+        store.set(1, {'step': 'choose_input_base', 'number': 'FF'})
+        store.reset(2)  # Bước nhập số: không cần lưu
+        assert store.snapshot() == 1
+        restored = SessionStore(db=db)
+        assert restored.restore() == 1
+        assert restored.get(1) == {'step': 'choose_input_base', 'number': 'FF'}
+        assert restored.get(2) == {}
+        # Snapshot đã quá TTL thì không được khôi phục
+        assert SessionStore(db=db, ttl=0).restore() == 0
+    finally:
+        db.close()
+
+
+def _numbers(rows):
+    """Số đầu vào của các dòng lịch sử trên một trang."""
+    return [int(text.split()[0]) for _, text, _ in rows]
+
+
+def test_history_page_keyset_edges(db_path):
+    db = DatabaseManager(db_path)
+    try:
+        _add_user(db, 1)
+        _add_user(db, 2)
+        now = int(time.time())
+        # Xen kẽ với người dùng khác để id của một người không liên tục
+        for i in range(25):
+            db.write_batch([('conversion', (1, f'{i} (base 10) -> {i:b} (base 2)', now)),
+                            ('conversion', (2, 'x', now))])
+
+        total, page1, newer, older = db.get_history_page(1, limit=10)
+        assert total == 25 and _numbers(page1) == list(range(24, 14, -1)) and (newer, older) == (False, True)
+        _, page2, newer, older = db.get_history_page(1, before_id=page1[-1][0], limit=10)
+        assert _numbers(page2) == list(range(14, 4, -1)) and (newer, older) == (True, True)
+        _, page3, newer, older = db.get_history_page(1, before_id=page2[-1][0], limit=10)
+        assert _numbers(page3) == list(range(4, -1, -1)) and (newer, older) == (True, False)
+        assert db.get_history_page(1, before_id=page3[-1][0], limit=10)[1:] == ([], False, False)
+
+        # Quay lại: đúng trang trước, hoặc trang mới nhất nếu phía trên không đủ một trang
+        assert db.get_history_page(1, after_id=page3[0][0], limit=10)[1] == page2
+        assert db.get_history_page(1, after_id=page2[0][0], limit=10)[1:] == (page1, False, True)
+        assert db.get_history_page(1, after_id=page1[3][0], limit=10)[1] == page1
+
+        # Sau /clear_history chỉ thấy các dòng mới
+        db.clear_user_history(1)
+        assert db.get_history_page(1, limit=10)[1:] == ([], False, False)
+        db.write_batch([('conversion', (1, '99 (base 10) -> 1100011 (base 2)', now))])
+        _, rows, newer, older = db.get_history_page(1, limit=10)
+        assert _numbers(rows) == [99] and (newer, older) == (False, False)
+        assert db.get_history_page(1, after_id=0, limit=10)[1] == rows
+    finally:
+        db.close()
@@ -0,0 +1,57 @@
+"""Server webhook: chỉ nhận update có đúng secret token."""
+import http.client
+import json
+
+import pytest
+
+from webhook import SECRET_HEADER, WebhookServer
+
+SECRET = 'test-secret'
+UPDATE = json.dumps({'update_id': 1, 'message': {
+    'message_id': 1, 'date': 0, 'text': '/export_all',
+    'chat': {'id': 42, 'type': 'private'},
+    'from': {'id': 42, 'is_bot': False, 'first_name': 'a'}}}).encode()
+
+
+class RecordingBot:
+    def __init__(self):
+        self.updates = []
+
+    def process_new_updates(self, updates):
+        self.updates.extend(updates)
+
+
+@pytest.fixture
+def server():
+    server = WebhookServer(RecordingBot(), '127.0.0.1', 0, secret=SECRET)
+    server.start()
+    yield server
+    server.stop()
+
+
+def _post(server, headers):
+    conn = http.client.HTTPConnection('127.0.0.1', server.port, timeout=5)
+    try:
+        conn.request('POST', '/webhook', UPDATE, headers)
+        return conn.getresponse().status
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize('headers, status', [
+    ({}, 403),
+    ({SECRET_HEADER: 'wrong'}, 403),
+    ({SECRET_HEADER: ''}, 403),
+    ({SECRET_HEADER: SECRET}, 200),
+])
+def test_secret_header_is_required(server, headers, status):
+    assert _post(server, headers) == status
+    server.stop()
+    assert len(server.bot.updates) == (status == 200)
+    assert server.stats()['rejected_secret'] == (status == 403)
+
+
+@pytest.mark.parametrize('secret', [None, ''])
+def test_server_refuses_to_start_without_secret(secret):
+    with pytest.raises(ValueError):
+        WebhookServer(RecordingBot(), '127.0.0.1', 0, secret=secret)
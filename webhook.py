@@ -0,0 +1,174 @@
+"""
+Chế độ webhook: một HTTP server nhỏ nhận update từ Telegram và chuyển cho
+các handler sẵn có của bot (thay cho bot.polling).
+
+Request được xác thực bằng header X-Telegram-Bot-Api-Secret-Token (bắt buộc:
+thiếu secret thì ai gọi được cổng cũng gửi được update giả với from_user bất
+kỳ, kể cả ID admin), trả 200 ngay sau khi đưa vào hàng đợi; một thread duy nhất parse và chuyển update cho
+bot theo đúng thứ tự nhận, để các update của cùng một chat không bị đảo (việc
+chia theo chat cho nhiều worker do ChatDispatcher/AsyncEngine đảm nhận).
+"""
+import hmac
+import json
+import logging
+import queue
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from telebot import types
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Hàng đợi accept mặc định (5) quá nhỏ khi Telegram mở nhiều connection
+    request_queue_size = 128
+
+
+class WebhookServer:
+    def __init__(self, bot, host: str = '0.0.0.0', port: int = 8443,
+                 path: str = '/webhook', secret: Optional[str] = None,
+                 max_queue: int = 10000):
+        """
+        Args:
+            bot: TeleBot đã đăng ký handler
+            host: Địa chỉ lắng nghe
+            port: Cổng lắng nghe (0 để hệ điều hành tự chọn)
+            path: Đường dẫn nhận update
+            secret: Secret token đã đăng ký với setWebhook (bắt buộc)
+            max_queue: Số update tối đa chờ xử lý; đầy thì trả 503 để Telegram gửi lại
+        """
+        if not secret:
+            raise ValueError("Chế độ webhook cần secret token (--secret hoặc WEBHOOK_SECRET)")
+        self.bot = bot
+        self.path = path
+        self.secret = secret
+        self.updates: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._stats_lock = threading.Lock()
+        self._stats = {'accepted': 0, 'rejected_secret': 0, 'rejected_full': 0,
+                       'bad_request': 0, 'processed': 0, 'failed': 0,
+                       'queue_wait_total': 0.0}
+        self._dispatch_thread: Optional[threading.Thread] = None
+        self._server = _HTTPServer((host, port), self._make_handler())
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def _count(self, key: str, amount=1) -> None:
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _respond(self, status: int) -> None:
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                if self.path != server.path or length <= 0 or length > MAX_BODY_BYTES:
+                    server._count('bad_request')
+                    self.close_connection = True
+                    self._respond(404 if self.path != server.path else 400)
+                    return
+                body = self.rfile.read(length)
+
+                token = self.headers.get(SECRET_HEADER, '')
+                if not hmac.compare_digest(token.encode(), server.secret.encode()):
+                    server._count('rejected_secret')
+                    self._respond(403)
+                    return
+
+                try:
+                    server.updates.put_nowait((body, time.monotonic()))
+                except queue.Full:
+                    server._count('rejected_full')
+                    self._respond(503)
+                    return
+                server._count('accepted')
+                self._respond(200)
+
+            def log_message(self, format, *args):
+                logger.debug("webhook: " + format, *args)
+
+        return Handler
+
+    def _work(self) -> None:
+        while True:
+            item = self.updates.get()
+            if item is None:
+                return
+            body, received = item
+            self._count('queue_wait_total', time.monotonic() - received)
+            try:
+                update = types.Update.de_json(json.loads(body))
+                self.bot.process_new_updates([update])
+                self._count('processed')
+            except Exception:
+                self._count('failed')
+                logger.exception("Không xử lý được update từ webhook")
+
+    def start(self) -> None:
+        """Chạy thread chuyển update và HTTP server ở nền."""
+        self._dispatch_thread = threading.Thread(target=self._work, name='webhook-dispatch', daemon=True)
+        self._dispatch_thread.start()
+        threading.Thread(target=self._server.serve_forever, name='webhook-http', daemon=True).start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Ngừng nhận request và xử lý nốt các update đã nhận."""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._dispatch_thread is not None:
+            self.updates.put(None)
+            self._dispatch_thread.join(timeout)
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self.updates.qsize()
+        done = stats['processed'] + stats['failed']
+        stats['avg_queue_wait'] = stats.pop('queue_wait_total') / done if done else 0.0
+        return stats
+
+
+def run_webhook(bot, host: str = '0.0.0.0', port: int = 8443, path: str = '/webhook',
+                secret: Optional[str] = None, public_url: Optional[str] = None) -> None:
+    """
+    Chạy bot ở chế độ webhook cho đến khi bị dừng (Ctrl+C).
+
+    Args:
+        secret: Secret token; bỏ trống thì chỉ chạy được khi có public_url
+                (tự sinh secret ngẫu nhiên và đăng ký cùng setWebhook)
+        public_url: URL công khai (ví dụ https://example.com); nếu có thì
+                    đăng ký webhook với Telegram bằng setWebhook
+    """
+    if not secret:
+        if not public_url:
+            raise ValueError("Chế độ webhook cần --secret (hoặc WEBHOOK_SECRET) khi không có --public-url")
+        secret = secrets.token_urlsafe(32)
+        logger.info("Không có secret: dùng secret ngẫu nhiên cho setWebhook")
+    server = WebhookServer(bot, host, port, path, secret)
+    if public_url:
+        bot.remove_webhook()
+        bot.set_webhook(url=public_url.rstrip('/') + path, secret_token=secret)
+    server.start()
+    logger.info("Webhook đang lắng nghe tại %s:%s%s", host, server.port, path)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()